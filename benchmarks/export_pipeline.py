@@ -0,0 +1,389 @@
+"""
+Offline benchmark for the dataset export pipeline.
+
+Everything runs against local stand-ins:
+  - a moto S3 server (started here) for both the OBS audio bucket and the AWS
+    export bucket
+  - a local Postgres that the benchmark may wipe, for example:
+
+        docker run --rm -p 5432:5432 -e POSTGRES_PASSWORD=postgres \\
+            -e POSTGRES_DB=africanvoices_bench postgres:16
+
+The largest requested size is seeded once: synthetic AudioSample rows (via
+COPY) plus one WAV object per row. Each (path, size) case then runs in its own
+subprocess so peak RSS is per case:
+
+  - worker: `async_create_dataset_zip_s3_impl` (the Celery export)
+  - api:    `DownloadService.filter_core` + `stream_zip_to_s3`
+
+    python -m benchmarks.export_pipeline run --sizes 1000 10000 100000
+    python -m benchmarks.export_pipeline compare old.json new.json
+
+Each case reports clips/sec, MB/sec (ZIP bytes out and OBS bytes in), peak
+RSS and the number of SQL statements. Results go to benchmarks/results/ as JSON.
+
+Database and storage settings are always overridden from the command line,
+so values in .env (e.g. production PGHOST) are never used.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+
+BENCH_LANGUAGE = "bench"
+BENCH_CATEGORY = "read"
+OBS_BUCKET = "dsn"
+EXPORT_BUCKET = "bench-exports"
+RESULTS_DIR = Path(__file__).parent / "results"
+PATHS = ("worker", "api")
+
+SAMPLE_RATE = 48000
+BYTES_PER_SAMPLE = 2
+
+
+def configure_env(args) -> Dict[str, str]:
+    """Point settings at the local stand-ins. Must run before importing `src`."""
+    overrides = {
+        "PGHOST": args.pg_host,
+        "PGPORT": str(args.pg_port),
+        "PGUSER": args.pg_user,
+        "PGPASSWORD": args.pg_password,
+        "PGDATABASE": args.pg_database,
+        "PG_SSL": "false",
+        "AWS_ENDPOINT_URL": args.s3_endpoint,
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "AWS_REGION": "us-east-1",
+        "S3_BUCKET_NAME": EXPORT_BUCKET,
+        "OBS_ENDPOINT_URL": args.s3_endpoint,
+        "OBS_ACCESS_KEY_ID": "bench",
+        "OBS_SECRET_ACCESS_KEY": "bench",
+        "OBS_REGION": "us-east-1",
+        "OBS_BUCKET_NAME": OBS_BUCKET,
+        "OBS_SIGNATURE": "s3v4",
+        "STORAGE_BACKEND": "s3",
+        "TRACE_EXPORTER": "none",
+        "LOG_LEVEL": "WARNING",
+    }
+    os.environ.update(overrides)
+    # Remaining required settings only need to exist
+    for name in (
+        "DATABASE_URL", "JWT_SECRET", "JWT_ALGORITHM", "GOOGLE_CLIENT_ID",
+        "GOOGLE_CLIENT_SECRET", "GOOGLE_REDIRECT_URI", "RESEND_API_KEY",
+        "FRONTEND_URL", "BACKEND_URL", "EMAIL_FROM", "REDIS_HOST",
+        "REDIS_PASSWORD", "REDIS_USERNAME", "SESSION_SECRET_KEY",
+    ):
+        os.environ.setdefault(name, "bench")
+    os.environ.setdefault("REDIS_PORT", "6379")
+    return overrides
+
+
+def s3_client(endpoint: str):
+    import boto3
+    from botocore.client import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id="bench",
+        aws_secret_access_key="bench",
+        region_name="us-east-1",
+        config=Config(s3={"addressing_style": "path"}, max_pool_connections=64),
+    )
+
+
+def make_wav(payload_bytes: int) -> bytes:
+    """A mono 16-bit WAV with incompressible content, like real recordings."""
+    data = os.urandom(payload_bytes - payload_bytes % BYTES_PER_SAMPLE)
+    header = b"".join([
+        b"RIFF", (36 + len(data)).to_bytes(4, "little"), b"WAVE",
+        b"fmt ", (16).to_bytes(4, "little"), (1).to_bytes(2, "little"), (1).to_bytes(2, "little"),
+        SAMPLE_RATE.to_bytes(4, "little"), (SAMPLE_RATE * BYTES_PER_SAMPLE).to_bytes(4, "little"),
+        BYTES_PER_SAMPLE.to_bytes(2, "little"), (8 * BYTES_PER_SAMPLE).to_bytes(2, "little"),
+        b"data", len(data).to_bytes(4, "little"),
+    ])
+    return header + data
+
+
+def sentence_ids(count: int) -> List[str]:
+    return [f"bench_{i:07d}" for i in range(count)]
+
+
+def seed_objects(endpoint: str, count: int, clip_bytes: int, workers: int):
+    from src.tasks.export_worker import map_category_to_folder
+
+    client = s3_client(endpoint)
+    for bucket in (OBS_BUCKET, EXPORT_BUCKET):
+        client.create_bucket(Bucket=bucket)
+
+    wav = make_wav(clip_bytes)
+    folder = map_category_to_folder(BENCH_LANGUAGE, BENCH_CATEGORY)
+
+    def put(sentence_id: str):
+        client.put_object(Bucket=OBS_BUCKET, Key=f"{BENCH_LANGUAGE}-test/{folder}/{sentence_id}.wav", Body=wav)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(put, sentence_ids(count)))
+
+
+async def seed_rows(count: int):
+    from src.db.db import create_tables, dispose_async_engine, get_async_engine
+
+    await create_tables()
+    now = datetime.datetime.now()
+    duration = "1.0"
+    records = [
+        (
+            str(uuid.uuid4()), sentence_id, f"Synthetic sentence {i}",
+            "female" if i % 2 else "male", f"spk_{i % 500:03d}", "train",
+            "18-25", "tertiary", duration, BENCH_LANGUAGE, 40, "general",
+            BENCH_CATEGORY, now, now,
+        )
+        for i, sentence_id in enumerate(sentence_ids(count))
+    ]
+    columns = [
+        "id", "sentence_id", "sentence", "gender", "speaker_id", "split",
+        "age_group", "edu_level", "duration", "language", "snr", "domain",
+        "category", "created_at", "uploaded_at",
+    ]
+
+    engine = get_async_engine()
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        async with driver.transaction():
+            await driver.execute("DELETE FROM audiosample WHERE language = $1", BENCH_LANGUAGE)
+            await driver.copy_records_to_table("audiosample", records=records, columns=columns)
+    await dispose_async_engine()
+
+
+class QueryCounter:
+    """Counts SQL statements executed by any engine in this process."""
+
+    def __init__(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        self.count = 0
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_):
+        self.count += 1
+
+
+class BenchTask:
+    """Stands in for the bound Celery task (`self`) passed to the worker impl."""
+
+    def __init__(self):
+        self.updates = 0
+
+    def update_state(self, state=None, meta=None):
+        self.updates += 1
+
+
+async def _run_worker(size: int, seeded: int) -> int:
+    from src.crud.crud_export import create_export_job
+    from src.db.db import get_async_session_maker
+    from src.schemas.export import ExportJobCreate
+    from src.tasks.export_worker import async_create_dataset_zip_s3_impl
+
+    pct = size / seeded * 100
+    session_maker = get_async_session_maker()
+    async with session_maker() as session:
+        job = await create_export_job(
+            session, ExportJobCreate(user_id="bench", language=BENCH_LANGUAGE, percentage=pct)
+        )
+
+    result = await async_create_dataset_zip_s3_impl(
+        BenchTask(), job.id, BENCH_LANGUAGE, pct,
+        fresh_session_maker=lambda: session_maker,
+    )
+    return result["total_samples"]
+
+
+async def _run_api(size: int) -> int:
+    from src.db.db import get_async_session_maker
+    from src.download.service import DownloadService
+    from src.download.utils import stream_zip_to_s3
+
+    service = DownloadService(s3_bucket_name=OBS_BUCKET)
+    async with get_async_session_maker()() as session:
+        samples, _ = await service.filter_core(session, BENCH_LANGUAGE, limit=size)
+    await stream_zip_to_s3(BENCH_LANGUAGE, samples, as_excel=False)
+    return len(samples)
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+def run_case(path: str, size: int, seeded: int, endpoint: str) -> dict:
+    """Run one export in this process and measure it."""
+    from prometheus_client import REGISTRY
+    from src.db.db import dispose_async_engine
+
+    queries = QueryCounter()
+    baseline_rss = _rss_mb()
+
+    async def run() -> int:
+        try:
+            if path == "worker":
+                return await _run_worker(size, seeded)
+            return await _run_api(size)
+        finally:
+            await dispose_async_engine()
+
+    started = time.perf_counter()
+    clips = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+
+    zip_bytes = REGISTRY.get_sample_value("zip_bytes_produced_total", {"path": path}) or 0.0
+    obs_bytes = REGISTRY.get_sample_value("obs_get_object_bytes_total") or 0.0
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+    return {
+        "path": path,
+        "samples": size,
+        "clips": clips,
+        "seconds": round(elapsed, 3),
+        "clips_per_sec": round(clips / elapsed, 2),
+        "zip_mb": round(zip_bytes / 1e6, 2),
+        "zip_mb_per_sec": round(zip_bytes / 1e6 / elapsed, 2),
+        "obs_mb_per_sec": round(obs_bytes / 1e6 / elapsed, 2) if obs_bytes else None,
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(peak_rss, 1),
+        "db_queries": queries.count,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def run(args):
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=args.moto_port)
+    server.start()
+    args.s3_endpoint = f"http://127.0.0.1:{args.moto_port}"
+    configure_env(args)
+
+    seeded = max(args.sizes)
+    try:
+        print(f"Seeding {seeded} rows and objects ({args.clip_bytes} bytes each)...", file=sys.stderr)
+        started = time.perf_counter()
+        seed_objects(args.s3_endpoint, seeded, args.clip_bytes, args.seed_workers)
+        asyncio.run(seed_rows(seeded))
+        seed_seconds = time.perf_counter() - started
+
+        cases = []
+        for size in sorted(args.sizes):
+            for path in args.paths:
+                print(f"Running {path} export with {size} samples...", file=sys.stderr)
+                proc = subprocess.run(
+                    [
+                        sys.executable, "-m", "benchmarks.export_pipeline", "_case",
+                        "--path", path, "--size", str(size), "--seeded", str(seeded),
+                        "--s3-endpoint", args.s3_endpoint,
+                    ],
+                    env=os.environ.copy(),
+                    capture_output=True,
+                    text=True,
+                )
+                if proc.returncode != 0:
+                    cases.append({"path": path, "samples": size, "error": proc.stderr.strip()[-2000:]})
+                    continue
+                cases.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+                print(json.dumps(cases[-1]), file=sys.stderr)
+    finally:
+        server.stop()
+
+    report = {
+        "benchmark": "export_pipeline",
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "clip_bytes": args.clip_bytes,
+        "seeded_samples": seeded,
+        "seed_seconds": round(seed_seconds, 2),
+        "cases": cases,
+    }
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"export_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print(f"Results written to {out}", file=sys.stderr)
+
+
+def compare(args):
+    """Print metric changes per (path, samples) between two result files."""
+    def load(path):
+        report = json.loads(Path(path).read_text())
+        return {(c["path"], c["samples"]): c for c in report["cases"] if "error" not in c}
+
+    before, after = load(args.before), load(args.after)
+    metrics = ("clips_per_sec", "zip_mb_per_sec", "peak_rss_mb", "db_queries")
+    for key in sorted(before.keys() & after.keys()):
+        print(f"{key[0]} @ {key[1]} samples")
+        for metric in metrics:
+            old, new = before[key].get(metric), after[key].get(metric)
+            if not old or new is None:
+                continue
+            print(f"  {metric:16} {old:>12} -> {new:<12} ({(new - old) / old * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Seed the stand-ins and run the benchmark")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    run_parser.add_argument("--paths", nargs="+", choices=PATHS, default=list(PATHS))
+    run_parser.add_argument("--clip-bytes", type=int, default=16 * 1024, help="WAV payload per sample")
+    run_parser.add_argument("--seed-workers", type=int, default=32)
+    run_parser.add_argument("--moto-port", type=int, default=5055)
+    run_parser.add_argument("--pg-host", default="127.0.0.1")
+    run_parser.add_argument("--pg-port", type=int, default=5432)
+    run_parser.add_argument("--pg-user", default="postgres")
+    run_parser.add_argument("--pg-password", default="postgres")
+    run_parser.add_argument("--pg-database", default="africanvoices_bench")
+    run_parser.add_argument("--out", help="Result file (default: benchmarks/results/export_<time>.json)")
+
+    compare_parser = sub.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    # Internal: one measured case, run in a fresh process by `run`
+    case_parser = sub.add_parser("_case")
+    case_parser.add_argument("--path", choices=PATHS, required=True)
+    case_parser.add_argument("--size", type=int, required=True)
+    case_parser.add_argument("--seeded", type=int, required=True)
+    case_parser.add_argument("--s3-endpoint", required=True)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    elif args.command == "compare":
+        compare(args)
+    else:
+        print(json.dumps(run_case(args.path, args.size, args.seeded, args.s3_endpoint)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+API load test: how many concurrent users can one uvicorn process serve?
+
+Virtual users replay a weighted mix of the public endpoints with think time in
+between: preview, estimate-size, signin, export status polling and the export
+status WebSocket. Each concurrency level runs for `--duration` seconds and
+reports per-endpoint RPS, p50/p95/p99 and error rate. WebSocket latency is
+the time to the first status message; users on a WebSocket then stay on it
+for `--ws-hold` seconds, like someone watching an export.
+
+Seed fixtures into a local database, then either let the script start one
+uvicorn process against that database (`--spawn`) or point it at a server:
+
+    python -m loadtest.fixtures --samples 20000
+    python -m loadtest.api --spawn --users 10 50 100 200 --duration 30
+    python -m loadtest.api --base-url http://localhost:8000 --users 50
+
+Results are printed and written as JSON (`--out`).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+import websockets
+
+from loadtest.fixtures import CATEGORIES, DOMAINS, GENDERS, local_env
+from loadtest.stats import summarize
+
+
+# Share of requests per scenario, roughly what the frontend sends
+MIX = {
+    "preview": 40,
+    "status_poll": 30,
+    "estimate_size": 12,
+    "signin": 8,
+    "status_ws": 10,
+}
+THINK_TIME = (0.2, 1.0)  # seconds between a virtual user's requests
+API = "/api/v1"
+
+
+class Scenarios:
+    """
+    One virtual user's requests. Each returns False on failure and True on
+    success, or the latency to record when that is not the whole call.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, base_url: str, manifest: dict, rng: random.Random, ws_hold: float):
+        self.client = client
+        self.ws_base = base_url.replace("http://", "ws://").replace("https://", "wss://")
+        self.manifest = manifest
+        self.rng = rng
+        self.ws_hold = ws_hold
+        self.all_jobs = [job for jobs in manifest["jobs"].values() for job in jobs]
+
+    def _facets(self) -> dict:
+        # Most users filter on one facet; some browse everything
+        facet = self.rng.choice(["gender", "domain", "category", None])
+        values = {"gender": GENDERS, "domain": DOMAINS, "category": CATEGORIES}
+        return {facet: self.rng.choice(values[facet])} if facet else {}
+
+    async def preview(self) -> bool:
+        language = self.rng.choice(self.manifest["languages"])
+        resp = await self.client.get(
+            f"{API}/download/samples/{language}/preview", params={"limit": 10, **self._facets()}
+        )
+        return resp.status_code == 200
+
+    async def estimate_size(self) -> bool:
+        language = self.rng.choice(self.manifest["languages"])
+        pct = self.rng.choice([5, 20, 50])
+        resp = await self.client.get(f"{API}/download/zip/estimate-size/{language}/{pct}", params=self._facets())
+        return resp.status_code == 200
+
+    async def signin(self) -> bool:
+        resp = await self.client.post(f"{API}/auth/signin", json={
+            "email": self.rng.choice(self.manifest["users"]),
+            "password": self.manifest["password"],
+        })
+        return resp.status_code == 200
+
+    async def status_poll(self) -> bool:
+        resp = await self.client.get(f"{API}/celery/exports/status/{self.rng.choice(self.all_jobs)}")
+        return resp.status_code == 200
+
+    async def status_ws(self) -> float:
+        # Watch an in-flight job most of the time; finished jobs close right away
+        jobs = self.manifest["jobs"]
+        pool = jobs["processing"] if self.rng.random() < 0.7 else jobs["ready"]
+        url = f"{self.ws_base}{API}/celery/ws/export-status/{self.rng.choice(pool)}"
+        start = time.perf_counter()
+        async with websockets.connect(url, open_timeout=30) as ws:
+            first = json.loads(await asyncio.wait_for(ws.recv(), 30))
+            first_message = time.perf_counter() - start
+            if "error" in first:
+                return False
+            try:
+                await asyncio.wait_for(self._drain(ws), self.ws_hold)
+            except (asyncio.TimeoutError, websockets.ConnectionClosed):
+                pass
+        return first_message
+
+    @staticmethod
+    async def _drain(ws):
+        async for _ in ws:
+            pass
+
+
+async def _virtual_user(
+    scenarios: Scenarios,
+    deadline: float,
+    stats: Dict[str, tuple],
+):
+    names, weights = list(MIX), list(MIX.values())
+    rng = scenarios.rng
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        latencies, errors = stats[name]
+        start = time.perf_counter()
+        try:
+            result = await getattr(scenarios, name)()
+        except Exception:
+            result = False
+        if result is False:
+            errors[0] += 1
+        elif result is True:
+            latencies.append(time.perf_counter() - start)
+        else:
+            latencies.append(result)
+        await asyncio.sleep(rng.uniform(*THINK_TIME))
+
+
+async def run_level(base_url: str, manifest: dict, users: int, duration: float, ws_hold: float, seed: int) -> dict:
+    stats = {name: ([], [0]) for name in MIX}
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            _virtual_user(Scenarios(client, base_url, manifest, random.Random(seed + i), ws_hold), deadline, stats)
+            for i in range(users)
+        ])
+        elapsed = time.perf_counter() - started
+
+    report = {name: summarize(latencies, elapsed, errors[0]) for name, (latencies, errors) in stats.items()}
+    all_latencies = [lat for latencies, _ in stats.values() for lat in latencies]
+    report["total"] = summarize(all_latencies, elapsed, sum(errors[0] for _, errors in stats.values()))
+    return report
+
+
+def spawn_server(port: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Start one uvicorn process with the load-test settings and wait until it answers."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--log-level", "warning", "--no-access-log"],
+        env={**os.environ, **env},
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="Start one uvicorn process on --port")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pg-host", default="127.0.0.1")
+    parser.add_argument("--pg-port", type=int, default=5432)
+    parser.add_argument("--pg-user", default="postgres")
+    parser.add_argument("--pg-password", default="postgres")
+    parser.add_argument("--pg-database", default="africanvoices_loadtest")
+    parser.add_argument("--fixtures", default="loadtest_fixtures.json", help="Manifest from loadtest.fixtures")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 50, 100], help="Concurrency levels")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per level")
+    parser.add_argument("--ws-hold", type=float, default=5, help="Seconds a user watches a WebSocket")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    with open(args.fixtures) as f:
+        manifest = json.load(f)
+
+    server = None
+    base_url = args.base_url
+    if args.spawn:
+        env = local_env(args.pg_host, args.pg_port, args.pg_user, args.pg_password, args.pg_database)
+        server = spawn_server(args.port, env)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        levels: List[dict] = []
+        for users in args.users:
+            print(f"Running {users} users for {args.duration}s...", file=sys.stderr)
+            report = asyncio.run(run_level(base_url, manifest, users, args.duration, args.ws_hold, args.seed))
+            levels.append({"users": users, "endpoints": report})
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    result = {
+        "base_url": base_url,
+        "mix": MIX,
+        "duration_seconds": args.duration,
+        "ws_hold_seconds": args.ws_hold,
+        "levels": levels,
+    }
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Fixture data and local settings for the API load-test scenarios.
+
+`local_env` points the app at a throwaway local Postgres. OBS/S3 signing
+(preview URLs, presigned links) is pure HMAC work, so dummy credentials are
+enough and no request ever reaches OBS or S3. `seed` then writes a known
+catalog into that database: verified users, audio samples, preview pools,
+and export jobs in every status.
+
+    python -m loadtest.fixtures --samples 20000
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import uuid
+from typing import Dict, List
+
+
+LANGUAGES = ["yoruba", "hausa", "igbo", "naija"]
+GENDERS = ["male", "female"]
+AGE_GROUPS = ["18-25", "26-35", "36-45", "46-60"]
+EDUCATION = ["primary", "secondary", "tertiary"]
+DOMAINS = ["general", "health", "agriculture", "finance"]
+CATEGORIES = ["read", "spontaneous"]
+
+USER_PASSWORD = "loadtest-password"
+USER_COUNT = 20
+JOBS_PER_STATUS = 50
+DATASET_ID = "loadtest"
+
+
+def user_email(i: int) -> str:
+    return f"loadtest+{i}@example.com"
+
+
+def local_env(
+    pg_host: str = "127.0.0.1",
+    pg_port: int = 5432,
+    pg_user: str = "postgres",
+    pg_password: str = "postgres",
+    pg_database: str = "africanvoices_loadtest",
+) -> Dict[str, str]:
+    """
+    Settings for a load-test process. Database and storage values always
+    override .env, so a production PGHOST can never be picked up.
+    """
+    env = {
+        "PGHOST": pg_host,
+        "PGPORT": str(pg_port),
+        "PGUSER": pg_user,
+        "PGPASSWORD": pg_password,
+        "PGDATABASE": pg_database,
+        "PG_SSL": "false",
+        "AWS_ENDPOINT_URL": "http://127.0.0.1:9",
+        "AWS_ACCESS_KEY_ID": "loadtest",
+        "AWS_SECRET_ACCESS_KEY": "loadtest",
+        "AWS_REGION": "us-east-1",
+        "S3_BUCKET_NAME": "loadtest-exports",
+        "OBS_ENDPOINT_URL": "http://127.0.0.1:9",
+        "OBS_ACCESS_KEY_ID": "loadtest",
+        "OBS_SECRET_ACCESS_KEY": "loadtest",
+        "OBS_REGION": "us-east-1",
+        "TRACE_EXPORTER": "none",
+        "LOG_LEVEL": "WARNING",
+        # Signin should measure the server, not cost-12 hashing of fixture users
+        "BCRYPT_ROUNDS": os.environ.get("BCRYPT_ROUNDS", "10"),
+    }
+    for name in (
+        "DATABASE_URL", "JWT_SECRET", "JWT_ALGORITHM", "GOOGLE_CLIENT_ID",
+        "GOOGLE_CLIENT_SECRET", "GOOGLE_REDIRECT_URI", "RESEND_API_KEY",
+        "FRONTEND_URL", "BACKEND_URL", "EMAIL_FROM", "REDIS_HOST",
+        "REDIS_PASSWORD", "REDIS_USERNAME", "SESSION_SECRET_KEY",
+    ):
+        env[name] = os.environ.get(name, "loadtest")
+    env["JWT_ALGORITHM"] = os.environ.get("JWT_ALGORITHM", "HS256")
+    env["REDIS_PORT"] = os.environ.get("REDIS_PORT", "6379")
+    return env
+
+
+def _sample_rows(count: int, rng: random.Random) -> List[dict]:
+    now = datetime.datetime.now()
+    now_utc = datetime.datetime.now(datetime.timezone.utc)
+    rows = []
+    for i in range(count):
+        language = LANGUAGES[i % len(LANGUAGES)]
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "dataset_id": DATASET_ID,
+            "sentence_id": f"lt_{language}_{i:07d}",
+            "sentence": f"Load test sentence {i}",
+            "gender": rng.choice(GENDERS),
+            "speaker_id": f"lt_spk_{rng.randrange(400):03d}",
+            "split": "train",
+            "age_group": rng.choice(AGE_GROUPS),
+            "edu_level": rng.choice(EDUCATION),
+            "duration": f"{rng.uniform(2, 12):.2f}",
+            "language": language,
+            "snr": rng.randrange(20, 60),
+            "domain": rng.choice(DOMAINS),
+            "category": rng.choice(CATEGORIES),
+            "created_at": now,
+            "uploaded_at": now_utc,
+        })
+    return rows
+
+
+async def seed(samples: int, seed_value: int = 7) -> dict:
+    """Reset the load-test tables and write the fixture catalog. Returns a manifest."""
+    from sqlalchemy import delete, insert
+
+    from src.auth.utils import generate_passwd_hash
+    from src.db.db import create_tables, dispose_async_engine, get_async_session_maker
+    from src.db.models import AudioSample, Dataset, DownloadLog, DownloadStatusEnum, PreviewCandidate, User
+    from src.download.preview_pool import refresh_preview_pool
+
+    rng = random.Random(seed_value)
+    await create_tables()
+    session_maker = get_async_session_maker()
+
+    password_hash = generate_passwd_hash(USER_PASSWORD)
+    jobs: Dict[str, List[str]] = {}
+
+    async with session_maker() as session:
+        await session.execute(delete(PreviewCandidate))
+        await session.execute(delete(AudioSample).where(AudioSample.dataset_id == DATASET_ID))
+        await session.execute(delete(Dataset).where(Dataset.id == DATASET_ID))
+        await session.execute(delete(DownloadLog).where(DownloadLog.user_id.like("loadtest-%")))
+        await session.execute(delete(User).where(User.email.like("loadtest+%")))
+
+        await session.execute(insert(User), [
+            {
+                "id": f"loadtest-{i}", "full_name": f"Load Test {i}", "email": user_email(i),
+                "password": password_hash, "is_verified": True,
+            }
+            for i in range(USER_COUNT)
+        ])
+        await session.execute(insert(Dataset), [
+            {
+                "id": DATASET_ID, "name": "Load test", "created_by": "loadtest-0",
+                "created_at": datetime.datetime.now(datetime.timezone.utc),
+            },
+        ])
+
+        rows = _sample_rows(samples, rng)
+        for start in range(0, len(rows), 5000):
+            await session.execute(insert(AudioSample), rows[start:start + 5000])
+
+        for status in (DownloadStatusEnum.QUEUED, DownloadStatusEnum.PROCESSING,
+                       DownloadStatusEnum.READY, DownloadStatusEnum.FAILED):
+            job_rows = [
+                {
+                    "id": str(uuid.uuid4()), "user_id": f"loadtest-{i % USER_COUNT}",
+                    "percentage": 5, "language": rng.choice(LANGUAGES), "status": status,
+                    "progress_pct": {"ready": 100, "processing": 40}.get(status, 0),
+                    "download_url": "https://exports.example/loadtest.zip" if status == "ready" else None,
+                    "error_message": "fixture failure" if status == "failed" else None,
+                }
+                for i in range(JOBS_PER_STATUS)
+            ]
+            await session.execute(insert(DownloadLog), job_rows)
+            jobs[status] = [row["id"] for row in job_rows]
+        await session.commit()
+
+        pool_sizes = {language: await refresh_preview_pool(session, language) for language in LANGUAGES}
+
+    await dispose_async_engine()
+    return {
+        "samples": samples,
+        "users": [user_email(i) for i in range(USER_COUNT)],
+        "password": USER_PASSWORD,
+        "languages": LANGUAGES,
+        "preview_pool_sizes": pool_sizes,
+        "jobs": jobs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--pg-host", default="127.0.0.1")
+    parser.add_argument("--pg-port", type=int, default=5432)
+    parser.add_argument("--pg-user", default="postgres")
+    parser.add_argument("--pg-password", default="postgres")
+    parser.add_argument("--pg-database", default="africanvoices_loadtest")
+    parser.add_argument("--out", default="loadtest_fixtures.json", help="Manifest used by loadtest.api")
+    args = parser.parse_args()
+
+    os.environ.update(local_env(args.pg_host, args.pg_port, args.pg_user, args.pg_password, args.pg_database))
+    manifest = asyncio.run(seed(args.samples))
+    with open(args.out, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Seeded {args.samples} samples; manifest written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Signin load test: does password hashing stall unrelated requests?
+
+HTTP mode, against a running server. Run it once on the old build and once
+on the new one and compare the two reports:
+
+    python -m loadtest.signin http --base-url http://localhost:8000 \\
+        --email user@example.com --password secret --concurrency 32 --duration 30
+
+In-process mode, with no server or database. It compares inline bcrypt
+(`verify_password`) with the hashing pool (`verify_password_async`) on one
+event loop and prints both reports:
+
+    python -m loadtest.signin inline --concurrency 32 --duration 10
+
+Both modes report signin throughput next to the tail latency of a probe that
+keeps doing something unrelated: `GET /` over HTTP, an event-loop tick in-process.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+
+from loadtest.stats import summarize
+
+
+PROBE_INTERVAL = 0.02  # seconds between probe requests / ticks
+
+
+async def _run_loop(
+    call: Callable[[], Awaitable[bool]],
+    deadline: float,
+    latencies: List[float],
+    errors: List[int],
+    pause: float = 0.0,
+):
+    """Call `call` until `deadline`, recording latency of successes and counting failures."""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            ok = await call()
+        except Exception:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors[0] += 1
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def run_http(base_url: str, email: str, password: str, concurrency: int, duration: float) -> dict:
+    signin_url = f"{base_url.rstrip('/')}/api/v1/auth/signin"
+    probe_url = f"{base_url.rstrip('/')}/"
+    payload = {"email": email, "password": password}
+
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def signin() -> bool:
+            resp = await client.post(signin_url, json=payload)
+            return resp.status_code == 200
+
+        async def probe() -> bool:
+            resp = await client.get(probe_url)
+            return resp.status_code == 200
+
+        signin_lat, signin_err = [], [0]
+        probe_lat, probe_err = [], [0]
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            _run_loop(probe, deadline, probe_lat, probe_err, pause=PROBE_INTERVAL),
+            *[_run_loop(signin, deadline, signin_lat, signin_err) for _ in range(concurrency)],
+        )
+        elapsed = time.perf_counter() - started
+
+    return {
+        "signin": summarize(signin_lat, elapsed, signin_err[0]),
+        "unrelated_endpoint": summarize(probe_lat, elapsed, probe_err[0]),
+    }
+
+
+async def _run_inline_case(offloaded: bool, concurrency: int, duration: float) -> dict:
+    from src.auth.utils import generate_passwd_hash, verify_password, verify_password_async
+
+    password = "loadtest-password"
+    stored_hash = generate_passwd_hash(password)
+
+    async def signin() -> bool:
+        if offloaded:
+            ok, _ = await verify_password_async(password, stored_hash)
+            return ok
+        # Yield once so concurrent "requests" interleave like real handlers do
+        await asyncio.sleep(0)
+        return verify_password(password, stored_hash)
+
+    async def tick() -> bool:
+        # Latency of a tick beyond its nominal sleep is time the loop was blocked
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lag = time.perf_counter() - start - PROBE_INTERVAL
+        tick_lag.append(max(lag, 0.0))
+        return True
+
+    signin_lat, signin_err = [], [0]
+    tick_lag, tick_err = [], [0]
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(
+        _run_loop(tick, deadline, [], tick_err),
+        *[_run_loop(signin, deadline, signin_lat, signin_err) for _ in range(concurrency)],
+    )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "signin": summarize(signin_lat, elapsed, signin_err[0]),
+        "event_loop_lag": summarize(tick_lag, elapsed, tick_err[0]),
+    }
+
+
+async def run_inline(concurrency: int, duration: float) -> dict:
+    return {
+        "before_inline_bcrypt": await _run_inline_case(False, concurrency, duration),
+        "after_hashing_pool": await _run_inline_case(True, concurrency, duration),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    http = sub.add_parser("http", help="Load a running server")
+    http.add_argument("--base-url", default="http://localhost:8000")
+    http.add_argument("--email", required=True)
+    http.add_argument("--password", required=True)
+    http.add_argument("--concurrency", type=int, default=32)
+    http.add_argument("--duration", type=float, default=30)
+
+    inline = sub.add_parser("inline", help="Compare inline vs pooled hashing in-process")
+    inline.add_argument("--concurrency", type=int, default=32)
+    inline.add_argument("--duration", type=float, default=10)
+
+    args = parser.parse_args()
+    if args.mode == "http":
+        report = asyncio.run(run_http(args.base_url, args.email, args.password, args.concurrency, args.duration))
+    else:
+        report = asyncio.run(run_inline(args.concurrency, args.duration))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import math
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (pct in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    """Throughput and latency percentiles (in ms) for one stream of requests."""
+    count = len(latencies)
+    total = count + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+    }
@@ -8,14 +8,22 @@ from src.middleware import register_middleware
 from src.errors import register_all_errors
 import uvicorn, os
 from src.db.db import create_tables
+from src.core.http import init_http_client, close_http_client
+from src.storage.registry import close_async_storages
+from src.db.redis import close_redis_client
+from src.auth.mail import email_outbox
+from src.core.job_status import status_hub
 from contextlib import asynccontextmanager
 from redis.asyncio import Redis
 from fastapi.requests import Request
+from src.core.metrics import start_metrics_exporter
 from typing import cast
 # from src.db.redis import init_redis_client
 from src.config import settings
 from src.logging_config import setup_logging
 setup_logging()
+from src.core.tracing import init_tracing
+init_tracing("api")
 
 
 
@@ -48,7 +56,16 @@ async def lifespan(app: FastAPI):
         print(f"Error connecting to Redis: {e}")
 
     await create_tables()
+    init_http_client()
+    start_metrics_exporter(settings.API_METRICS_PORT)
+    email_outbox.start()
+    status_hub.start()
     yield
+    await status_hub.stop()
+    await email_outbox.stop()
+    await close_http_client()
+    await close_async_storages()
+    await close_redis_client()
 
 
 app = FastAPI(
@@ -0,0 +1,78 @@
+"""add preview candidates
+
+Revision ID: 3f9a1c7d2e84
+Revises: dc3ac879d582
+Create Date: 2025-10-20 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2e84'
+down_revision: Union[str, Sequence[str], None] = 'dc3ac879d582'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('preview_candidates',
+    sa.Column('sample_id', sa.VARCHAR(), nullable=False),
+    sa.Column('language', sa.VARCHAR(), nullable=False),
+    sa.Column('category', sa.VARCHAR(), nullable=True),
+    sa.Column('gender', sa.VARCHAR(), nullable=True),
+    sa.Column('age_group', sa.VARCHAR(), nullable=True),
+    sa.Column('edu_level', sa.VARCHAR(), nullable=True),
+    sa.Column('domain', sa.VARCHAR(), nullable=True),
+    sa.Column('split', sa.VARCHAR(), nullable=True),
+    sa.Column('speaker_id', sa.VARCHAR(), nullable=True),
+    sa.Column('sentence_id', sa.VARCHAR(), nullable=True),
+    sa.Column('sentence', sa.VARCHAR(), nullable=True),
+    sa.Column('storage_link', sa.VARCHAR(), nullable=True),
+    sa.Column('duration', sa.VARCHAR(), nullable=True),
+    sa.Column('snr', sa.INTEGER(), nullable=True),
+    sa.Column('slot', postgresql.DOUBLE_PRECISION(), nullable=False),
+    sa.Column('refreshed_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.PrimaryKeyConstraint('sample_id')
+    )
+    op.create_index('ix_preview_candidates_language_slot', 'preview_candidates', ['language', 'slot'], unique=False)
+    # Build the first pools here, as refresh_preview_pool does (default
+    # PREVIEW_POOL_SIZE and PREVIEW_POOL_PER_SPEAKER), so previews work
+    # before the refresh task has run
+    op.execute("""
+        INSERT INTO preview_candidates (
+            sample_id, language, category, gender, age_group, edu_level, domain, split,
+            speaker_id, sentence_id, sentence, storage_link, duration, snr, slot, refreshed_at
+        )
+        SELECT sample_id, language, category, gender, age_group, edu_level, domain, split,
+               speaker_id, sentence_id, sentence, storage_link, duration, snr, random(), now()
+        FROM (
+            SELECT ranked.*, row_number() OVER (
+                PARTITION BY language, category, gender, age_group, edu_level, domain, split
+                ORDER BY speaker_rank, random()
+            ) AS pool_rank
+            FROM (
+                SELECT id AS sample_id, language, category, gender, age_group, edu_level, domain, split,
+                       speaker_id, sentence_id, sentence, storage_link, duration, snr,
+                       row_number() OVER (
+                           PARTITION BY language, category, gender, age_group, edu_level, domain, split, speaker_id
+                           ORDER BY random()
+                       ) AS speaker_rank
+                FROM audiosample
+                WHERE language IS NOT NULL
+            ) ranked
+            WHERE speaker_rank <= 2
+        ) pooled
+        WHERE pool_rank <= 20
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_preview_candidates_language_slot', table_name='preview_candidates')
+    op.drop_table('preview_candidates')
@@ -0,0 +1,55 @@
+"""unique audiosample (language, sentence_id)
+
+Revision ID: 8d41b6e0a5f3
+Revises: 3f9a1c7d2e84
+Create Date: 2025-10-27 09:41:05.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41b6e0a5f3'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c7d2e84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Duplicates quoted in the error message
+_REPORTED = 20
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Catalog loads upsert on this key (src/ingest/loader.py). A sentence_id
+    # names one clip within a language: its audio lives at
+    # `<language>-test/<folder>/<sentence_id>.wav`, so the same id may be
+    # reused by another language but never within one.
+    duplicates = op.get_bind().execute(sa.text(f"""
+        SELECT language, sentence_id, count(*) AS n
+        FROM audiosample
+        WHERE sentence_id IS NOT NULL
+        GROUP BY language, sentence_id
+        HAVING count(*) > 1
+        ORDER BY n DESC, language, sentence_id
+        LIMIT {_REPORTED + 1}
+    """)).all()
+    if duplicates:
+        # Not deleted here: metadata and QA rows reference the samples, and
+        # which copy to keep is the catalog owner's call
+        listed = ", ".join(f"{language}/{sentence_id} ({n} rows)" for language, sentence_id, n in duplicates[:_REPORTED])
+        more = " and more" if len(duplicates) > _REPORTED else ""
+        raise RuntimeError(
+            f"audiosample has duplicate (language, sentence_id) rows: {listed}{more}. "
+            "Remove the extra rows, then run the upgrade again."
+        )
+    op.create_index(
+        'uq_audiosample_language_sentence_id', 'audiosample', ['language', 'sentence_id'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_audiosample_language_sentence_id', table_name='audiosample')
@@ -0,0 +1,28 @@
+"""add download_logs version
+
+Revision ID: a3d9f6b2c8e1
+Revises: f5c1a8e3b7d2
+Create Date: 2025-11-14 11:27:09.664310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9f6b2c8e1'
+down_revision: Union[str, Sequence[str], None] = 'f5c1a8e3b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('download_logs', sa.Column('version', sa.INTEGER(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('download_logs', 'version')
@@ -0,0 +1,44 @@
+"""add object inventory
+
+Revision ID: a7f3c9e2d1b6
+Revises: 8d41b6e0a5f3
+Create Date: 2025-11-03 14:22:47.530915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7f3c9e2d1b6'
+down_revision: Union[str, Sequence[str], None] = '8d41b6e0a5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('object_inventory',
+    sa.Column('bucket', sa.VARCHAR(), nullable=False),
+    sa.Column('key', sa.VARCHAR(), nullable=False),
+    sa.Column('prefix', sa.VARCHAR(), nullable=False),
+    sa.Column('sentence_id', sa.VARCHAR(), nullable=True),
+    sa.Column('sample_id', sa.VARCHAR(), nullable=True),
+    sa.Column('size_bytes', sa.BIGINT(), nullable=False),
+    sa.Column('etag', sa.VARCHAR(), nullable=True),
+    sa.Column('last_modified', postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('indexed_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('bucket', 'key')
+    )
+    op.create_index('ix_object_inventory_sample_id', 'object_inventory', ['sample_id'], unique=False)
+    op.create_index('ix_object_inventory_bucket_prefix', 'object_inventory', ['bucket', 'prefix'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_object_inventory_bucket_prefix', table_name='object_inventory')
+    op.drop_index('ix_object_inventory_sample_id', table_name='object_inventory')
+    op.drop_table('object_inventory')
@@ -0,0 +1,38 @@
+"""created_at not null on feedback and download_logs
+
+Revision ID: b1e6d3a9c4f7
+Revises: d8b4e1f6a2c9
+Create Date: 2025-11-19 09:41:08.204317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1e6d3a9c4f7'
+down_revision: Union[str, Sequence[str], None] = 'd8b4e1f6a2c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = (
+    ('feedback', sa.TIMESTAMP()),
+    ('download_logs', sa.DateTime(timezone=True)),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination orders and resumes on (created_at, id): a NULL key
+    # could neither be compared nor put in a cursor. Undated rows sort last.
+    for table, type_ in _COLUMNS:
+        op.execute(f"UPDATE {table} SET created_at = 'epoch' WHERE created_at IS NULL")
+        op.alter_column(table, 'created_at', existing_type=type_, nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, type_ in _COLUMNS:
+        op.alter_column(table, 'created_at', existing_type=type_, nullable=True)
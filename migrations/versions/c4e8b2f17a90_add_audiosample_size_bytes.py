@@ -0,0 +1,34 @@
+"""add audiosample size_bytes
+
+Revision ID: c4e8b2f17a90
+Revises: a7f3c9e2d1b6
+Create Date: 2025-11-10 11:05:12.671392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8b2f17a90'
+down_revision: Union[str, Sequence[str], None] = 'a7f3c9e2d1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('audiosample', sa.Column('size_bytes', sa.BIGINT(), nullable=True))
+    # Existing rows: copy sizes the inventory crawl already knows
+    op.execute("""
+        UPDATE audiosample a SET size_bytes = oi.size_bytes
+        FROM object_inventory oi
+        WHERE oi.sample_id = a.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('audiosample', 'size_bytes')
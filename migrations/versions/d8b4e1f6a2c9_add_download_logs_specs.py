@@ -0,0 +1,28 @@
+"""add download_logs specs
+
+Revision ID: d8b4e1f6a2c9
+Revises: a3d9f6b2c8e1
+Create Date: 2025-11-17 10:12:43.518207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b4e1f6a2c9'
+down_revision: Union[str, Sequence[str], None] = 'a3d9f6b2c8e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('download_logs', sa.Column('specs', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('download_logs', 'specs')
@@ -0,0 +1,94 @@
+"""add dashboard rollups
+
+Revision ID: e2b7d4a19c53
+Revises: c4e8b2f17a90
+Create Date: 2025-11-10 09:41:18.204551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7d4a19c53'
+down_revision: Union[str, Sequence[str], None] = 'c4e8b2f17a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('download_rollup',
+    sa.Column('day', sa.DATE(), nullable=False),
+    sa.Column('language', sa.VARCHAR(), nullable=False),
+    sa.Column('user_id', sa.VARCHAR(), nullable=False),
+    sa.Column('downloads', sa.INTEGER(), server_default='0', nullable=False),
+    sa.Column('failed', sa.INTEGER(), server_default='0', nullable=False),
+    sa.Column('samples', sa.BIGINT(), server_default='0', nullable=False),
+    sa.Column('bytes', sa.BIGINT(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('day', 'language', 'user_id')
+    )
+    op.create_table('download_progress_rollup',
+    sa.Column('dataset_id', sa.VARCHAR(), nullable=False),
+    sa.Column('percentage', postgresql.DOUBLE_PRECISION(), nullable=False),
+    sa.Column('downloads', sa.INTEGER(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('dataset_id', 'percentage')
+    )
+    op.create_table('dataset_rollup',
+    sa.Column('dataset_id', sa.VARCHAR(), nullable=False),
+    sa.Column('sample_count', sa.BIGINT(), server_default='0', nullable=False),
+    sa.Column('refreshed_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('dataset_id')
+    )
+    op.create_table('feedback_rollup',
+    sa.Column('day', sa.DATE(), nullable=False),
+    sa.Column('feedback_count', sa.INTEGER(), server_default='0', nullable=False),
+    sa.Column('rated', sa.INTEGER(), server_default='0', nullable=False),
+    sa.Column('rating_sum', sa.BIGINT(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+    # Backfill from the raw tables; from here on the app keeps them current.
+    # Sample and byte counts of past jobs were never recorded and stay 0.
+    op.execute("""
+        INSERT INTO download_rollup (day, language, user_id, downloads, failed)
+        SELECT (coalesce(updated_at, created_at) AT TIME ZONE 'UTC')::date,
+               lower(coalesce(language, 'unknown')), user_id,
+               count(*) FILTER (WHERE status = 'ready'),
+               count(*) FILTER (WHERE status = 'failed')
+        FROM download_logs
+        WHERE status IN ('ready', 'failed')
+        GROUP BY 1, 2, 3
+    """)
+    op.execute("""
+        INSERT INTO download_progress_rollup (dataset_id, percentage, downloads)
+        SELECT dataset_id, percentage, count(*)
+        FROM download_logs
+        WHERE status = 'ready' AND dataset_id IS NOT NULL
+        GROUP BY 1, 2
+    """)
+    op.execute("""
+        INSERT INTO dataset_rollup (dataset_id, sample_count)
+        SELECT dataset_id, count(*) FROM audiosample
+        WHERE dataset_id IS NOT NULL
+        GROUP BY 1
+    """)
+    # feedback.created_at is nullable; undated rows cannot be put on a day
+    op.execute("""
+        INSERT INTO feedback_rollup (day, feedback_count, rated, rating_sum)
+        SELECT created_at::date, count(*), count(rating), coalesce(sum(rating), 0)
+        FROM feedback
+        WHERE created_at IS NOT NULL
+        GROUP BY 1
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('feedback_rollup')
+    op.drop_table('dataset_rollup')
+    op.drop_table('download_progress_rollup')
+    op.drop_table('download_rollup')
@@ -0,0 +1,30 @@
+"""add keyset pagination indexes
+
+Revision ID: f5c1a8e3b7d2
+Revises: e2b7d4a19c53
+Create Date: 2025-11-12 16:05:33.718240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c1a8e3b7d2'
+down_revision: Union[str, Sequence[str], None] = 'e2b7d4a19c53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_download_logs_user_created_id', 'download_logs', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_feedback_created_id', 'feedback', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_feedback_created_id', table_name='feedback')
+    op.drop_index('ix_download_logs_user_created_id', table_name='download_logs')
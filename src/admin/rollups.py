@@ -0,0 +1,121 @@
+"""
+Incremental rollups behind the admin dashboard.
+
+Each event adds to its rollup row inside the transaction that records it:
+
+    export job finishes   -> download_rollup (+ download_progress_rollup)
+    feedback submitted    -> feedback_rollup
+    samples ingested      -> dataset_rollup
+
+so the dashboard reads a handful of pre-aggregated rows instead of counting
+`download_logs`, `feedback` and `audiosample` on every load. The migration
+that created the tables backfilled them from the raw rows.
+"""
+import logging
+from datetime import date, datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import (
+    AudioSample, DatasetRollup, DownloadLog, DownloadProgressRollup, DownloadRollup,
+    DownloadStatusEnum, Feedback, FeedbackRollup,
+)
+
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_LANGUAGE = "unknown"
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def _increment(model, keys: dict, counts: dict):
+    """INSERT the row, or add `counts` to the existing one."""
+    table = model.__table__
+    stmt = insert(table).values(**keys, **counts)
+    return stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: table.c[column] + stmt.excluded[column] for column in counts},
+    )
+
+
+async def record_job_finished(
+    session: AsyncSession,
+    job: DownloadLog,
+    samples: int = 0,
+    bytes_written: int = 0,
+) -> None:
+    """Count a job that just reached READY or FAILED. The caller commits."""
+    ready = job.status == DownloadStatusEnum.READY
+    keys = {
+        "day": _today(),
+        "language": (job.language or UNKNOWN_LANGUAGE).lower(),
+        "user_id": job.user_id,
+    }
+    await session.execute(_increment(DownloadRollup, keys, {
+        "downloads": int(ready),
+        "failed": int(not ready),
+        "samples": samples if ready else 0,
+        "bytes": bytes_written if ready else 0,
+    }))
+    if ready and job.dataset_id:
+        await session.execute(_increment(
+            DownloadProgressRollup,
+            {"dataset_id": job.dataset_id, "percentage": job.percentage},
+            {"downloads": 1},
+        ))
+
+
+async def record_feedback(session: AsyncSession, feedback: Feedback) -> None:
+    """Count a new feedback entry. The caller commits."""
+    # Stamp the row now (its column default only fires on flush) so it and its rollup day agree
+    if feedback.created_at is None:
+        feedback.created_at = datetime.now()
+    rating = feedback.rating
+    await session.execute(_increment(FeedbackRollup, {"day": feedback.created_at.date()}, {
+        "feedback_count": 1,
+        "rated": int(rating is not None),
+        "rating_sum": rating or 0,
+    }))
+
+
+async def add_dataset_samples(session: AsyncSession, dataset_id: str, count: int) -> None:
+    """Count `count` samples newly inserted into a dataset. The caller commits."""
+    await session.execute(_increment(DatasetRollup, {"dataset_id": dataset_id}, {"sample_count": count}))
+
+
+async def refresh_dataset_counts(session: AsyncSession, dataset_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Recount `dataset_rollup` from the catalog, for `dataset_ids` or every
+    dataset. Used after bulk loads, whose upserts do not say which rows are
+    new per dataset. Returns the number of datasets refreshed.
+    """
+    stmt = select(AudioSample.dataset_id, func.count()).group_by(AudioSample.dataset_id)
+    if dataset_ids is not None:
+        dataset_ids = list(dataset_ids)
+        if not dataset_ids:
+            return 0
+        stmt = stmt.where(AudioSample.dataset_id.in_(dataset_ids))
+    counts = dict((await session.execute(stmt)).all())
+    counts.pop(None, None)
+    # Datasets that lost all their samples still get a row, with zero
+    for dataset_id in dataset_ids or []:
+        counts.setdefault(dataset_id, 0)
+    if not counts:
+        return 0
+
+    table = DatasetRollup.__table__
+    stmt = insert(table).values([
+        {"dataset_id": dataset_id, "sample_count": count} for dataset_id, count in counts.items()
+    ])
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=["dataset_id"],
+        set_={"sample_count": stmt.excluded.sample_count, "refreshed_at": func.now()},
+    ))
+    logger.info(f"🔄 Dataset rollup refreshed for {len(counts)} dataset(s)")
+    return len(counts)
@@ -3,13 +3,15 @@ from src.auth.utils import get_current_user
 from src.auth.utils import TokenUser
 from src.admin.utils import generate_excel_template
 from fastapi.responses import Response
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query
 from typing import List, Annotated
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.db.db import get_session
 from src.admin.service import AdminService
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from .schemas import (
-    EngagementStats, DownloadProgress, FeedbackListResponse, UploadResult, ResponseSuccess
+    EngagementStats, DailyDownloads, UserDownloads, FeedbackStats,
+    DownloadProgress, FeedbackListResponse, UploadResult, ResponseSuccess
 )
 
 admin_router = APIRouter()
@@ -28,8 +30,35 @@ async def download_template(current_user: TokenUser = Depends(get_current_user))
 async def get_engagement_stats(
     session: Annotated[AsyncSession, Depends(get_session)],
     language: str | None = None,
+    days: Annotated[int | None, Query(ge=1, le=3660)] = None,
 ):
-    return await AdminService.aggregate_engagement(session, language)
+    return await AdminService.aggregate_engagement(session, language, days)
+
+
+@admin_router.get("/engagement/daily", response_model=List[DailyDownloads])
+async def get_daily_downloads(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    days: Annotated[int, Query(ge=1, le=366)] = 30,
+    language: str | None = None,
+):
+    return await AdminService.daily_downloads(session, days, language)
+
+
+@admin_router.get("/engagement/users", response_model=List[UserDownloads])
+async def get_top_downloaders(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    days: Annotated[int, Query(ge=1, le=366)] = 30,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
+    return await AdminService.top_downloaders(session, days, limit)
+
+
+@admin_router.get("/feedback-stats", response_model=List[FeedbackStats])
+async def get_feedback_stats(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    days: Annotated[int, Query(ge=1, le=366)] = 30,
+):
+    return await AdminService.feedback_stats(session, days)
 
 
 @admin_router.get("/download-progress/{dataset_id}", response_model=DownloadProgress)
@@ -43,21 +72,14 @@ async def get_progress(
 @admin_router.get("/feedback", response_model=FeedbackListResponse)
 async def get_feedbacks(
     session: Annotated[AsyncSession, Depends(get_session)],
-    language: str | None = None,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
 ):
-    rows = await AdminService.list_feedback(session, language)
-    response = [
-        {
-            "audio_id": audio.id,
-            "transcript": audio.transcription,
-            "submitted_at": fb.submitted_at,
-            "language": audio.language,
-            "gender": audio.gender,
-            "duration": audio.duration,
-        }
-        for fb, audio in rows
-    ]
-    return {"feedbacks": response}
+    try:
+        rows, next_cursor = await AdminService.list_feedback(session, cursor, limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return {"feedbacks": rows, "next_cursor": next_cursor}
 
 
 @admin_router.post("/upload-audio-excel", response_model=UploadResult)
@@ -68,14 +90,12 @@ async def upload_audio_with_excel(
     session: Annotated[AsyncSession, Depends(get_session)]
 ):
     try:
-        files_map = {file.filename: await file.read() for file in files}
-        excel_bytes = await excel.read()
-        uploaded_samples = await AdminService.upload_bulk_with_excel(
-            dataset_id, excel_bytes, files_map, session
+        sample_ids = await AdminService.upload_bulk_with_excel(
+            dataset_id, excel.file, files, session
         )
         return {
-            "uploaded_count": len(uploaded_samples),
-            "sample_ids": [s.id for s in uploaded_samples]
+            "uploaded_count": len(sample_ids),
+            "sample_ids": sample_ids
         }
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
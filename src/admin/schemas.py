@@ -1,31 +1,60 @@
 # src/admin/schemas.py
 from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 
 
 class EngagementStats(BaseModel):
     language: str
     download_count: int
+    failed_count: int
+    sample_count: int
+    bytes_downloaded: int
+
+
+class DailyDownloads(BaseModel):
+    day: date
+    download_count: int
+    failed_count: int
+    bytes_downloaded: int
+    user_count: int
+
+
+class UserDownloads(BaseModel):
+    user_id: str
+    download_count: int
+    bytes_downloaded: int
+
+
+class FeedbackStats(BaseModel):
+    day: date
     feedback_count: int
+    average_rating: Optional[float] = None
 
 
 class DownloadProgress(BaseModel):
     total: int
-    breakdown: dict[int, int]  # percentage -> count
+    breakdown: dict[float, int]  # percentage -> count
 
 
 class FeedbackItem(BaseModel):
-    audio_id: str
-    transcript: str
-    submitted_at: datetime
-    language: str
-    gender: str
-    duration: float
+    id: str
+    user_id: Optional[str] = None
+    fullname: Optional[str] = None
+    email: Optional[str] = None
+    rating: Optional[int] = None
+    issues: Optional[List[str]] = None
+    other_issue: Optional[str] = None
+    suggestions: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
 
 
 class FeedbackListResponse(BaseModel):
     feedbacks: List[FeedbackItem]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
 
 
 class UploadResult(BaseModel):
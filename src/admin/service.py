@@ -1,114 +1,225 @@
 from sqlmodel import select, func
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List
-import uuid, io, pandas as pd
-from src.db.models import AudioSample, Feedback, DownloadLog
-from src.download.s3_config import  SUPPORTED_LANGUAGES, s3_aws
+from typing import BinaryIO, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from fastapi import UploadFile
+import asyncio, io, logging, uuid, pandas as pd
+from src.admin.rollups import add_dataset_samples
+from src.db.bulk import copy_rows
+from src.db.pagination import DEFAULT_PAGE_SIZE, keyset_page
+from src.db.models import (
+    AudioSample, Dataset, Feedback, Split,
+    DatasetRollup, DownloadProgressRollup, DownloadRollup, FeedbackRollup,
+)
+from src.storage.registry import get_storage
+from src.ingest.manifest import manifest_records, validate_manifest
 from src.config import settings
 
-REQUIRED_COLUMNS = {
-    "transcript", 
-    "sample_rate", 
-    "snr", 
-    "audio_path", 
-    "language", 
-    "gender", 
-    "duration"
-}
+logger = logging.getLogger(__name__)
+
+
+def _since(days: int) -> date:
+  return datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+
+async def delete_uploads(storage, keys: List[str], concurrency: int):
+  """Best-effort removal of objects an aborted ingest already uploaded."""
+  if not keys:
+      return
+
+  def delete(key: str):
+      try:
+          storage.delete(key)
+      except Exception:
+          logger.exception(f"❌ Could not delete orphaned upload {key}")
+
+  loop = asyncio.get_running_loop()
+  with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest-cleanup") as pool:
+      await asyncio.gather(*(loop.run_in_executor(pool, delete, key) for key in list(keys)))
+  logger.warning(f"🧹 Ingest failed; deleted {len(keys)} uploaded clips")
 
-s3 = s3_aws
 
 class AdminService:
 
   def __init__(self, s3_bucket_name: str = settings.S3_BUCKET_NAME):
     self.s3_bucket_name = s3_bucket_name
 
+  # Dashboard reads: rollup tables only (see src/admin/rollups.py), so their
+  # cost depends on the days and languages shown, not on catalog or log size.
+
+  @staticmethod
+  async def aggregate_engagement(session: AsyncSession, language: str | None = None, days: int | None = None):
+    stmt = select(
+        DownloadRollup.language,
+        func.sum(DownloadRollup.downloads).label("download_count"),
+        func.sum(DownloadRollup.failed).label("failed_count"),
+        func.sum(DownloadRollup.samples).label("sample_count"),
+        func.sum(DownloadRollup.bytes).label("bytes_downloaded"),
+    ).group_by(DownloadRollup.language).order_by(DownloadRollup.language)
+
+    if language:
+        stmt = stmt.where(DownloadRollup.language == language.lower())
+    if days:
+        stmt = stmt.where(DownloadRollup.day >= _since(days))
+
+    result = await session.execute(stmt)
+    return result.all()
+
   @staticmethod
-  async def aggregate_engagement(session: AsyncSession, language: str | None = None):
+  async def daily_downloads(session: AsyncSession, days: int = 30, language: str | None = None):
     stmt = select(
-        AudioSample.language,
-        func.count(DownloadLog.id).label("download_count"),
-        func.count(Feedback.id).label("feedback_count"),
-    ).join(
-        DownloadLog, DownloadLog.dataset_id == AudioSample.dataset_id
-    ).group_by(AudioSample.language)
+        DownloadRollup.day,
+        func.sum(DownloadRollup.downloads).label("download_count"),
+        func.sum(DownloadRollup.failed).label("failed_count"),
+        func.sum(DownloadRollup.bytes).label("bytes_downloaded"),
+        func.count(DownloadRollup.user_id.distinct()).label("user_count"),
+    ).where(DownloadRollup.day >= _since(days)).group_by(DownloadRollup.day).order_by(DownloadRollup.day)
 
     if language:
-        stmt = stmt.where(AudioSample.language == language)
+        stmt = stmt.where(DownloadRollup.language == language.lower())
+
+    result = await session.execute(stmt)
+    return result.all()
 
+  @staticmethod
+  async def top_downloaders(session: AsyncSession, days: int = 30, limit: int = 20):
+    download_count = func.sum(DownloadRollup.downloads).label("download_count")
+    stmt = (
+        select(
+            DownloadRollup.user_id,
+            download_count,
+            func.sum(DownloadRollup.bytes).label("bytes_downloaded"),
+        )
+        .where(DownloadRollup.day >= _since(days))
+        .group_by(DownloadRollup.user_id)
+        .order_by(download_count.desc())
+        .limit(limit)
+    )
     result = await session.execute(stmt)
     return result.all()
 
   @staticmethod
   async def get_download_progress(session: AsyncSession, dataset_id: str):
-    total_stmt = select(func.count()).where(AudioSample.dataset_id == dataset_id)
-    total_result = await session.execute(total_stmt)
-    total = total_result.scalar_one()
+    total = await session.scalar(
+        select(DatasetRollup.sample_count).where(DatasetRollup.dataset_id == dataset_id)
+    )
 
     progress_stmt = (
-        select(DownloadLog.percentage, func.count())
-        .where(DownloadLog.dataset_id == dataset_id)
-        .group_by(DownloadLog.percentage)
+        select(DownloadProgressRollup.percentage, DownloadProgressRollup.downloads)
+        .where(DownloadProgressRollup.dataset_id == dataset_id)
     )
     progress_result = await session.execute(progress_stmt)
     downloads = dict(progress_result.all())
 
-    return {"total": total, "breakdown": downloads}
+    return {"total": total or 0, "breakdown": downloads}
 
   @staticmethod
-  async def list_feedback(session: AsyncSession, language: str | None = None, limit: int = 100):
+  async def feedback_stats(session: AsyncSession, days: int = 30):
     stmt = (
-      select(Feedback)
-      .order_by(Feedback.created_at.desc())
-      .limit(limit)
+        select(FeedbackRollup)
+        .where(FeedbackRollup.day >= _since(days))
+        .order_by(FeedbackRollup.day)
     )
+    rows = (await session.execute(stmt)).scalars().all()
+    return [
+        {
+            "day": row.day,
+            "feedback_count": row.feedback_count,
+            "average_rating": round(row.rating_sum / row.rated, 2) if row.rated else None,
+        }
+        for row in rows
+    ]
 
-    if language:
-      stmt = stmt.where(AudioSample.language == language)
-
-    result = await session.execute(stmt)
-    return result.all()
+  @staticmethod
+  async def list_feedback(session: AsyncSession, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Feedback, newest first, one keyset page at a time: (rows, next_cursor)."""
+    return await keyset_page(session, select(Feedback), Feedback.created_at, Feedback.id, cursor, limit)
 
   @staticmethod
   async def upload_bulk_with_excel(
       dataset_id: str,
-      excel_bytes: bytes,
-      files_map: dict[str, io.BytesIO],
-      session: AsyncSession
-  ) -> List[AudioSample]:
-      df = pd.read_excel(io.BytesIO(excel_bytes), engine="openpyxl")
-
-      if not REQUIRED_COLUMNS.issubset(df.columns):
-          raise ValueError(f"Missing columns: {REQUIRED_COLUMNS - set(df.columns)}")
-
-      uploaded = []
-
-      for _, row in df.iterrows():
-          key_in_excel = row["audio_path"]
-          if key_in_excel not in files_map:
-              raise ValueError(f"File not found in upload: {key_in_excel}")
-          file_obj = files_map[key_in_excel]
-
-          if row["language"] not in SUPPORTED_LANGUAGES:
-              raise ValueError(f"Unsupported language: {row['language']}")
-
-          sample_id = str(uuid.uuid4())
-          s3_key = f"datasets/{dataset_id}/{sample_id}.wav"
-          s3.upload_fileobj(file_obj, settings.S3_BUCKET_NAME, s3_key)
-
-          sample = AudioSample(
-              id=sample_id,
-              dataset_id=dataset_id,
-              audio_path=s3_key,
-              transcription=row["transcript"],
-              duration=float(row["duration"]),
-              language=row["language"],
-              sample_rate=int(row["sample_rate"]),
-              snr=float(row["snr"]),
-              gender=row["gender"],
-          )
-          session.add(sample)
-          uploaded.append(sample)
-
-      await session.commit()
-      return uploaded
+      excel: BinaryIO,
+      files: List[UploadFile],
+      session: AsyncSession,
+      batch_size: int | None = None,
+      concurrency: int | None = None,
+  ) -> List[str]:
+      """
+      Ingest a batch of clips described by an Excel sheet. Returns the new sample ids.
+
+      Uploads stay in their spooled temp files and are streamed to S3 by a
+      bounded thread pool, `batch_size` clips at a time. Each batch is written
+      into `audiosample` with one COPY; the whole upload commits (or rolls
+      back) as one transaction.
+      """
+      batch_size = batch_size or settings.INGEST_BATCH_SIZE
+      concurrency = concurrency or settings.INGEST_UPLOAD_CONCURRENCY
+
+      if await session.get(Dataset, dataset_id) is None:
+          raise ValueError(f"Unknown dataset: {dataset_id}")
+
+      files_map = {file.filename: file for file in files}
+      manifest = validate_manifest(pd.read_excel(excel, engine="openpyxl"), files_map.keys())
+      records = manifest_records(manifest)
+      total = len(records)
+      logger.info(f"📦 Ingesting {total} clips into dataset {dataset_id} ({batch_size} per batch)")
+
+      created_at = datetime.now()
+      uploaded_at = datetime.utcnow()  # naive, as the timestamp column and the model default are
+      storage = get_storage("aws")  # uploads one file per thread; parallelism is across files
+      loop = asyncio.get_running_loop()
+      sample_ids: List[str] = []
+      uploaded: List[str] = []  # keys to remove again if the ingest fails
+
+      def upload(file: UploadFile, key: str):
+          file.file.seek(0)
+          storage.upload_fileobj(key, file.file)
+          uploaded.append(key)
+
+      def size_of(file: UploadFile) -> int:
+          if file.size is not None:
+              return file.size
+          file.file.seek(0, io.SEEK_END)
+          return file.file.tell()
+
+      try:
+          with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest") as pool:
+              for start in range(0, total, batch_size):
+                  batch = records[start:start + batch_size]
+                  rows = []
+                  uploads = []
+                  for record in batch:
+                      sample_id = str(uuid.uuid4())
+                      key = f"datasets/{dataset_id}/{sample_id}.wav"
+                      file = files_map[record.pop("audio_path")]
+                      # Sized before the upload starts: size_of moves the file position
+                      size_bytes = size_of(file)
+                      uploads.append(loop.run_in_executor(pool, upload, file, key))
+                      rows.append({
+                          **record,
+                          "size_bytes": size_bytes,
+                          "id": sample_id,
+                          "dataset_id": dataset_id,
+                          "storage_link": key,
+                          "split": Split.train.value,
+                          "created_at": created_at,
+                          "uploaded_at": uploaded_at,
+                      })
+
+                  # Let every upload of the batch settle before failing, so none lands after the cleanup
+                  for result in await asyncio.gather(*uploads, return_exceptions=True):
+                      if isinstance(result, BaseException):
+                          raise result
+                  await copy_rows(session, AudioSample, rows)
+                  sample_ids.extend(row["id"] for row in rows)
+                  logger.info(f"⬆️ Ingest batch done: {len(sample_ids)}/{total} clips")
+
+          await add_dataset_samples(session, dataset_id, total)
+          await session.commit()
+      except BaseException:
+          # No row will point at these objects: remove them instead of orphaning them
+          await session.rollback()
+          await delete_uploads(storage, uploaded, concurrency)
+          raise
+      logger.info(f"✅ Ingested {total} clips into dataset {dataset_id}")
+      return sample_ids
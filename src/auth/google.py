@@ -1,5 +1,4 @@
 from fastapi.security import OAuth2PasswordBearer
-import requests
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 from src.db.db import get_session
@@ -7,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from fastapi.responses import RedirectResponse
 from src.auth.routes import validate
 from src.config import settings
+from src.core.http import get_http_client
 
 
 google_login = APIRouter()
@@ -41,12 +41,14 @@ async def auth_google(
         "redirect_uri": GOOGLE_REDIRECT_URI,
         "grant_type": "authorization_code",
     }
-    response = requests.post(token_url, data=data)
-    access_token = response.json().get("access_token")
-    user_info = requests.get("https://www.googleapis.com/oauth2/v1/userinfo", headers={"Authorization": f"Bearer {access_token}"})
-    print(user_info.json())
+    client = get_http_client()
+    token_response = await client.post(token_url, data=data)
+    access_token = token_response.json().get("access_token")
+    user_info_response = await client.get("https://www.googleapis.com/oauth2/v1/userinfo", headers={"Authorization": f"Bearer {access_token}"})
+    user_info = user_info_response.json()
+    print(user_info)
 
-    token = await validate(user_data=user_info.json(), request=request, session=session)
+    token = await validate(user_data=user_info, request=request, session=session)
 
     redirect = RedirectResponse(url="http://localhost:3000/test", status_code=302)
 
@@ -1,8 +1,178 @@
+import asyncio
+import logging
+import uuid
+from typing import List, Optional
+
+import httpx
 import resend
 from src.config import settings
+from src.core.http import get_http_client
+
+
+resend.api_key = settings.RESEND_API_KEY
+logger = logging.getLogger(__name__)
+
+
+class EmailOutbox:
+    """
+    In-process outbox for transactional email.
+
+    Request handlers only enqueue messages; a background task started in the
+    app lifespan drains the queue and sends up to `batch_size` messages per
+    call to Resend's batch endpoint, retrying with exponential backoff.
+    Signup and password-reset latency therefore no longer depends on Resend.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.EMAIL_BATCH_SIZE,
+        flush_interval: float = settings.EMAIL_FLUSH_INTERVAL_SECONDS,
+        max_retries: int = settings.EMAIL_MAX_RETRIES,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self):
+        """Start the sender task on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._spawn()
+        logger.info("✅ Email outbox started")
+
+    def _spawn(self, delay: float = 0):
+        self._worker = asyncio.create_task(self._run(delay), name="email-outbox")
+        self._worker.add_done_callback(self._on_worker_done)
+
+    def _on_worker_done(self, task: asyncio.Task):
+        # A sender that died on a bug is replaced, keeping the queued messages;
+        # otherwise every later email would fall back to blocking sends
+        if task.cancelled() or task.exception() is None or task is not self._worker:
+            return
+        logger.error("❌ Email outbox sender died, restarting", exc_info=task.exception())
+        self._spawn(delay=1)
+
+    async def stop(self):
+        """Send whatever is still queued, then stop the sender task."""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+        logger.info("✅ Email outbox stopped")
+
+    def enqueue(self, params: dict) -> bool:
+        """Queue a message without blocking. Returns False if the outbox is not running."""
+        if not self.running:
+            return False
+        self._queue.put_nowait(params)
+        return True
+
+    async def _run(self, delay: float = 0):
+        await asyncio.sleep(delay)
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+
+            # Give concurrent signups a moment to join the same batch
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                await self._send_batch(batch)
+            except Exception:
+                logger.exception(f"❌ Dropping {len(batch)} email(s) after an unexpected error")
+
+    async def _send_batch(self, batch: List[dict]):
+        """
+        Send `batch`. A batch the API rejects outright (a 4xx other than 429,
+        e.g. one invalid address) is split in halves and each half is sent on
+        its own, so only the messages that are themselves rejected are dropped.
+        """
+        rejected = await self._post_batch(batch)
+        if rejected is None:
+            return
+        if len(batch) == 1:
+            logger.error(
+                f"Dropping email {batch[0].get('subject')!r}: HTTP {rejected.status_code} {rejected.text}"
+            )
+            return
+        logger.warning(f"Email batch of {len(batch)} rejected with HTTP {rejected.status_code}, splitting it")
+        half = len(batch) // 2
+        await self._send_batch(batch[:half])
+        await self._send_batch(batch[half:])
+
+    async def _post_batch(self, batch: List[dict]) -> Optional[httpx.Response]:
+        """
+        POST one batch, retrying server errors, 429s and transport errors with
+        exponential backoff. Returns the response if the API rejected the batch
+        with a client error, else None (sent, or given up on).
+        """
+        client = get_http_client()
+        url = f"{settings.RESEND_API_URL.rstrip('/')}/emails/batch"
+        # One key for every attempt: a batch that was accepted before a timeout
+        # or a 5xx reached us is not delivered a second time by the retry
+        headers = {
+            "Authorization": f"Bearer {settings.RESEND_API_KEY}",
+            "Idempotency-Key": str(uuid.uuid4()),
+        }
+
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = await client.post(url, json=batch, headers=headers)
+                if response.status_code < 300:
+                    logger.info(f"Sent {len(batch)} email(s)")
+                    return None
+                # Client errors other than rate limiting will not succeed on retry
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    return response
+                logger.warning(f"[Attempt {attempt}] Email batch failed: HTTP {response.status_code}")
+            except httpx.HTTPError as e:
+                logger.warning(f"[Attempt {attempt}] Email batch failed: {e}")
+            except Exception as e:
+                logger.warning(f"[Attempt {attempt}] Email batch failed unexpectedly: {e!r}")
+            if attempt < self.max_retries:
+                await asyncio.sleep(2 ** attempt)  # exponential backoff
+
+        logger.error(f"❌ Giving up on {len(batch)} email(s) after {self.max_retries} attempts")
+        return None
+
 
+email_outbox = EmailOutbox()
+
+
+def _dispatch(params: dict, kind: str):
+    """Queue an email, or send it inline when no outbox is running (e.g. scripts)."""
+    if email_outbox.enqueue(params):
+        return
+
+    try:
+        email = resend.Emails.send(params)
+        print(email)
+    except Exception as e:
+        print(f"Error sending {kind} email: {e}")
 
-resend.api_key = settings.RESEND_API_KEY 
 
 def send_verification_email(to_email: str, name: str, verification_token: str):
     verification_link = f"{settings.FRONTEND_URL}/auth/verify-email?token={verification_token}"
@@ -24,11 +194,7 @@ def send_verification_email(to_email: str, name: str, verification_token: str):
         """
     }
 
-    try:
-        email = resend.Emails.send(params)
-        print(email)
-    except Exception as e:
-        print(f"Error sending verification email: {e}")
+    _dispatch(params, "verification")
 
 def send_reset_password_email(to_email: str, reset_token: str):
     reset_link = f"{settings.FRONTEND_URL}/auth/reset-password?token={reset_token}"
@@ -50,8 +216,4 @@ def send_reset_password_email(to_email: str, reset_token: str):
         """
     }
 
-    try:
-        email = resend.Emails.send(params)
-        print(email)
-    except Exception as e:
-        print(f"Error sending password reset email: {e}")
+    _dispatch(params, "password reset")
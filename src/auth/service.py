@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Any, Optional
 from sqlmodel import select
 from src.db.models import User, Feedback
+from src.admin.rollups import record_feedback
 from src.errors import (
     UserAlreadyExists,
     InvalidCredentials,
@@ -21,7 +22,7 @@ from .schemas import (
     ResetPasswordModel,
     ForgotPasswordModel, 
 )
-from .utils import generate_passwd_hash, verify_password
+from .utils import generate_passwd_hash_async, verify_password_async
 from .mail import send_verification_email, send_reset_password_email
 import uuid
 
@@ -60,7 +61,7 @@ class UserService:
 
         try:
             verification_token = str(uuid.uuid4())
-            hash_password = generate_passwd_hash(user_data.password)
+            hash_password = await generate_passwd_hash_async(user_data.password)
 
             new_user = User(
                 full_name=user_data.full_name,
@@ -114,7 +115,8 @@ class UserService:
             raise UserNotFound(
                 message="The user with this email does not exist"
             )
-        if not verify_password(password, user.password):
+        is_valid, new_hash = await verify_password_async(password, user.password)
+        if not is_valid:
             print("The password is not correct")
             raise InvalidCredentials(
                 message="The email or password is not correct"
@@ -123,6 +125,11 @@ class UserService:
             raise EmailNotVerified(
                 message="The email is not verified"
             )
+        if new_hash:
+            # Stored hash used outdated cost parameters; upgrade it transparently
+            user.password = new_hash
+            session.add(user)
+            await session.commit()
         await session.refresh(user)
         return user
 
@@ -168,7 +175,7 @@ class UserService:
     ) -> ResetPasswordSchemaResponseModel:
         """Reset the user's password"""
         # Update the user's password
-        user.password = generate_passwd_hash(payload.password)
+        user.password = await generate_passwd_hash_async(payload.password)
         user.verification_token = None
         session.add(user)
         await session.commit()
@@ -193,6 +200,7 @@ class UserService:
             )
 
             session.add(new_feedback)
+            await record_feedback(session, new_feedback)
             await session.commit()
             await session.refresh(new_feedback)
             return new_feedback
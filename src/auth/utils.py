@@ -1,6 +1,8 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Callable
+from typing import Any, Callable, Optional, Tuple
 from itsdangerous import URLSafeTimedSerializer
 
 import jwt, logging
@@ -17,7 +19,19 @@ from .schemas import LoginResponseModel, TokenUser
 from typing import Optional
 from fastapi.security import HTTPBearer
 
-passwd_context = CryptContext(schemes=["bcrypt"])
+# Hashes made with other cost parameters are flagged for upgrade on next login
+passwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a small thread pool keeps ~100ms hashes off the event loop.
+# Its size bounds how many hashes run at once; extra calls wait in the pool queue.
+_passwd_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="passwd-hash",
+)
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 logger = logging.getLogger(__name__)
 
@@ -45,6 +59,23 @@ def get_password_hash(password: str):
     return passwd_context.hash(password)
 
 
+async def generate_passwd_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool instead of the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_passwd_executor, generate_passwd_hash, password)
+
+
+async def verify_password_async(password: str, hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the hashing pool.
+
+    Returns (is_valid, new_hash). `new_hash` is set when the stored hash was made
+    with outdated cost parameters and should replace it.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_passwd_executor, passwd_context.verify_and_update, password, hash)
+
+
 # def create_access_token(
 #     user_data: dict, expiry: timedelta = None, refresh: bool = False
 # ):
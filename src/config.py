@@ -35,6 +35,7 @@ class Settings(BaseSettings):
     PGPASSWORD: str
     PGHOST: str
     PGPORT: int
+    PG_SSL: bool = True                      # disable for a local Postgres without TLS (benchmarks)
 
     REDIS_PORT: int
     REDIS_HOST: str
@@ -46,6 +47,90 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: Optional[str] = None
     CELERY_RESULT_BACKEND: Optional[str] = None
 
+    # Metrics (see src/core/metrics.py); served on their own ports, never on the public API
+    CELERY_METRICS_PORT: int = 9808
+    API_METRICS_PORT: int = 9809
+
+    # Tracing (see src/core/tracing.py)
+    TRACE_SAMPLE_RATE: float = 0.1           # share of exports traced end to end
+    TRACE_EXPORTER: str = "none"             # none | file | console | otlp
+    TRACE_FILE_PATH: str = "traces.jsonl"
+
+    # Logging (see src/logging_config.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_RATE: float = 0.1             # share of DEBUG/INFO hot-path records kept
+
+    # Outbound HTTP (see src/core/http.py)
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+
+    # Email outbox (see src/auth/mail.py)
+    RESEND_API_URL: str = "https://api.resend.com"
+    EMAIL_BATCH_SIZE: int = 50               # Resend accepts up to 100 per batch
+    EMAIL_FLUSH_INTERVAL_SECONDS: float = 1.0
+    EMAIL_MAX_RETRIES: int = 5
+
+    # Password hashing (see src/auth/utils.py)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Preview pools (see src/download/preview_pool.py)
+    PREVIEW_POOL_SIZE: int = 20              # candidates kept per facet combination
+    PREVIEW_POOL_PER_SPEAKER: int = 2        # max clips per speaker in a combination
+    PREVIEW_POOL_REFRESH_SECONDS: int = 3600
+    PREVIEW_URL_TTL_SECONDS: int = 3600
+    PREVIEW_URL_REFRESH_MARGIN_SECONDS: int = 300
+
+    # Object inventory (see src/download/inventory.py)
+    INVENTORY_CRAWL_SECONDS: int = 6 * 3600
+    INVENTORY_CRAWL_CONCURRENCY: int = 8     # prefixes listed in parallel
+    INVENTORY_SKIP_MISSING: bool = False     # exports/estimates/previews ignore clips not in the inventory
+
+    # Bulk ingest (see AdminService.upload_bulk_with_excel)
+    INGEST_BATCH_SIZE: int = 500             # clips uploaded and COPYed per batch
+    INGEST_UPLOAD_CONCURRENCY: int = 16      # concurrent S3 uploads
+
+    # Export job status (see src/core/job_status.py)
+    EXPORT_STATUS_TTL_SECONDS: int = 24 * 3600   # how long a job's status stays cached in Redis
+    EXPORT_STATUS_MAX_WAIT_SECONDS: int = 60     # longest ?wait= a status long-poll may hold
+    EXPORT_STATUS_CACHED_JOBS: int = 10_000      # job statuses kept in memory per API process
+    EXPORT_STATUS_STREAM_LENGTH: int = 10_000    # status events kept in Redis for Last-Event-ID resume
+    EXPORT_STATUS_SSE_KEEPALIVE_SECONDS: float = 15.0
+    EXPORT_STATUS_SSE_MAX_PENDING: int = 100     # events a slow SSE client may fall behind before it is cut off
+    EXPORT_STATUS_REPLAY_MAX_EVENTS: int = 2_000 # stream entries read to resume one SSE client; further behind gets a reset
+
+    # Export clip fetching (see src/tasks/export_pipeline.py)
+    EXPORT_FETCH_CONCURRENCY: int = 16       # concurrent OBS downloads per export
+    EXPORT_PREFETCH_WINDOW: int = 32         # clips fetched ahead of the archive writer
+    EXPORT_BATCH_MAX_SPECS: int = 8          # filter specs in one batch export
+
+    # Fan-out exports (see src/tasks/fanout_export.py)
+    EXPORT_FANOUT_ENABLED: bool = False      # a worker also takes queued exports of the same language
+    EXPORT_FANOUT_MAX_JOBS: int = 8          # archives per worker; each buffers about two upload parts
+
+    # Sharded exports (see src/tasks/shard_export.py)
+    EXPORT_SHARD_BYTES: int = 1024 ** 3      # target size of one shard
+    EXPORT_SHARD_UPLOAD_CONCURRENCY: int = 4 # shard parts uploaded in parallel
+    EXPORT_PARQUET_ROW_GROUP_BYTES: int = 64 * 1024 ** 2  # audio buffered per Parquet row group
+
+    # Clip cache (see src/download/clip_cache.py)
+    CLIP_CACHE_DIR: str = ""                 # shared by the workers of a host; empty disables the cache
+    CLIP_CACHE_MAX_BYTES: int = 50 * 1024 ** 3
+
+    # Audio proxy (see src/download/audio_proxy.py)
+    AUDIO_PROXY_MEMORY_BYTES: int = 256 * 1024 ** 2         # hot clips kept in memory per API process
+    AUDIO_PROXY_MEMORY_MAX_CLIP_BYTES: int = 8 * 1024 ** 2  # larger clips are only cached on disk
+    AUDIO_PROXY_REVALIDATE_SECONDS: int = 3600   # cached clips served without checking OBS
+    AUDIO_PROXY_MAX_AGE_SECONDS: int = 86400     # Cache-Control max-age for browsers (private)
+    PREVIEW_SIGNED_URLS: bool = True             # previews also carry a signed OBS link (audio_url_obs)
+
+    # Storage backends (see src/storage/registry.py)
+    STORAGE_BACKEND: str = "s3"              # s3 | local (both buckets under STORAGE_LOCAL_ROOT)
+    STORAGE_LOCAL_ROOT: str = "./local_storage"
+    STORAGE_MAX_POOL_CONNECTIONS: int = 0    # connections per client; 0 sizes it to the largest concurrency setting
+    OBS_SIGNATURE: str = "obs-v2"            # obs-v2 (OBS share links) | s3v4 (S3 presigned URLs, e.g. moto)
+
     model_config = SettingsConfigDict(
         env_file=".env", 
         extra="ignore",
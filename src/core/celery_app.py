@@ -1,5 +1,5 @@
 # app/celery.py
-from celery import Celery
+from celery import Celery, signals
 from src.config import settings
 
 
@@ -10,7 +10,7 @@ celery_app = Celery(
     'data_export_tasks',  # Name of the Celery app
     broker=CELERY_BROKER_URL,
     backend=CELERY_RESULT_BACKEND, # Or a separate result backend
-    include=['src.tasks.export_worker'] # List of modules containing tasks
+    include=['src.tasks.export_worker', 'src.tasks.batch_export_worker', 'src.tasks.preview_worker', 'src.tasks.inventory_worker'] # List of modules containing tasks
 )
 
 # Optional: Configuration for timezones, etc.
@@ -23,4 +23,36 @@ celery_app.conf.update(
     # Configure retry behavior for transient S3 errors
     task_acks_late=True,
     worker_prefetch_multiplier=1
-)
\ No newline at end of file
+)
+
+# Periodic jobs (run with `celery -A src.core.celery_app beat`)
+celery_app.conf.beat_schedule = {
+    "refresh-preview-pools": {
+        "task": "previews.refresh_preview_pools",
+        "schedule": settings.PREVIEW_POOL_REFRESH_SECONDS,
+    },
+    "crawl-object-inventory": {
+        "task": "inventory.crawl",
+        "schedule": settings.INVENTORY_CRAWL_SECONDS,
+    },
+}
+
+@signals.worker_ready.connect
+def start_worker_metrics(**kwargs):
+    """Expose worker-side export metrics for Prometheus."""
+    from src.core.metrics import start_metrics_exporter
+    start_metrics_exporter(settings.CELERY_METRICS_PORT)
+
+
+@signals.worker_process_shutdown.connect
+def drop_worker_process_metrics(pid=None, **kwargs):
+    from src.core.metrics import mark_process_dead
+    if pid:
+        mark_process_dead(pid)
+
+
+@signals.setup_logging.connect
+def configure_worker_logging(**kwargs):
+    """Make workers log through the same queue handlers as the API."""
+    from src.logging_config import setup_logging
+    setup_logging()
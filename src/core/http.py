@@ -0,0 +1,47 @@
+import logging
+from typing import Optional
+
+import httpx
+
+from src.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    )
+
+
+def init_http_client() -> httpx.AsyncClient:
+    """Create the shared outbound HTTP client (call from the app lifespan)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = _build_http_client()
+        logger.info("✅ Shared HTTP client created")
+    return _http_client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared, connection-pooled HTTP client.
+    Falls back to creating it lazily for scripts that do not run the lifespan.
+    """
+    return _http_client or init_http_client()
+
+
+async def close_http_client():
+    """Close the shared HTTP client (call on app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("✅ Shared HTTP client closed")
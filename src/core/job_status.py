@@ -0,0 +1,354 @@
+"""
+Export job status: versioned, cached in Redis, pushed to API processes.
+
+Every change to a `DownloadLog` row bumps its `version` (see
+`update_export_job_status`). The new status is written to Redis under
+`export-status:<job_id>` and appended to the `export-status:events` stream
+(capped at EXPORT_STATUS_STREAM_LENGTH). The write only ever replaces an
+older version, so an API process refilling the cache from the database
+cannot overwrite a newer update from the worker.
+
+Each API process runs one `StatusHub` (started in the app lifespan) that
+reads the stream. It keeps the latest status of recently updated jobs in
+memory, wakes long-poll requests waiting on a job and feeds the SSE
+subscriptions of the job's id or user. A status poll is answered from
+memory, then Redis, and only then the database; the version doubles as
+the ETag, so an unchanged job costs a `304`.
+
+Stream entry ids are global, which makes them the SSE event ids: a client
+reconnecting with `Last-Event-ID` to any API process gets the events it
+missed from `replay_events`. One whose Last-Event-ID is no longer in the
+stream (trimmed, or too far behind to replay) gets a `reset` event and a
+fresh snapshot instead.
+"""
+import asyncio
+import json
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.config import settings
+from src.db.redis import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_KEY = "export-status:{job_id}"
+STATUS_STREAM = "export-status:events"
+FINISHED_STATUSES = ("ready", "failed", "cancelled")
+FALLBACK_POLL_SECONDS = 1.0   # long-poll re-check interval while the hub is not connected
+RECONNECT_MAX_SECONDS = 30.0
+READ_BLOCK_MS = 30_000
+REPLAY_PAGE_SIZE = 500
+
+# SET if newer than the cached version; with ARGV[4] set, also XADD the status to that stream
+CACHE_IF_NEWER = """
+local current = redis.call('GET', KEYS[1])
+if current and cjson.decode(current)['version'] >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', tonumber(ARGV[3]))
+if ARGV[4] ~= '' then
+    redis.call('XADD', ARGV[4], 'MAXLEN', '~', ARGV[5], '*', 'status', ARGV[1])
+end
+return 1
+"""
+
+
+def status_payload(job) -> dict:
+    """JSON-ready status of a `DownloadLog` row, as served by the status endpoint."""
+    from src.schemas.export import ExportJobStatus
+
+    payload = ExportJobStatus.model_validate(job, from_attributes=True).model_dump(mode="json")
+    payload["user_id"] = job.user_id
+    payload["version"] = job.version or 0
+    return payload
+
+
+def status_etag(payload: dict) -> str:
+    return f'"{payload["id"]}.{payload["version"]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def stream_id_key(event_id: str) -> Tuple[int, int]:
+    """Sort key of a stream entry id ("<ms>-<seq>"); raises ValueError if malformed."""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def sse_reset_frame(event_id: str) -> bytes:
+    """A `reset` event: drop what you know, the status snapshot that follows replaces it."""
+    return f"id: {event_id}\nevent: reset\ndata: {{}}\n\n".encode()
+
+
+def sse_frame(payload: dict, event_id: Optional[str] = None) -> bytes:
+    """One `status` event in text/event-stream format."""
+    data = json.dumps({k: v for k, v in payload.items() if k != "user_id"}, separators=(",", ":"))
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: status\ndata: {data}\n\n".encode()
+
+
+async def cache_status(payload: dict, publish: bool = False) -> bool:
+    """Store `payload` unless Redis already has a newer version. Never raises."""
+    try:
+        return bool(await get_redis_client().eval(
+            CACHE_IF_NEWER, 1, STATUS_KEY.format(job_id=payload["id"]),
+            json.dumps(payload), payload["version"], settings.EXPORT_STATUS_TTL_SECONDS,
+            STATUS_STREAM if publish else "", settings.EXPORT_STATUS_STREAM_LENGTH,
+        ))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not cache status of job {payload.get('id')}: {e}")
+        return False
+
+
+async def publish_job_status(job) -> None:
+    """Cache a job's new status and announce it to every API process."""
+    await cache_status(status_payload(job), publish=True)
+
+
+async def read_status(job_id: str) -> tuple[Optional[dict], str]:
+    """The job's latest status and where it came from (memory, redis or db)."""
+    payload = status_hub.latest(job_id)
+    if payload is not None:
+        return payload, "memory"
+
+    try:
+        cached = await get_redis_client().get(STATUS_KEY.format(job_id=job_id))
+        if cached:
+            return json.loads(cached), "redis"
+    except Exception as e:
+        logger.warning(f"⚠️ Status cache unavailable: {e}")
+
+    from src.crud.crud_export import get_export_job
+    from src.db.db import get_async_session_maker
+
+    # Own short session: a long-poll must not hold a pooled connection while it waits
+    async with get_async_session_maker()() as session:
+        job = await get_export_job(session, job_id)
+        if job is None:
+            return None, "db"
+        payload = status_payload(job)
+    await cache_status(payload)
+    return payload, "db"
+
+
+async def stream_head() -> str:
+    """Id of the newest status event, or "0-0"."""
+    newest = await get_redis_client().xrevrange(STATUS_STREAM, "+", "-", count=1)
+    return newest[0][0] if newest else "0-0"
+
+
+async def replay_events(
+    after_id: str,
+    job_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    max_events: int = settings.EXPORT_STATUS_REPLAY_MAX_EVENTS,
+) -> Optional[List[Tuple[str, dict]]]:
+    """
+    Status events after `after_id` for a job or a user, oldest first. Reads
+    only the entries after `after_id`, a page at a time. None when events
+    after `after_id` may already have been trimmed from the stream, or when
+    more than `max_events` entries follow it: the caller resets the client.
+    """
+    after = stream_id_key(after_id)
+    client = get_redis_client()
+    oldest = await client.xrange(STATUS_STREAM, "-", "+", count=1)
+    if oldest and stream_id_key(oldest[0][0]) > after:
+        return None
+
+    events = []
+    scanned = 0
+    cursor = after_id
+    while True:
+        page = await client.xrange(STATUS_STREAM, f"({cursor}", "+", count=min(REPLAY_PAGE_SIZE, max_events - scanned + 1))
+        for event_id, fields in page:
+            payload = json.loads(fields["status"])
+            if (job_id and payload["id"] == job_id) or (user_id and payload.get("user_id") == user_id):
+                events.append((event_id, payload))
+        scanned += len(page)
+        if scanned > max_events:
+            return None
+        if len(page) < REPLAY_PAGE_SIZE:
+            return events
+        cursor = page[-1][0]
+
+
+class Subscription:
+    """
+    Events for one SSE client. The hub pushes pre-rendered frames; a client
+    that falls `max_pending` events behind is marked `dropped` and should
+    reconnect with Last-Event-ID.
+    """
+
+    def __init__(self, job_id: Optional[str], user_id: Optional[str], max_pending: int):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self.dropped = False
+        self._pending: deque = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, event_id: str, payload: dict, frame: bytes):
+        if len(self._pending) >= self.max_pending:
+            self.dropped = True
+        else:
+            self._pending.append((event_id, payload, frame))
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[Tuple[str, dict, bytes]]:
+        """The next event, or None after `timeout` seconds without one."""
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._pending.popleft() if self._pending else None
+
+
+class StatusHub:
+    """
+    Per-process reader of the status stream: an in-memory cache of recent
+    job statuses, wake-ups for long-polls, and SSE fan-out. Each event is
+    parsed and rendered once, then handed to the subscriptions of its job
+    and its user only.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int = settings.EXPORT_STATUS_CACHED_JOBS,
+        max_pending: int = settings.EXPORT_STATUS_SSE_MAX_PENDING,
+    ):
+        self.max_jobs = max_jobs
+        self.max_pending = max_pending
+        self.connected = False
+        self._latest: "OrderedDict[str, dict]" = OrderedDict()
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        self._by_job: Dict[str, Set[Subscription]] = {}
+        self._by_user: Dict[str, Set[Subscription]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the stream reader task on the running event loop."""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="export-status-hub")
+        logger.info("✅ Export status hub started")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._reset()
+        logger.info("✅ Export status hub stopped")
+
+    def latest(self, job_id: str) -> Optional[dict]:
+        """Latest status seen on the stream; only trusted while connected."""
+        return self._latest.get(job_id) if self.connected else None
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """Return when `job_id` publishes a new status, or after `timeout` seconds."""
+        if not self.connected:
+            await asyncio.sleep(min(timeout, FALLBACK_POLL_SECONDS))
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job_id, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    def subscribe(self, job_id: Optional[str] = None, user_id: Optional[str] = None) -> Subscription:
+        """Receive the events of `job_id`, or of every job of `user_id`."""
+        subscription = Subscription(job_id, user_id, self.max_pending)
+        if job_id:
+            self._by_job.setdefault(job_id, set()).add(subscription)
+        if user_id:
+            self._by_user.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for index, key in ((self._by_job, subscription.job_id), (self._by_user, subscription.user_id)):
+            group = index.get(key)
+            if group is not None:
+                group.discard(subscription)
+                if not group:
+                    del index[key]
+
+    def dispatch(self, event_id: str, payload: dict):
+        job_id = payload["id"]
+        current = self._latest.get(job_id)
+        if current is None or current["version"] < payload["version"]:
+            self._latest[job_id] = payload
+            self._latest.move_to_end(job_id)
+            while len(self._latest) > self.max_jobs:
+                self._latest.popitem(last=False)
+
+        for waiter in self._waiters.pop(job_id, ()):
+            if not waiter.done():
+                waiter.set_result(None)
+
+        subscriptions = self._by_job.get(job_id, set()) | self._by_user.get(payload.get("user_id"), set())
+        if subscriptions:
+            frame = sse_frame(payload, event_id)
+            for subscription in subscriptions:
+                subscription.push(event_id, payload, frame)
+
+    def _reset(self):
+        """Forget cached statuses (updates may have been missed) and wake all waiters to re-read."""
+        self.connected = False
+        self._latest.clear()
+        waiters, self._waiters = self._waiters, {}
+        for group in waiters.values():
+            for waiter in group:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def _run(self):
+        backoff = FALLBACK_POLL_SECONDS
+        last_id = None
+        while True:
+            try:
+                client = get_redis_client()
+                if last_id is None:
+                    last_id = await stream_head()
+                self.connected = True
+                backoff = FALLBACK_POLL_SECONDS
+                while True:
+                    response = await client.xread({STATUS_STREAM: last_id}, block=READ_BLOCK_MS, count=500)
+                    for _, entries in response:
+                        for event_id, fields in entries:
+                            last_id = event_id
+                            self.dispatch(event_id, json.loads(fields["status"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Export status hub lost Redis, retrying in {backoff:.0f}s: {e}")
+            finally:
+                self._reset()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+
+
+status_hub = StatusHub()
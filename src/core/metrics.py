@@ -0,0 +1,157 @@
+"""
+Prometheus metrics for the API and the Celery export workers.
+
+Metric names follow the function they measure, so a slow
+`obs_get_object_seconds` points straight at the OBS fetch in
+`async_create_dataset_zip_s3_impl`.
+
+The API (API_METRICS_PORT) and the Celery workers (CELERY_METRICS_PORT)
+each serve `/metrics` on a port of their own, so the scrape endpoint is not
+reachable through the public API. With several processes (Celery prefork,
+multiple uvicorn workers), set PROMETHEUS_MULTIPROC_DIR to an empty
+directory shared by those processes; the exporter then aggregates all of
+them.
+"""
+import logging
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds; DB/network calls are mostly sub-second, exports can run for minutes
+FAST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SLOW_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+FILTER_CORE_QUERY_SECONDS = Histogram(
+    "filter_core_query_seconds",
+    "Time spent in DownloadService.filter_core queries",
+    ["query"],  # count | select
+    buckets=FAST_BUCKETS,
+)
+FILTER_CORE_STREAM_QUERY_SECONDS = Histogram(
+    "filter_core_stream_query_seconds",
+    "Time spent in DownloadService.filter_core_stream queries",
+    ["query"],  # count | open_stream
+    buckets=FAST_BUCKETS,
+)
+OBS_GET_OBJECT_SECONDS = Histogram(
+    "obs_get_object_seconds",
+    "Latency of s3_obs.get_object until the response headers arrive",
+    buckets=FAST_BUCKETS,
+)
+OBS_GET_OBJECT_BYTES = Counter(
+    "obs_get_object_bytes",
+    "Audio bytes read from OBS object bodies",
+)
+OBS_GET_OBJECT_ERRORS = Counter(
+    "obs_get_object_errors",
+    "OBS get_object calls that failed (missing or unreadable audio)",
+)
+ZIP_BYTES_PRODUCED = Counter(
+    "zip_bytes_produced",
+    "Bytes of ZIP archive produced for exports",
+    ["path"],  # worker | api
+)
+MULTIPART_UPLOAD_PART_SECONDS = Histogram(
+    "multipart_upload_part_seconds",
+    "Latency of a single S3 upload_part call",
+    ["path"],  # worker | api
+    buckets=FAST_BUCKETS,
+)
+EXPORT_QUEUE_WAIT_SECONDS = Histogram(
+    "export_queue_wait_seconds",
+    "Time between an export job being created and a worker starting it",
+    buckets=SLOW_BUCKETS,
+)
+EXPORT_DURATION_SECONDS = Histogram(
+    "export_duration_seconds",
+    "Wall time of async_create_dataset_zip_s3_impl",
+    ["outcome"],  # ready | failed
+    buckets=SLOW_BUCKETS,
+)
+EXPORT_FANOUT_JOBS = Histogram(
+    "export_fanout_jobs",
+    "Export jobs built together from one clip stream by a fan-out worker",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16),
+)
+EXPORT_FANOUT_SHARED_CLIPS = Counter(
+    "export_fanout_shared_clips",
+    "Clips written into an archive from a fetch made for another job of its group",
+)
+CLIP_CACHE_REQUESTS = Counter(
+    "clip_cache_requests",
+    "OBS clip reads through the worker disk cache",
+    ["result"],  # hit | miss | stale
+)
+CLIP_CACHE_EVICTED_BYTES = Counter(
+    "clip_cache_evicted_bytes",
+    "Bytes removed from the worker disk cache to stay under CLIP_CACHE_MAX_BYTES",
+)
+AUDIO_PROXY_RESPONSES = Counter(
+    "audio_proxy_responses",
+    "GET /download/audio responses",
+    ["source", "status"],  # memory | disk | obs, 200 | 206 | 304 | 416
+)
+EXPORT_STATUS_WS_SUBSCRIBERS = Gauge(
+    "export_status_ws_subscribers",
+    "Open /ws/export-status WebSocket connections",
+    multiprocess_mode="livesum",
+)
+EXPORT_STATUS_SSE_SUBSCRIBERS = Gauge(
+    "export_status_sse_subscribers",
+    "Open /exports/events SSE streams",
+    multiprocess_mode="livesum",
+)
+EXPORT_STATUS_RESPONSES = Counter(
+    "export_status_responses",
+    "GET /exports/status responses",
+    ["result", "source"],  # ok | not_modified, memory | redis | db
+)
+DB_POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+    ["pool"],  # async | sync
+    buckets=FAST_BUCKETS,
+)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry to expose: the multi-process aggregate if enabled, else this process."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def start_metrics_exporter(port: int):
+    """Serve /metrics on `port` from a background thread (Celery workers and the API)."""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        logger.warning(
+            "PROMETHEUS_MULTIPROC_DIR is not set; the exporter only sees the process "
+            "that started it, not its sibling workers"
+        )
+    try:
+        start_http_server(port, registry=metrics_registry())
+    except OSError as e:
+        # Another worker process of this host got the port first and serves the same metrics
+        logger.info(f"Metrics exporter not started on :{port}: {e}")
+        return
+    logger.info(f"✅ Metrics exporter listening on :{port}")
+
+
+def mark_process_dead(pid: int):
+    """Drop live gauges of an exited process in multi-process mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
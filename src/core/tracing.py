@@ -0,0 +1,133 @@
+"""
+OpenTelemetry tracing for the export pipeline.
+
+`init_tracing` sets up a TracerProvider for the current process:
+  - sampling: ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATE)), so Celery
+    tasks follow the decision taken when the API enqueued the job
+  - exporter (TRACE_EXPORTER): "file" writes JSON lines to TRACE_FILE_PATH,
+    "console" prints spans, "otlp" ships them to a collector (needs
+    opentelemetry-exporter-otlp), "none" disables export
+
+Context, including the `export.job_id` baggage entry, crosses into Celery
+through the task message headers (`inject_headers` / `extract_task_context`).
+`JobIdSpanProcessor` copies the job id onto every span, so one export can be
+shown as a single waterfall.
+"""
+import logging
+import os
+import threading
+from typing import Optional, Sequence
+
+from opentelemetry import baggage, context, propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from src.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_KEY = "export.job_id"
+
+tracer = trace.get_tracer("africanvoices.exports")
+
+_initialized_pid: Optional[int] = None
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Append finished spans to a local file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(span.to_json(indent=None) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+class JobIdSpanProcessor(SpanProcessor):
+    """Tag every span started under an export with the job id from baggage."""
+
+    def on_start(self, span: Span, parent_context: Optional[context.Context] = None):
+        job_id = baggage.get_baggage(JOB_ID_KEY, parent_context)
+        if job_id:
+            span.set_attribute(JOB_ID_KEY, str(job_id))
+
+
+def _build_exporter() -> Optional[SpanExporter]:
+    kind = settings.TRACE_EXPORTER.lower()
+    if kind == "file":
+        return JsonLinesSpanExporter(settings.TRACE_FILE_PATH)
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACE_EXPORTER=otlp but opentelemetry-exporter-otlp is not installed")
+            return None
+        return OTLPSpanExporter()
+    return None
+
+
+def init_tracing(service_name: str):
+    """
+    Configure tracing once per process. Safe to call repeatedly; it
+    re-runs after a fork so Celery prefork children get their own exporter thread.
+    """
+    global _initialized_pid
+    if _initialized_pid == os.getpid():
+        return
+    _initialized_pid = os.getpid()
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACE_SAMPLE_RATE)),
+    )
+    provider.add_span_processor(JobIdSpanProcessor())
+    exporter = _build_exporter()
+    if exporter is not None:
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+
+    trace.set_tracer_provider(provider)
+    logger.info(f"✅ Tracing initialised for {service_name} ({settings.TRACE_EXPORTER})")
+
+
+def with_job_id(job_id: str, ctx: Optional[context.Context] = None) -> context.Context:
+    """Return a context carrying `job_id` as baggage."""
+    return baggage.set_baggage(JOB_ID_KEY, str(job_id), ctx)
+
+
+def inject_headers(ctx: Optional[context.Context] = None) -> dict:
+    """W3C trace context + baggage headers for an outgoing Celery message."""
+    carrier: dict = {}
+    propagate.inject(carrier, context=ctx)
+    return carrier
+
+
+def extract_task_context(request) -> context.Context:
+    """
+    Rebuild the caller's context from a Celery task request.
+    Depending on the protocol, custom headers appear under `request.headers`
+    or as plain request attributes.
+    """
+    headers = getattr(request, "headers", None) or {}
+    carrier = {}
+    for key in ("traceparent", "tracestate", "baggage"):
+        value = headers.get(key) or getattr(request, key, None)
+        if value:
+            carrier[key] = value
+    return propagate.extract(carrier)
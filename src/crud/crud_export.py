@@ -1,17 +1,33 @@
 # app/crud/crud_export.py
 
 import uuid
-from typing import Optional
+from typing import List, Optional, Tuple
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.admin.rollups import record_job_finished
+from src.core.job_status import publish_job_status
 from src.db.models import DownloadLog, DownloadStatusEnum
+from src.db.pagination import DEFAULT_PAGE_SIZE, keyset_page
 from src.schemas.export import ExportJobCreate
 
+FINISHED_STATUSES = (DownloadStatusEnum.READY, DownloadStatusEnum.FAILED)
+
+
 async def get_export_job(session: AsyncSession, job_id: str) -> Optional[DownloadLog]:
     """Reads a single export job from the database by its ID."""
     return await session.get(DownloadLog, job_id)
 
+async def list_export_jobs(
+    session: AsyncSession,
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[List[DownloadLog], Optional[str]]:
+    """A user's export jobs, newest first, one keyset page at a time."""
+    stmt = select(DownloadLog).where(DownloadLog.user_id == user_id)
+    return await keyset_page(session, stmt, DownloadLog.created_at, DownloadLog.id, cursor, limit)
+
 async def create_export_job(session: AsyncSession, job_create: ExportJobCreate) -> DownloadLog:
     """Creates a new export job record in the database."""
     # Create a database model instance from the schema data
@@ -19,11 +35,13 @@ async def create_export_job(session: AsyncSession, job_create: ExportJobCreate)
         user_id=job_create.user_id,
         language=job_create.language,
         percentage=job_create.percentage,
+        specs=job_create.specs,
         status=DownloadStatusEnum.QUEUED # Set initial status
     )
     session.add(db_job)
     await session.commit()
     await session.refresh(db_job)
+    await publish_job_status(db_job)
     print(db_job)
     return db_job
 
@@ -36,11 +54,19 @@ async def update_export_job_status(
     status: str,
     download_url: Optional[str] = None,
     error_message: Optional[str] = None,
-    progress_pct: Optional[int] = None
+    progress_pct: Optional[int] = None,
+    samples: int = 0,
+    bytes_written: int = 0,
 ) -> Optional[DownloadLog]:
-    """Updates the status, progress, and other details of an export job."""
+    """
+    Updates the status, progress, and other details of an export job.
+    A job reaching READY or FAILED is counted in the dashboard rollups
+    (with `samples` and `bytes_written`) in the same transaction.
+    Each change bumps the job's version and publishes its new status.
+    """
     db_job = await get_export_job(session, job_id)
     if db_job:
+        finishing = status in FINISHED_STATUSES and db_job.status not in FINISHED_STATUSES
         db_job.status = status
         if download_url:
             db_job.download_url = download_url
@@ -48,7 +74,62 @@ async def update_export_job_status(
             db_job.error_message = error_message
         if progress_pct is not None:
             db_job.progress_pct = progress_pct
+        if finishing:
+            await record_job_finished(session, db_job, samples, bytes_written)
+        db_job.version = DownloadLog.version + 1
         await session.commit()
         await session.refresh(db_job)
+        await publish_job_status(db_job)
     print(db_job)
     return db_job
+
+
+async def claim_export_jobs(
+    session: AsyncSession,
+    job_id: str,
+    language: str,
+    limit: int,
+) -> List[DownloadLog]:
+    """
+    Move `job_id` and up to `limit - 1` other queued single exports of
+    `language` from QUEUED to PROCESSING, oldest first, and return them with
+    `job_id` first. Empty if `job_id` is no longer queued (another worker
+    took it). Rows locked by a concurrent claim are skipped, never shared.
+    """
+    own = (await session.execute(
+        select(DownloadLog)
+        .where(DownloadLog.id == job_id, DownloadLog.status == DownloadStatusEnum.QUEUED)
+        .with_for_update(skip_locked=True)
+    )).scalars().first()
+    if own is None:
+        await session.rollback()
+        return []
+
+    specs = DownloadLog.__table__.c.specs
+    others = (await session.execute(
+        select(DownloadLog)
+        .where(
+            DownloadLog.status == DownloadStatusEnum.QUEUED,
+            DownloadLog.language == language,
+            DownloadLog.id != job_id,
+            # exactly one spec, a ZIP without a batch folder
+            specs[0].is_not(None),
+            specs[1].is_(None),
+            specs[0]["folder"].as_string().is_(None),
+            specs[0]["format"].as_string().is_(None),
+        )
+        .order_by(DownloadLog.created_at)
+        .limit(limit - 1)
+        .with_for_update(skip_locked=True)
+    )).scalars().all()
+
+    jobs = [own, *others]
+    for job in jobs:
+        job.status = DownloadStatusEnum.PROCESSING
+        job.progress_pct = 0
+        job.version = DownloadLog.version + 1
+    await session.commit()
+    for job in jobs:
+        await session.refresh(job)
+        await publish_job_status(job)
+    return jobs
@@ -0,0 +1,61 @@
+"""
+Bulk writes for ingest paths.
+
+`copy_rows` writes many rows in one round trip: asyncpg's binary `COPY` when
+the session runs on asyncpg, one `executemany` INSERT otherwise. Rows go
+through the session's connection, so they are part of its transaction and
+roll back with it.
+
+COPY bypasses SQLAlchemy, so Python-side column defaults are NOT applied:
+callers must pass every value they need (ids, timestamps, defaults).
+"""
+import logging
+from typing import Iterable, List, Sequence
+
+from sqlalchemy import column, insert, table as sa_table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+logger = logging.getLogger(__name__)
+
+
+async def copy_rows(
+    session: AsyncSession,
+    model,
+    rows: List[dict],
+    columns: Sequence[str] | None = None,
+    table_name: str | None = None,
+) -> int:
+    """
+    Write `rows` (dicts keyed by column name) into `model`'s table, or into
+    `table_name` (e.g. a temp staging table shaped like it). Returns the row count.
+    """
+    if not rows:
+        return 0
+    columns = list(columns or rows[0].keys())
+    table = model.__table__
+    name = table_name or table.name
+    schema = None if table_name else table.schema
+
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    driver = getattr(raw, "driver_connection", None)
+
+    if hasattr(driver, "copy_records_to_table"):
+        await driver.copy_records_to_table(
+            name,
+            records=_records(rows, columns),
+            columns=columns,
+            schema_name=schema,
+        )
+    else:
+        target = table if table_name is None else sa_table(table_name, *[column(c) for c in columns])
+        await session.execute(insert(target), [{c: row.get(c) for c in columns} for row in rows])
+
+    logger.debug(f"📥 Wrote {len(rows)} rows into {name}")
+    return len(rows)
+
+
+def _records(rows: Iterable[dict], columns: Sequence[str]):
+    for row in rows:
+        yield tuple(row.get(c) for c in columns)
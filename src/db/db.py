@@ -2,15 +2,39 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import SQLModel
 from ssl import create_default_context, CERT_REQUIRED
 from typing import Optional, AsyncGenerator
-import logging
+import logging, time
 
 from src.config import settings
+from src.core.metrics import DB_POOL_CHECKOUT_WAIT_SECONDS
 
 logger = logging.getLogger(__name__)
 
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT_SECONDS.labels(pool="async").observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(QueuePool):
+    """Sync queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT_SECONDS.labels(pool="sync").observe(time.perf_counter() - start)
+
 # ============================================
 # ASYNC SETUP (for FastAPI + Celery tasks)
 # ============================================
@@ -37,13 +61,14 @@ def get_async_engine():
         _async_engine = create_async_engine(
             DATABASE_URL,
             echo=False,
+            poolclass=TimedAsyncQueuePool,
             pool_pre_ping=True,
             pool_size=10,
             max_overflow=20,
             pool_recycle=900,
             pool_timeout=30,
             connect_args={
-                "ssl": _get_ssl_context(),
+                "ssl": _get_ssl_context() if settings.PG_SSL else False,
                 "timeout": 60,
                 "command_timeout": 300,
                 "server_settings": {
@@ -76,13 +101,14 @@ def get_async_session_maker(force_new: bool = False) -> async_sessionmaker[Async
         new_engine = create_async_engine(
             DATABASE_URL,
             echo=False,
+            poolclass=TimedAsyncQueuePool,
             pool_pre_ping=True,
             pool_size=10,
             max_overflow=20,
             pool_recycle=900,
             pool_timeout=30,
             connect_args={
-                "ssl": _get_ssl_context(),
+                "ssl": _get_ssl_context() if settings.PG_SSL else False,
                 "timeout": 60,
                 "command_timeout": 300,
                 "server_settings": {
@@ -163,6 +189,7 @@ def get_sync_engine():
             DATABASE_URL_SYNC,
             echo=False,
             future=True,
+            poolclass=TimedQueuePool,
             pool_size=5,
             max_overflow=10,
             pool_recycle=900,
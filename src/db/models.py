@@ -1,12 +1,12 @@
 from sqlmodel import Field, SQLModel, Column, Relationship, CheckConstraint, String, DateTime
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 import sqlalchemy.dialects.postgresql  as pg
 from sqlalchemy.types import TIMESTAMP
 from sqlalchemy.sql import func
 import uuid
 from enum import Enum
-from sqlalchemy import JSON
+from sqlalchemy import JSON, Index
 from typing import Optional
 
 class Optio(str, Enum):
@@ -71,6 +71,8 @@ class AudioSample(SQLModel, table=True):
     __table_args__ = (
         CheckConstraint("snr >= 0", name="check_snr_non_negative"),
         CheckConstraint("gender IN ('male','female')", name="check_valid_gender"),
+        # Catalog loads upsert on (language, sentence_id) (see src/ingest/loader.py)
+        Index("uq_audiosample_language_sentence_id", "language", "sentence_id", unique=True),
     )
     id: str = Field(
         sa_column=Column(
@@ -101,11 +103,72 @@ class AudioSample(SQLModel, table=True):
 
     domain: Optional[str] =  Field(sa_column=Column(pg.VARCHAR, default=None))
     category: str = Field(sa_column=Column(pg.VARCHAR, default=Category.read))
+    # Bytes of the audio object; set at ingest or backfilled from object_inventory
+    size_bytes: Optional[int] = Field(sa_column=Column(pg.BIGINT, default=None, nullable=True))
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 
+class PreviewCandidate(SQLModel, table=True):
+    """
+    Precomputed preview pool. Rows are rebuilt per language by the
+    `previews.refresh_preview_pools` task so the preview endpoint never
+    has to scan `audiosample`.
+    """
+    __tablename__ = "preview_candidates"
+    __table_args__ = (
+        Index("ix_preview_candidates_language_slot", "language", "slot"),
+    )
+
+    sample_id: str = Field(sa_column=Column(pg.VARCHAR, primary_key=True, nullable=False))
+
+    # Facets the preview endpoint filters on
+    language: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
+    category: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    gender: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    age_group: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    edu_level: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    domain: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    split: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+
+    # Payload returned to the client
+    speaker_id: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    sentence_id: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    sentence: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    storage_link: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    duration: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    snr: Optional[int] = Field(sa_column=Column(pg.INTEGER, default=None))
+
+    # Random position used to pick previews without ORDER BY random()
+    slot: float = Field(sa_column=Column(pg.DOUBLE_PRECISION, nullable=False))
+    refreshed_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.utcnow))
+
+
+class ObjectInventory(SQLModel, table=True):
+    """
+    Objects found in the audio bucket by the inventory crawl
+    (src/download/inventory.py). `sample_id` links an object to the
+    `audiosample` row whose export key it is.
+    """
+    __tablename__ = "object_inventory"
+    __table_args__ = (
+        Index("ix_object_inventory_sample_id", "sample_id"),
+        Index("ix_object_inventory_bucket_prefix", "bucket", "prefix"),
+    )
+
+    bucket: str = Field(sa_column=Column(pg.VARCHAR, primary_key=True, nullable=False))
+    key: str = Field(sa_column=Column(pg.VARCHAR, primary_key=True, nullable=False))
+    prefix: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
+    sentence_id: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    sample_id: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+
+    size_bytes: int = Field(sa_column=Column(pg.BIGINT, nullable=False))
+    etag: Optional[str] = Field(sa_column=Column(pg.VARCHAR, default=None))
+    last_modified: Optional[datetime] = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), default=None))
+    indexed_at: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), server_default=func.now()))
+
+
 class AudioTag(SQLModel, table=True):
     id: str = Field(
         sa_column=Column(
@@ -156,6 +219,10 @@ class Dataset(SQLModel, table=True):
 
 class DownloadLog(SQLModel, table=True):
     __tablename__ = "download_logs"
+    __table_args__ = (
+        # Keyset pagination of a user's jobs (src/db/pagination.py)
+        Index("ix_download_logs_user_created_id", "user_id", "created_at", "id"),
+    )
 
     # Unique request ID
     id: str = Field(
@@ -181,6 +248,9 @@ class DownloadLog(SQLModel, table=True):
 
     language: Optional[str] = Field(default=None)
 
+    # Filters of the export: one spec, or one per folder of a batch export (POST /exports/batch)
+    specs: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON(none_as_null=True), nullable=True))
+
     # Presigned S3 download link (set when job is ready)
     download_url: Optional[str] = Field(default=None)
 
@@ -188,9 +258,12 @@ class DownloadLog(SQLModel, table=True):
     error_message: Optional[str] = Field(default=None)
     progress_pct: Optional[int] = Field(default=None)
 
+    # Bumped on every change; served as the status ETag (src/core/job_status.py)
+    version: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))
+
     # Created and updated timestamps
     created_at: Optional[str] = Field(
-        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     )
     updated_at: Optional[str] = Field(
         sa_column=Column(DateTime(timezone=True), onupdate=func.now())
@@ -205,6 +278,10 @@ class DownloadLog(SQLModel, table=True):
 
 class Feedback(SQLModel, table=True):
     __tablename__ = "feedback"
+    __table_args__ = (
+        # Keyset pagination of the admin feedback listing (src/db/pagination.py)
+        Index("ix_feedback_created_id", "created_at", "id"),
+    )
 
     id: str = Field(
         sa_column=Column(
@@ -233,9 +310,54 @@ class Feedback(SQLModel, table=True):
     # Suggestions for improvement
     suggestions: Optional[str] = Field(default=None)
 
-    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, nullable=False, default=datetime.now))
 
     user: Optional["User"] = Relationship(back_populates="feedback")
 
     def __repr__(self):
         return f"Feedback(user_id={self.user_id}, rating={self.rating}, issues={self.issues})"
+
+
+# Dashboard rollups, maintained incrementally by src/admin/rollups.py.
+# Admin analytics read only these tables, never the logs or the catalog.
+
+class DownloadRollup(SQLModel, table=True):
+    """Finished export jobs per day, language and user."""
+    __tablename__ = "download_rollup"
+
+    day: date = Field(sa_column=Column(pg.DATE, primary_key=True, nullable=False))
+    language: str = Field(sa_column=Column(pg.VARCHAR, primary_key=True, nullable=False))
+    user_id: str = Field(sa_column=Column(pg.VARCHAR, primary_key=True, nullable=False))
+
+    downloads: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))
+    failed: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))
+    samples: int = Field(default=0, sa_column=Column(pg.BIGINT, nullable=False, server_default="0"))
+    bytes: int = Field(default=0, sa_column=Column(pg.BIGINT, nullable=False, server_default="0"))
+
+
+class DownloadProgressRollup(SQLModel, table=True):
+    """Successful downloads per dataset and requested percentage."""
+    __tablename__ = "download_progress_rollup"
+
+    dataset_id: str = Field(sa_column=Column(pg.VARCHAR, primary_key=True, nullable=False))
+    percentage: float = Field(sa_column=Column(pg.DOUBLE_PRECISION, primary_key=True, nullable=False))
+    downloads: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))
+
+
+class DatasetRollup(SQLModel, table=True):
+    """Catalog size per dataset, refreshed by ingest and catalog loads."""
+    __tablename__ = "dataset_rollup"
+
+    dataset_id: str = Field(sa_column=Column(pg.VARCHAR, primary_key=True, nullable=False))
+    sample_count: int = Field(default=0, sa_column=Column(pg.BIGINT, nullable=False, server_default="0"))
+    refreshed_at: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), server_default=func.now()))
+
+
+class FeedbackRollup(SQLModel, table=True):
+    """Feedback submitted per day; the average rating is rating_sum / rated."""
+    __tablename__ = "feedback_rollup"
+
+    day: date = Field(sa_column=Column(pg.DATE, primary_key=True, nullable=False))
+    feedback_count: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))
+    rated: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))
+    rating_sum: int = Field(default=0, sa_column=Column(pg.BIGINT, nullable=False, server_default="0"))
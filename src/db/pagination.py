@@ -0,0 +1,70 @@
+"""
+Keyset pagination on (created_at, id), newest first.
+
+A page is fetched with `WHERE (created_at, id) < (:created_at, :id)
+ORDER BY created_at DESC, id DESC LIMIT n`, which a composite index on the
+same columns answers with one index range scan, however deep the page. The
+client gets the last row's key back as an opaque cursor; OFFSET is never
+used. Both columns must be NOT NULL: a NULL key would be skipped by the
+comparison and could not be put in a cursor.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, aware: Optional[bool] = None) -> Tuple[datetime, str]:
+    """
+    Inverse of `encode_cursor`; raises ValueError for anything it did not
+    produce. With `aware` given, the timestamp must (or must not) carry a
+    UTC offset, as the column it is compared with does: the driver cannot
+    bind one kind of datetime to the other.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        if not isinstance(id, str):
+            raise TypeError(f"cursor id is {type(id).__name__}")
+        created_at = datetime.fromisoformat(created_at)
+        if aware is not None and (created_at.tzinfo is not None) != aware:
+            raise ValueError(f"cursor timestamp is {'naive' if aware else 'aware'}")
+        return created_at, id
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def keyset_page(
+    session: AsyncSession,
+    stmt,
+    created_at_column,
+    id_column,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of `stmt` (a select of a single entity) and the cursor of the next
+    page, or None on the last page.
+    """
+    if cursor:
+        aware = bool(getattr(created_at_column.type, "timezone", False))
+        stmt = stmt.where(tuple_(created_at_column, id_column) < tuple_(*decode_cursor(cursor, aware)))
+    stmt = stmt.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+    rows = list((await session.execute(stmt)).scalars().all())
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_at_column.key), getattr(last, id_column.key))
@@ -1,3 +1,5 @@
+import asyncio
+import weakref
 from redis.asyncio import Redis
 from typing import Optional, Dict
 
@@ -30,7 +32,35 @@ def make_cache_key(prefix: str, user_id: str, context: Optional[str] = None) ->
     return f"{prefix}:{user_id}:{context}" if context else f"{prefix}:{user_id}"
 
 
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Redis]" = weakref.WeakKeyDictionary()
 
 
+def get_redis_client() -> Redis:
+    """
+    Shared Redis client for the running event loop, built from settings.
+    Celery tasks run each job on a fresh loop, so clients are kept per loop.
+    """
+    from src.config import settings
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = init_redis_client(
+            settings.REDIS_HOST,
+            settings.REDIS_PORT,
+            settings.REDIS_USERNAME,
+            settings.REDIS_PASSWORD,
+        )
+    return client
 
 
+async def close_redis_client() -> None:
+    """
+    Close the running loop's client, if it has one. Call before the loop
+    closes (Celery task teardown, app shutdown): the loop outliving its
+    client is what lets the WeakKeyDictionary drop it, and its sockets
+    would otherwise stay open until garbage collection.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,383 @@
+"""
+Audio proxy: preview clips served by the API instead of signed OBS links.
+
+`GET /download/audio/{sample_id}` answers with the clip's WAV bytes,
+`Accept-Ranges: bytes`, the OBS ETag (strong: it is the content hash) and
+a private Cache-Control, so players can seek and the browser can keep the
+clip. Only clips in the current preview pools (`preview_candidates`) are
+served: the route is unauthenticated, and the full dataset goes through the
+download endpoints. A clip is looked up in three places:
+
+    memory   `hot_clips`, a per-process LRU of whole clips (AUDIO_PROXY_MEMORY_BYTES)
+    disk     the host's clip cache (see clip_cache.py), when CLIP_CACHE_DIR is set
+    OBS      a full GET that fills both caches as it is streamed out, or, for
+             a range that does not start at 0, a ranged GET of just those bytes
+
+Cached copies are served without asking OBS for AUDIO_PROXY_REVALIDATE_SECONDS
+after they were fetched or last checked, then revalidated with a HEAD.
+Ranges are read from the cache or OBS as they are sent, so seeking into a
+long clip never reads the part before it.
+"""
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterator, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+
+from src.config import settings
+from src.core.job_status import etag_matches
+from src.core.metrics import AUDIO_PROXY_RESPONSES
+from src.db.models import PreviewCandidate
+from src.download.clip_cache import get_clip_cache, s3_stream_bytes
+from src.storage.base import NotFound, NotModified, RangeNotSatisfiable, StoredObject, parse_range, resolve_range
+from src.storage.registry import get_storage
+
+
+logger = logging.getLogger(__name__)
+
+AUDIO_URL = "/api/v1/download/audio/{sample_id}"
+MEDIA_TYPE = "audio/wav"
+CHUNK_SIZE = 64 * 1024
+SAMPLE_KEYS_CACHED = 50_000
+# A sample dropped from its preview pool stays playable for at most this long
+SAMPLE_KEY_TTL_SECONDS = 300
+
+
+def clip_headers(etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"private, max-age={settings.AUDIO_PROXY_MAX_AGE_SECONDS}",
+    }
+
+
+class HotClips:
+    """Bounded LRU of whole clips: key -> (etag, bytes, last checked against OBS)."""
+
+    def __init__(self, max_bytes: int, max_clip_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_clip_bytes = max_clip_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[str, bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, etag: str, data: bytes, checked: Optional[float] = None):
+        if len(data) > self.max_clip_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (etag, data, checked or time.time())
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def drop(self, key: str):
+        with self._lock:
+            self._drop(key)
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+hot_clips = HotClips(settings.AUDIO_PROXY_MEMORY_BYTES, settings.AUDIO_PROXY_MEMORY_MAX_CLIP_BYTES)
+
+
+class ClipSource(ABC):
+    """A clip whose ETag and size are known, ready to be read in byte ranges."""
+
+    def __init__(self, etag: str, size: int, origin: str):
+        self.etag = etag
+        self.size = size
+        self.origin = origin  # memory | disk | obs
+
+    @abstractmethod
+    def chunks(self, start: int, end: int) -> Iterator[bytes]:
+        """Bytes `start`..`end` (inclusive) of the clip."""
+
+    def close(self):
+        """Release what the clip holds if `chunks` is never read to the end."""
+
+
+class MemoryClip(ClipSource):
+    def __init__(self, etag: str, data: bytes):
+        super().__init__(etag, len(data), "memory")
+        self.data = data
+
+    def chunks(self, start: int, end: int) -> Iterator[bytes]:
+        view = memoryview(self.data)
+        for offset in range(start, end + 1, CHUNK_SIZE):
+            yield view[offset:min(offset + CHUNK_SIZE, end + 1)]
+
+
+class FileClip(ClipSource):
+    """
+    A clip in the disk cache. The file is opened when the body is first read,
+    so a response that is never sent holds nothing open; once open, eviction
+    cannot pull it away mid-response.
+    """
+
+    def __init__(self, etag: str, path: str, size: int):
+        super().__init__(etag, size, "disk")
+        self.path = path
+
+    def chunks(self, start: int, end: int) -> Iterator[bytes]:
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            # Evicted since it was looked up: the body ends short and the player retries
+            logger.warning(f"⚠️ Cached clip {self.path} was evicted before it was sent")
+            return
+        with f:
+            f.seek(start)
+            remaining = end + 1 - start
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class ObsClip(ClipSource):
+    """A full OBS response, copied into the disk and memory caches while it is read."""
+
+    def __init__(self, key: str, obj: StoredObject):
+        super().__init__(obj.etag, obj.size, "obs")
+        self.key = key
+        self.body = obj.body
+
+    def chunks(self, start: int, end: int) -> Iterator[bytes]:
+        chunks: Iterator[bytes] = s3_stream_bytes(self.body, CHUNK_SIZE)
+        cache = get_clip_cache()
+        if cache is not None:
+            chunks = cache.tee(self.key, self.etag, self.size, chunks)
+        keep = bytearray() if self.size <= hot_clips.max_clip_bytes else None
+
+        try:
+            offset = 0
+            for chunk in chunks:
+                if keep is not None:
+                    keep.extend(chunk)
+                if offset + len(chunk) > start:
+                    yield chunk[max(start - offset, 0):end + 1 - offset]
+                offset += len(chunk)
+                if offset > end and offset < self.size:
+                    # The client asked for a prefix only: stop reading (and caching)
+                    return
+        finally:
+            chunks.close()
+            self.body.close()
+        if keep is not None and len(keep) == self.size:
+            hot_clips.put(self.key, self.etag, bytes(keep))
+
+    def close(self):
+        self.body.close()
+
+
+def is_current(key: str, etag: str) -> bool:
+    """True if OBS still holds the version `etag` of `key`."""
+    try:
+        return get_storage("obs").head(key).etag == etag
+    except Exception as e:
+        logger.warning(f"⚠️ Could not revalidate cached clip {key}: {e}")
+        return False
+
+
+def cached_clip(key: str) -> Optional[ClipSource]:
+    """The clip from memory or disk if a current copy is there, else None."""
+    now = time.time()
+    entry = hot_clips.get(key)
+    if entry is not None:
+        etag, data, checked = entry
+        if now - checked < settings.AUDIO_PROXY_REVALIDATE_SECONDS:
+            return MemoryClip(etag, data)
+        if is_current(key, etag):
+            hot_clips.put(key, etag, data, checked=now)
+            return MemoryClip(etag, data)
+        hot_clips.drop(key)
+
+    cache = get_clip_cache()
+    etag = cache.etag(key) if cache is not None else None
+    f = cache.open(key) if etag else None
+    if f is None:
+        return None
+    with f:
+        stat = os.fstat(f.fileno())
+        # The file's mtime is when it was written or last found current
+        checked = stat.st_mtime
+        if now - checked >= settings.AUDIO_PROXY_REVALIDATE_SECONDS:
+            if not is_current(key, etag):
+                return None
+            os.utime(f.fileno())
+            checked = now
+        if stat.st_size > hot_clips.max_clip_bytes:
+            return FileClip(etag, f.name, stat.st_size)
+        data = f.read()
+    hot_clips.put(key, etag, data, checked=checked)
+    return MemoryClip(etag, data)
+
+
+def get_object(key: str, range: Optional[str] = None, if_none_match: Optional[str] = None) -> StoredObject:
+    """The clip from OBS, with a missing object as a 404."""
+    try:
+        return get_storage("obs").get(key, range=range, if_none_match=if_none_match)
+    except NotFound:
+        raise HTTPException(404, "Audio not found")
+
+
+def not_modified(e: NotModified, if_none_match: str) -> Response:
+    """A 304 for the client, OBS having answered its conditional GET with one."""
+    AUDIO_PROXY_RESPONSES.labels(source="obs", status="304").inc()
+    return Response(status_code=304, headers=clip_headers(e.etag or if_none_match))
+
+
+def full_response(
+    key: str,
+    requested: Optional[Tuple[Optional[int], Optional[int]]],
+    if_none_match: Optional[str],
+    if_range: Optional[str],
+) -> Response:
+    """The clip from OBS, streamed through to the caches."""
+    try:
+        obj = get_object(key, if_none_match=if_none_match)
+    except NotModified as e:
+        return not_modified(e, if_none_match)
+    return clip_response(ObsClip(key, obj), requested, None, if_range)
+
+
+def clip_response(
+    clip: ClipSource,
+    requested: Optional[Tuple[Optional[int], Optional[int]]],
+    if_none_match: Optional[str],
+    if_range: Optional[str],
+) -> Response:
+    headers = clip_headers(clip.etag)
+    if etag_matches(if_none_match, clip.etag):
+        clip.close()
+        AUDIO_PROXY_RESPONSES.labels(source=clip.origin, status="304").inc()
+        return Response(status_code=304, headers=headers)
+
+    # If-Range with another version (or a date): send the current clip whole
+    if if_range is not None and if_range != clip.etag:
+        requested = None
+
+    if requested is None:
+        AUDIO_PROXY_RESPONSES.labels(source=clip.origin, status="200").inc()
+        return StreamingResponse(
+            clip.chunks(0, clip.size - 1), media_type=MEDIA_TYPE,
+            headers={**headers, "Content-Length": str(clip.size)},
+            background=BackgroundTask(clip.close),
+        )
+
+    try:
+        start, end = resolve_range(requested, clip.size)
+    except RangeNotSatisfiable:
+        clip.close()
+        AUDIO_PROXY_RESPONSES.labels(source=clip.origin, status="416").inc()
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{clip.size}"})
+
+    AUDIO_PROXY_RESPONSES.labels(source=clip.origin, status="206").inc()
+    return StreamingResponse(
+        clip.chunks(start, end), status_code=206, media_type=MEDIA_TYPE,
+        headers={
+            **headers,
+            "Content-Range": f"bytes {start}-{end}/{clip.size}",
+            "Content-Length": str(end + 1 - start),
+        },
+        background=BackgroundTask(clip.close),
+    )
+
+
+def ranged_response(key: str, range_header: str, if_none_match: Optional[str]) -> Response:
+    """A range of a clip that is not cached, read from OBS alone."""
+    try:
+        obj = get_object(key, range=range_header, if_none_match=if_none_match)
+    except NotModified as e:
+        return not_modified(e, if_none_match)
+    except RangeNotSatisfiable as e:
+        size = e.size if e.size is not None else get_storage("obs").head(key).size
+        AUDIO_PROXY_RESPONSES.labels(source="obs", status="416").inc()
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    headers = {**clip_headers(obj.etag), "Content-Length": str(obj.size)}
+    status_code = 200
+    if obj.content_range:
+        headers["Content-Range"] = obj.content_range
+        status_code = 206
+    AUDIO_PROXY_RESPONSES.labels(source="obs", status=str(status_code)).inc()
+    return StreamingResponse(
+        s3_stream_bytes(obj.body, CHUNK_SIZE), status_code=status_code,
+        media_type=MEDIA_TYPE, headers=headers,
+    )
+
+
+_sample_keys: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # sample_id -> (key, looked up at)
+
+
+async def sample_audio_key(sample_id: str) -> str:
+    """
+    OBS key of a clip in the preview pools, else a 404 (remembered for a
+    while: a player sends several requests per clip).
+    """
+    entry = _sample_keys.get(sample_id)
+    if entry is not None and time.time() - entry[1] < SAMPLE_KEY_TTL_SECONDS:
+        _sample_keys.move_to_end(sample_id)
+        return entry[0]
+
+    from src.db.db import get_async_session_maker
+    from src.tasks.export_pipeline import obs_key
+
+    # Own short session: it must not stay checked out while the clip streams
+    async with get_async_session_maker()() as session:
+        result = await session.execute(
+            select(PreviewCandidate.language, PreviewCandidate.category, PreviewCandidate.sentence_id)
+            .where(PreviewCandidate.sample_id == sample_id)
+        )
+        sample = result.first()
+    if sample is None:
+        raise HTTPException(404, "Audio sample not found")
+
+    key = obs_key(sample)
+    _sample_keys[sample_id] = (key, time.time())
+    _sample_keys.move_to_end(sample_id)
+    while len(_sample_keys) > SAMPLE_KEYS_CACHED:
+        _sample_keys.popitem(last=False)
+    return key
+
+
+async def audio_response(
+    sample_id: str,
+    range_header: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_range: Optional[str] = None,
+) -> Response:
+    """The response to `GET /download/audio/{sample_id}`."""
+    key = await sample_audio_key(sample_id)
+    requested = parse_range(range_header)
+
+    clip = await run_in_threadpool(cached_clip, key)
+    if clip is None:
+        # A range into the clip is fetched on its own; anything from the start
+        # fetches the whole clip, so the caches have it for the requests that follow
+        if requested is not None and requested != (0, None) and if_range is None:
+            return await run_in_threadpool(ranged_response, key, range_header, if_none_match)
+        return await run_in_threadpool(full_response, key, requested, if_none_match, if_range)
+    return clip_response(clip, requested, if_none_match, if_range)
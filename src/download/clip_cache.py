@@ -0,0 +1,257 @@
+"""
+Worker-local disk cache of OBS audio objects.
+
+Popular clips end up in many exports; with CLIP_CACHE_DIR set, every export
+worker on a host keeps them in one shared directory instead of pulling them
+from OBS for each archive. An entry is the object's bytes in
+`<dir>/objects/<ab>/<sha1 of key>` plus a row (key, etag, size, last use)
+in `<dir>/index.sqlite`, which all Celery processes of the host share
+(WAL mode, so readers do not block the writer).
+
+Entries are revalidated on every use with a conditional GET (`IfNoneMatch`
+with the cached ETag): an unchanged object costs a `304` and no body, a
+changed one is served from the response and replaces the entry. Files are
+written to `<dir>/tmp/` and renamed into place, so a reader never sees a
+partial clip, and an entry evicted while it is being read stays readable
+through the open mapping. Once the files exceed CLIP_CACHE_MAX_BYTES, the
+least recently used are removed down to 90% of it.
+
+Hits are memory-mapped and handed to the archive writer as a memoryview,
+without copying the clip into a Python bytes object first.
+
+    clip = open_clip(get_storage("obs"), key)
+    zs.add(clip.chunks, arcname=arcname, size=clip.size)
+"""
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional
+
+from src.config import settings
+from src.core.metrics import CLIP_CACHE_EVICTED_BYTES, CLIP_CACHE_REQUESTS, OBS_GET_OBJECT_BYTES
+from src.storage.base import NotModified, Storage
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    key TEXT PRIMARY KEY,
+    etag TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clips_used ON clips (used);
+"""
+EVICT_TO = 0.9   # fraction of max_bytes left after an eviction
+
+
+class Clip(NamedTuple):
+    chunks: Iterable[bytes]  # a single memoryview when `cached`
+    size: int
+    cached: bool
+
+
+class ClipCache:
+    """
+    One host's cache directory, as seen from this process. Safe to use from
+    the fetch pool's threads; other processes coordinate through SQLite.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Clips larger than this are streamed through, never cached
+        self.max_object_bytes = max_bytes // 100
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "tmp"), exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), timeout=30,
+            isolation_level=None, check_same_thread=False,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def count(self, hit: bool, result: str):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        CLIP_CACHE_REQUESTS.labels(result=result).inc()
+
+    @property
+    def hit_ratio(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def etag(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT etag FROM clips WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """The cached file, opened for reading and marked used, or None if it was evicted meanwhile."""
+        try:
+            f = open(self.path(key), "rb")
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._db.execute("UPDATE clips SET used = ? WHERE key = ?", (time.time(), key))
+        return f
+
+    def read(self, key: str) -> Optional[memoryview]:
+        """The cached clip, mapped read-only, or None if it was evicted meanwhile."""
+        f = self.open(key)
+        if f is None:
+            return None
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            return memoryview(mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)) if size else memoryview(b"")
+
+    def tee(self, key: str, etag: Optional[str], size: int, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Yield `chunks` unchanged while writing them to the cache; the entry is
+        stored once they are exhausted, and dropped if the caller stops early.
+        """
+        if not etag or size > self.max_object_bytes:
+            yield from chunks
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.directory, "tmp"))
+        written = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    written += len(chunk)
+                    yield chunk
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if written != size:
+            logger.warning(f"⚠️ Not caching clip {key}: read {written} of {size} bytes")
+            os.unlink(tmp_path)
+            return
+        try:
+            self._commit(key, etag, tmp_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not cache clip {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _commit(self, key: str, etag: str, tmp_path: str):
+        path = self.path(key)
+        size = os.path.getsize(tmp_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO clips (key, etag, size, used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET etag = excluded.etag, size = excluded.size, used = excluded.used",
+                (key, etag, size, time.time()),
+            )
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM clips").fetchone()[0]
+        if total > self.max_bytes:
+            self._evict(total - int(self.max_bytes * EVICT_TO))
+
+    def _evict(self, excess: int):
+        """Remove least recently used entries until `excess` bytes are freed."""
+        freed = 0
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                victims = []
+                for key, size in self._db.execute("SELECT key, size FROM clips ORDER BY used"):
+                    if freed >= excess:
+                        break
+                    victims.append(key)
+                    freed += size
+                self._db.executemany("DELETE FROM clips WHERE key = ?", ((key,) for key in victims))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        for key in victims:
+            try:
+                os.unlink(self.path(key))
+            except FileNotFoundError:
+                pass
+        CLIP_CACHE_EVICTED_BYTES.inc(freed)
+        logger.info(f"🧹 Clip cache evicted {len(victims)} clip(s), {freed / 1024 ** 2:.1f} MB")
+
+
+_cache: Optional[ClipCache] = None
+_cache_pid: Optional[int] = None
+_cache_lock = threading.Lock()
+
+
+def get_clip_cache() -> Optional[ClipCache]:
+    """This process's view of the host cache, or None when CLIP_CACHE_DIR is unset."""
+    global _cache, _cache_pid
+    if not settings.CLIP_CACHE_DIR:
+        return None
+    with _cache_lock:
+        # A prefork child must not reuse its parent's SQLite connection
+        if _cache is None or _cache_pid != os.getpid():
+            _cache = ClipCache(settings.CLIP_CACHE_DIR, settings.CLIP_CACHE_MAX_BYTES)
+            _cache_pid = os.getpid()
+        return _cache
+
+
+def s3_stream_bytes(s3_body, chunk_size=64 * 1024) -> Iterator[bytes]:
+    """Generator to yield bytes from S3 StreamingBody."""
+    while True:
+        chunk = s3_body.read(chunk_size)
+        if not chunk:
+            break
+        OBS_GET_OBJECT_BYTES.inc(len(chunk))
+        yield chunk
+
+
+def open_clip(storage: Storage, key: str) -> Clip:
+    """
+    One object of `storage` as chunks to stream: from the host cache if it
+    still holds the current version, else from `storage.get` (filling the
+    cache as the chunks are consumed). Raises `NotFound` if the object is
+    missing.
+    """
+    cache = get_clip_cache()
+    if cache is None:
+        obj = storage.get(key)
+        return Clip(s3_stream_bytes(obj.body), obj.size, False)
+
+    etag = cache.etag(key)
+    try:
+        obj = storage.get(key, if_none_match=etag)
+    except NotModified:
+        view = cache.read(key)
+        if view is not None:
+            cache.count(True, "hit")
+            return Clip([view], len(view), True)
+        # Evicted since the lookup
+        obj = storage.get(key)
+
+    cache.count(False, "stale" if etag else "miss")
+    return Clip(cache.tee(key, obj.etag, obj.size, s3_stream_bytes(obj.body)), obj.size, False)
+
+
+def read_clip(storage: Storage, key: str):
+    """A whole clip: a memoryview of the cached file on a hit, else its bytes."""
+    clip = open_clip(storage, key)
+    if clip.cached:
+        return clip.chunks[0]
+    return b"".join(clip.chunks)
@@ -0,0 +1,219 @@
+"""
+Inventory of the audio bucket, kept in `object_inventory`.
+
+`crawl_inventory` lists every export prefix (`<language>-test/<folder>/`, the
+layout of `map_category_to_folder`) in parallel and reconciles it with the
+table: new and changed objects are upserted, vanished ones deleted, and
+objects are linked to their `audiosample` row, whose `size_bytes` is then
+backfilled from the object. Unchanged objects are not rewritten, so a crawl
+of a stable bucket only reads.
+
+With INVENTORY_SKIP_MISSING on, exports, estimates and preview pools add
+`in_inventory()` to their filters and never pick a clip that is not in the
+bucket, instead of finding out through a failed `get_object`.
+
+    python -m src.download.inventory --language yoruba
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import exists, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.db.bulk import copy_rows
+from src.db.models import AudioSample, ObjectInventory
+from src.download.s3_config import VALID_CATEGORIES
+from src.storage.base import Storage
+from src.storage.registry import get_storage
+
+
+logger = logging.getLogger(__name__)
+
+STAGE_TABLE = "object_inventory_stage"
+LIST_PAGE_SIZE = 1000  # objects staged per COPY, one S3 listing page
+STAGE_COLUMNS = ("key", "sentence_id", "size_bytes", "etag", "last_modified")
+
+CREATE_STAGE_SQL = text(f"""
+    CREATE TEMP TABLE {STAGE_TABLE} (
+        key varchar PRIMARY KEY, sentence_id varchar, size_bytes bigint,
+        etag varchar, last_modified timestamptz
+    ) ON COMMIT DROP
+""")
+UPSERT_SQL = text(f"""
+    INSERT INTO object_inventory (bucket, key, prefix, sentence_id, size_bytes, etag, last_modified, indexed_at)
+    SELECT :bucket, key, :prefix, sentence_id, size_bytes, etag, last_modified, now() FROM {STAGE_TABLE}
+    ON CONFLICT (bucket, key) DO UPDATE SET
+        size_bytes = EXCLUDED.size_bytes, etag = EXCLUDED.etag,
+        last_modified = EXCLUDED.last_modified, indexed_at = now()
+    WHERE (object_inventory.size_bytes, object_inventory.etag)
+        IS DISTINCT FROM (EXCLUDED.size_bytes, EXCLUDED.etag)
+    RETURNING (xmax = 0) AS inserted
+""")
+DELETE_VANISHED_SQL = text(f"""
+    DELETE FROM object_inventory oi
+    WHERE oi.bucket = :bucket AND oi.prefix = :prefix
+      AND NOT EXISTS (SELECT 1 FROM {STAGE_TABLE} s WHERE s.key = oi.key)
+""")
+# Same rule as map_category_to_folder: a missing category counts as spontaneous
+LINK_SAMPLES_SQL = text("""
+    UPDATE object_inventory oi SET sample_id = a.id
+    FROM audiosample a
+    WHERE oi.bucket = :bucket AND oi.prefix = :prefix
+      AND a.sentence_id = oi.sentence_id
+      AND lower(a.language) = :language
+      AND lower(coalesce(a.category, 'spontaneous')) = ANY(:categories)
+      AND oi.sample_id IS DISTINCT FROM a.id
+""")
+# Backfill audiosample.size_bytes from what the bucket actually holds
+SYNC_SIZES_SQL = text("""
+    UPDATE audiosample a SET size_bytes = oi.size_bytes
+    FROM object_inventory oi
+    WHERE oi.bucket = :bucket AND oi.prefix = :prefix
+      AND oi.sample_id = a.id
+      AND a.size_bytes IS DISTINCT FROM oi.size_bytes
+""")
+
+
+def in_inventory():
+    """Filter clause: the sample's audio was found by the last inventory crawl."""
+    return exists().where(ObjectInventory.sample_id == AudioSample.id)
+
+
+def export_prefixes(languages: Iterable[str]) -> Dict[str, Tuple[str, List[str]]]:
+    """Map each export prefix to its language and the categories stored under it."""
+    from src.tasks.export_worker import map_category_to_folder
+
+    prefixes: Dict[str, Tuple[str, List[str]]] = {}
+    for language in sorted({language.lower() for language in languages}):
+        for category in sorted(VALID_CATEGORIES):
+            prefix = f"{language}-test/{map_category_to_folder(language, category)}/"
+            prefixes.setdefault(prefix, (language, []))[1].append(category)
+    return prefixes
+
+
+def _sentence_id(key: str) -> Optional[str]:
+    name = key.rsplit("/", 1)[-1]
+    return name[:-4] if name.lower().endswith(".wav") else None
+
+
+def _list_pages(storage: Storage, prefix: str, page_size: int = LIST_PAGE_SIZE):
+    """`storage.list(prefix)` in lists of `page_size` objects."""
+    objects = storage.list(prefix)
+    while True:
+        page = list(itertools.islice(objects, page_size))
+        if not page:
+            return
+        yield page
+
+
+async def crawl_prefix(
+    session: AsyncSession,
+    storage: Storage,
+    prefix: str,
+    language: str,
+    categories: List[str],
+) -> dict:
+    """List one prefix and reconcile its `object_inventory` rows in a single transaction."""
+    started = time.perf_counter()
+    await session.execute(CREATE_STAGE_SQL)
+
+    bucket = storage.bucket
+    pages = _list_pages(storage, prefix)
+    listed = 0
+    while True:
+        page = await asyncio.to_thread(next, pages, None)
+        if page is None:
+            break
+        rows = [
+            {
+                "key": obj.key,
+                "sentence_id": _sentence_id(obj.key),
+                "size_bytes": obj.size,
+                "etag": (obj.etag or "").strip('"') or None,
+                "last_modified": obj.last_modified,
+            }
+            for obj in page
+            if not obj.key.endswith("/")
+        ]
+        listed += await copy_rows(session, ObjectInventory, rows, columns=STAGE_COLUMNS, table_name=STAGE_TABLE)
+
+    params = {"bucket": bucket, "prefix": prefix}
+    written = [row.inserted for row in await session.execute(UPSERT_SQL, params)]
+    removed = (await session.execute(DELETE_VANISHED_SQL, params)).rowcount
+    linked = (await session.execute(
+        LINK_SAMPLES_SQL, {**params, "language": language, "categories": categories}
+    )).rowcount
+    sized = (await session.execute(SYNC_SIZES_SQL, params)).rowcount
+    await session.commit()
+
+    result = {
+        "listed": listed,
+        "added": sum(written),
+        "changed": len(written) - sum(written),
+        "removed": removed,
+        "linked": linked,
+        "sized": sized,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    logger.info(f"🗂️ Inventory of {bucket}/{prefix}: {result}")
+    return result
+
+
+async def crawl_inventory(
+    session_maker,
+    languages: Optional[Iterable[str]] = None,
+    storage: Optional[Storage] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[str, dict]:
+    """Crawl every export prefix of `languages` (default: all catalog languages)."""
+    from src.download.preview_pool import list_catalog_languages
+
+    storage = storage or get_storage("obs")
+    bucket = storage.bucket
+    semaphore = asyncio.Semaphore(concurrency or settings.INVENTORY_CRAWL_CONCURRENCY)
+
+    if languages is None:
+        async with session_maker() as session:
+            languages = await list_catalog_languages(session)
+
+    async def crawl(prefix: str, language: str, categories: List[str]):
+        async with semaphore, session_maker() as session:
+            try:
+                return prefix, await crawl_prefix(session, storage, prefix, language, categories)
+            except Exception as e:
+                logger.error(f"❌ Inventory crawl of {bucket}/{prefix} failed: {e}")
+                return prefix, {"error": str(e)}
+
+    results = await asyncio.gather(*[
+        crawl(prefix, language, categories)
+        for prefix, (language, categories) in export_prefixes(languages).items()
+    ])
+    return dict(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--language", action="append", help="Crawl only this language (repeatable)")
+    parser.add_argument("--concurrency", type=int, help="Prefixes listed in parallel")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(message)s")
+    from src.db.db import dispose_async_engine, get_async_session_maker
+
+    async def run():
+        try:
+            return await crawl_inventory(get_async_session_maker(), args.language, concurrency=args.concurrency)
+        finally:
+            await dispose_async_engine()
+
+    for prefix, result in asyncio.run(run()).items():
+        print(f"{prefix}: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Preview pools.
+
+`refresh_preview_pool` rebuilds the `preview_candidates` rows of one language
+from `audiosample`. It is run by the `previews.refresh_preview_pools` Celery
+task, never from a request. The preview endpoint only reads those rows via
+`pick_preview_candidates` and signs OBS links through `signed_url_cache`.
+
+The migration that creates the table builds the first pools. A catalog
+language that still has none (added since) gets a 503 while
+`request_preview_pool` has its pool built, enqueued once per language.
+"""
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from sqlalchemy import select, and_, delete, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.db.models import AudioSample, PreviewCandidate
+from src.download.inventory import in_inventory
+from src.download.s3_config import generate_obs_signed_url
+
+
+logger = logging.getLogger(__name__)
+
+
+# Columns a preview can be filtered on; one pool is kept per distinct combination
+FACETS = ("language", "category", "gender", "age_group", "edu_level", "domain", "split")
+# Columns copied over so previews can be rendered without touching audiosample
+PAYLOAD = ("speaker_id", "sentence_id", "sentence", "storage_link", "duration", "snr")
+# A missing pool is requested at most once per language in this interval
+POOL_REQUEST_INTERVAL_SECONDS = 300
+
+_pool_requests: dict = {}  # language -> time its build was last enqueued
+_pool_requests_lock = threading.Lock()
+
+
+async def list_catalog_languages(session: AsyncSession) -> List[str]:
+    """Distinct languages present in the catalog."""
+    result = await session.execute(select(AudioSample.language).distinct())
+    return [language for language in result.scalars().all() if language]
+
+
+async def catalog_has_language(session: AsyncSession, language: str) -> bool:
+    """True if `audiosample` has any row of `language`."""
+    result = await session.execute(select(AudioSample.id).where(AudioSample.language == language).limit(1))
+    return result.first() is not None
+
+
+async def refresh_preview_pool(
+    session: AsyncSession,
+    language: str,
+    pool_size: Optional[int] = None,
+    per_speaker: Optional[int] = None,
+) -> int:
+    """
+    Replace the preview pool of `language` and return the number of candidates kept.
+
+    For every facet combination, at most `per_speaker` clips are taken from each
+    speaker, and the combination keeps `pool_size` of them picked round-robin
+    across speakers (every speaker's first clip ranks ahead of anyone's second).
+    Domains are a facet, so unfiltered previews draw from every domain's pool.
+    """
+    pool_size = pool_size or settings.PREVIEW_POOL_SIZE
+    per_speaker = per_speaker or settings.PREVIEW_POOL_PER_SPEAKER
+
+    facet_columns = [getattr(AudioSample, name) for name in FACETS]
+    payload_columns = [getattr(AudioSample, name) for name in PAYLOAD]
+
+    speaker_rank = func.row_number().over(
+        partition_by=[*facet_columns, AudioSample.speaker_id],
+        order_by=func.random(),
+    ).label("speaker_rank")
+    filters = [AudioSample.language == language]
+    if settings.INVENTORY_SKIP_MISSING:
+        filters.append(in_inventory())
+
+    ranked = (
+        select(AudioSample.id.label("sample_id"), *facet_columns, *payload_columns, speaker_rank)
+        .where(*filters)
+        .subquery()
+    )
+
+    pool_rank = func.row_number().over(
+        partition_by=[ranked.c[name] for name in FACETS],
+        order_by=[ranked.c.speaker_rank, func.random()],
+    ).label("pool_rank")
+    pooled = (
+        select(ranked, pool_rank)
+        .where(ranked.c.speaker_rank <= per_speaker)
+        .subquery()
+    )
+
+    columns = ["sample_id", *FACETS, *PAYLOAD]
+    picked = (
+        select(*[pooled.c[name] for name in columns], func.random(), func.now())
+        .where(pooled.c.pool_rank <= pool_size)
+    )
+
+    # Delete + insert in one transaction so readers see either pool, never a gap
+    await session.execute(delete(PreviewCandidate).where(PreviewCandidate.language == language))
+    result = await session.execute(
+        insert(PreviewCandidate).from_select([*columns, "slot", "refreshed_at"], picked)
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def preview_pool_exists(session: AsyncSession, language: str) -> bool:
+    """True once a pool has been built for `language`."""
+    stmt = select(PreviewCandidate.sample_id).where(PreviewCandidate.language == language).limit(1)
+    result = await session.execute(stmt)
+    return result.first() is not None
+
+
+def request_preview_pool(language: str) -> bool:
+    """
+    Enqueue a build of `language`'s pool, unless one was enqueued in the last
+    POOL_REQUEST_INTERVAL_SECONDS. Blocks on the broker: call it off the loop.
+    """
+    now = time.monotonic()
+    with _pool_requests_lock:
+        last = _pool_requests.get(language)
+        if last is not None and now - last < POOL_REQUEST_INTERVAL_SECONDS:
+            return False
+        _pool_requests[language] = now
+
+    from src.tasks.preview_worker import refresh_preview_pools_task
+    try:
+        refresh_preview_pools_task.delay(language=language)
+    except Exception as e:
+        logger.warning(f"Could not enqueue preview pool refresh for {language}: {e}")
+        with _pool_requests_lock:
+            _pool_requests.pop(language, None)
+        return False
+    return True
+
+
+async def pick_preview_candidates(
+    session: AsyncSession,
+    language: str,
+    limit: int,
+    category: str | None = None,
+    gender: str | None = None,
+    age_group: str | None = None,
+    education: str | None = None,
+    split: str | None = None,
+    domain: str | None = None,
+) -> List[PreviewCandidate]:
+    """
+    Randomly pick up to `limit` candidates matching the filters.
+
+    Every candidate carries a random `slot`; reading forward from a random
+    start point (and wrapping around) is an index range scan, unlike
+    ORDER BY random() which sorts the whole pool.
+    """
+    filters = [PreviewCandidate.language == language]
+    if gender:
+        filters.append(PreviewCandidate.gender == gender)
+    if category:
+        filters.append(PreviewCandidate.category == category)
+    if age_group:
+        filters.append(PreviewCandidate.age_group == age_group)
+    if education:
+        filters.append(PreviewCandidate.edu_level == education)
+    if domain:
+        filters.append(PreviewCandidate.domain == domain)
+    if split:
+        filters.append(PreviewCandidate.split == split)
+
+    start = random.random()
+    stmt = (
+        select(PreviewCandidate)
+        .where(and_(*filters), PreviewCandidate.slot >= start)
+        .order_by(PreviewCandidate.slot)
+        .limit(limit)
+    )
+    result = await session.execute(stmt)
+    picks = list(result.scalars().all())
+
+    if len(picks) < limit:
+        wrap_stmt = (
+            select(PreviewCandidate)
+            .where(and_(*filters), PreviewCandidate.slot < start)
+            .order_by(PreviewCandidate.slot)
+            .limit(limit - len(picks))
+        )
+        result = await session.execute(wrap_stmt)
+        picks.extend(result.scalars().all())
+
+    return picks
+
+
+class SignedUrlCache:
+    """
+    Bounded LRU of signed OBS URLs.
+
+    A URL is reused until `margin` seconds before it expires, then re-signed
+    on the next request for it.
+    """
+
+    def __init__(self, ttl: int, margin: int, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.margin = margin
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, language: str, category: str, filename: str) -> str:
+        key = (language, category, filename)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] - self.margin > now:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        url = generate_obs_signed_url(
+            language=language,
+            category=category,
+            filename=filename,
+            expiration=self.ttl,
+        )
+
+        with self._lock:
+            self._entries[key] = (url, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return url
+
+
+signed_url_cache = SignedUrlCache(
+    ttl=settings.PREVIEW_URL_TTL_SECONDS,
+    margin=settings.PREVIEW_URL_REFRESH_MARGIN_SECONDS,
+)
@@ -9,6 +9,7 @@ class AudioSamplePreview(BaseModel):
     sentence_id: Optional[str] = Field(default=None)
     sentence: Optional[str] = Field(default=None)
     storage_link: Optional[str] = Field(default=None)
+    audio_url: Optional[str] = Field(default=None)
     audio_url_obs: Optional[str] = Field(default=None)
     transcript_url_obs: Optional[str] = Field(default=None)
     gender: Optional[str] = Field(default=None)
@@ -30,4 +31,5 @@ class EstimatedSizeResponse(BaseModel):
     estimated_size_bytes: int
     estimated_size_mb: float
     sample_count: int
+    exact: bool = False  # every sample's audio size is known; only metadata/README are estimated
     # total_durations: Optional[str] = None
\ No newline at end of file
@@ -1,12 +1,14 @@
 from re import split
 from fastapi import HTTPException, BackgroundTasks
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Tuple
 import math
 from botocore.exceptions import NoCredentialsError
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, or_, func, cast, case, literal, union_all, Float, BigInteger
+from zipfile import ZIP64_LIMIT
 from sqlalchemy.ext.asyncio import AsyncScalarResult
 
 from src.db.models import AudioSample, DownloadLog, GenderEnum
@@ -15,7 +17,6 @@ from src.config import settings
 from src.download.s3_config import (
     SUPPORTED_LANGUAGES,
     generate_obs_signed_url,
-    s3_aws,
 )
 from src.download.utils import (
     stream_zip_with_metadata,
@@ -23,32 +24,100 @@ from src.download.utils import (
     generate_readme,
     stream_zip_to_s3,
 )
-import aioboto3
+from src.download.audio_proxy import AUDIO_URL
+from src.download.inventory import in_inventory
+from src.download.zip_size import (
+    AUDIO_ARCNAME_EXTRA,
+    AUDIO_BYTES_PER_SECOND,
+    METADATA_ROW_OVERHEAD,
+    WAV_HEADER_BYTES,
+    ZipSizePlan,
+    audio_entry_bytes,
+)
+from src.storage.registry import get_storage
+from src.download.preview_pool import (
+    catalog_has_language,
+    pick_preview_candidates,
+    preview_pool_exists,
+    request_preview_pool,
+    signed_url_cache,
+)
+import logging, time
+from src.core.metrics import FILTER_CORE_QUERY_SECONDS, FILTER_CORE_STREAM_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def sample_filters(
+    language: str,
+    category: str | None = None,
+    gender: str | None = None,
+    age_group: str | None = None,
+    education: str | None = None,
+    split: str | None = None,
+    domain: str | None = None,
+) -> list:
+    """WHERE clauses selecting the samples of an export."""
+    filters = [AudioSample.language == language]
+    if gender:
+        filters.append(AudioSample.gender == gender)
+    if category:
+        filters.append(AudioSample.category == category)
+    if age_group:
+        filters.append(AudioSample.age_group == age_group)
+    if education:
+        filters.append(AudioSample.edu_level == education)
+    if domain:
+        filters.append(AudioSample.domain == domain)
+    if split:
+        filters.append(AudioSample.split == split)
+    if settings.INVENTORY_SKIP_MISSING:
+        filters.append(in_inventory())
+    return filters
+
+
+def spec_filters(spec: dict) -> list:
+    """`sample_filters` of one spec of a batch export."""
+    return sample_filters(
+        spec["language"], spec.get("category"), spec.get("gender"), spec.get("age_group"),
+        spec.get("education"), spec.get("split"), spec.get("domain"),
+    )
 
 
-AUDIO_SAMPLE_RATE = 48000  # Hz
-AUDIO_BIT_DEPTH = 16       # bits
-AUDIO_CHANNELS = 1         # mono
-COMPRESSION_RATIO = 0.65 
+def size_columns() -> list:
+    """Per-sample columns aggregated by `DownloadService._plan_size`."""
+    seconds = cast(func.nullif(AudioSample.duration, ""), Float)
+    audio_bytes = func.coalesce(
+        AudioSample.size_bytes,
+        cast(func.coalesce(seconds, 0) * AUDIO_BYTES_PER_SECOND, BigInteger) + WAV_HEADER_BYTES,
+    )
+    name_bytes = func.coalesce(func.octet_length(AudioSample.sentence_id), 0) + AUDIO_ARCNAME_EXTRA
+    metadata_bytes = (
+        func.coalesce(func.octet_length(AudioSample.sentence), 0) + 2 * name_bytes + METADATA_ROW_OVERHEAD
+    )
+    return [
+        AudioSample.size_bytes,
+        audio_bytes.label("audio_bytes"),
+        name_bytes.label("name_bytes"),
+        seconds.label("seconds"),
+        metadata_bytes.label("metadata_bytes"),
+    ]
 
 
 def upload_to_s3(local_path: str, bucket_name: str, object_name: str):
-    """Upload file to S3 and return a signed URL."""
+    """Upload file to the export bucket (`bucket_name`) and return a signed URL."""
+    storage = get_storage("aws")
     try:
-        s3_aws.upload_file(local_path, bucket_name, object_name)
-        print(f"✅ Uploaded {local_path} to s3://{bucket_name}/{object_name}")
+        with open(local_path, "rb") as f:
+            storage.upload_fileobj(object_name, f)
+        logger.info(f"✅ Uploaded {local_path} to s3://{storage.bucket}/{object_name}")
     except NoCredentialsError:
         raise HTTPException(status_code=500, detail="AWS credentials not available")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload to S3: {e}")
 
     # Generate signed URL (valid for 1 hour)
-    url = s3_aws.generate_presigned_url(
-        "get_object",
-        Params={"Bucket": bucket_name, "Key": object_name},
-        ExpiresIn=3600
-    )
-    return url
+    return storage.sign(object_name, 3600)
 
 
 
@@ -69,7 +138,7 @@ class DownloadService:
         split: str | None = None,
         domain: str | None = None,
     ):
-        samples, _ = await self.filter_core(
+        samples = await pick_preview_candidates(
             session=session,
             language=language,
             limit=limit,
@@ -81,28 +150,40 @@ class DownloadService:
             domain=domain,
         )
 
-
+        if not samples:
+            # A language without any pool has not been built yet: ask for one
+            # (once per language, see request_preview_pool) and say it is coming
+            if not await preview_pool_exists(session, language) and await catalog_has_language(session, language):
+                await run_in_threadpool(request_preview_pool, language)
+                raise HTTPException(
+                    503,
+                    "Preview pool warming, please retry shortly",
+                    headers={"Retry-After": "30"},
+                )
+            raise HTTPException(
+                404,
+                "No audio samples found. There might not be enough data for the selected filters",
+            )
 
         urls = [
             {
-                "id": str(s.id),
+                "id": str(s.sample_id),
                 "annotator_id": s.speaker_id,
                 "sentence_id": s.sentence_id,
                 "sentence": s.sentence,
                 "storage_link": s.storage_link,
                 "gender": s.gender,
-                "audio_url_obs": generate_obs_signed_url(
+                "audio_url": AUDIO_URL.format(sample_id=s.sample_id),
+                "audio_url_obs": signed_url_cache.get(
                     language=s.language.lower(),
                     category=s.category,
                     filename=f"{s.sentence_id}.wav",
-                    storage_link=s.storage_link,
-                ),
+                ) if settings.PREVIEW_SIGNED_URLS else None,
                 # "transcript_url_obs": map_sentence_id_to_transcript_obs(s.sentence_id, s.language, s.category, s.sentence),
                 "age_group": s.age_group,
                 "edu_level": s.edu_level,
                 "durations": s.duration,
                 "language": s.language,
-                "edu_level": s.edu_level,
                 "snr": s.snr,
                 "domain": s.domain,
                 "category": s.category,
@@ -132,26 +213,14 @@ class DownloadService:
         split: str | None = None,
         domain: str | None = None,
     ):
-        filters = [AudioSample.language == language]
-        
-        try:
-            if gender:
-                filters.append(AudioSample.gender == gender)
-            if category:
-                filters.append(AudioSample.category == category)
-            if age_group:
-                filters.append(AudioSample.age_group == age_group)
-            if education:
-                filters.append(AudioSample.edu_level == education)
-            if domain:
-                filters.append(AudioSample.domain == domain)
-            if split:
-                filters.append(AudioSample.split == split)
+        filters = sample_filters(language, category, gender, age_group, education, split, domain)
 
+        try:
             # Always fetch total first
             total_stmt = select(AudioSample.id).where(and_(*filters))
-            total_result = await session.execute(total_stmt)
-            total = len(total_result.scalars().all())
+            with FILTER_CORE_QUERY_SECONDS.labels(query="count").time():
+                total_result = await session.execute(total_stmt)
+                total = len(total_result.scalars().all())
         except Exception as e:
             raise HTTPException(500, f"Failed to count samples: {e}")   
 
@@ -178,8 +247,9 @@ class DownloadService:
         if effective_limit:
             stmt = stmt.limit(effective_limit)
 
-        result = await session.execute(stmt)
-        samples = result.scalars().all()
+        with FILTER_CORE_QUERY_SECONDS.labels(query="select").time():
+            result = await session.execute(stmt)
+            samples = result.scalars().all()
 
         return samples, total
 
@@ -196,42 +266,20 @@ class DownloadService:
         education: str | None = None,
         split: str | None = None,
         domain: str | None = None,
+        num_to_fetch: Optional[int] = None,
     ) -> Tuple[AsyncScalarResult[AudioSample], int]:
         """
         Returns a memory-efficient async stream of AudioSample records and the total count.
+        Pass `num_to_fetch` (e.g. `export_size(...)["sample_count"]`) when it is already known.
         """
-        print(f"This is all the filter parameters {language}, {pct}, {category}, {gender}, {age_group}, {education}, {split}, {domain}")
-        filters = [AudioSample.language == language]
-        if gender:
-            filters.append(AudioSample.gender == gender)
-        if category:
-            filters.append(AudioSample.category == category)
-        if age_group:
-            filters.append(AudioSample.age_group == age_group)
-        if education:
-            filters.append(AudioSample.edu_level == education)
-        if domain:
-            filters.append(AudioSample.domain == domain)
-        if split:
-            filters.append(AudioSample.split == split)
-
-        # Efficiently count the total matching rows without loading them
-        count_query = select(func.count(AudioSample.id)).where(and_(*filters))
-        total_available_result = await session.execute(count_query)
-        total_available = total_available_result.scalar_one()
+        logger.debug(f"Filter parameters: {language}, {pct}, {category}, {gender}, {age_group}, {education}, {split}, {domain}")
+        filters = sample_filters(language, category, gender, age_group, education, split, domain)
 
-        if total_available == 0:
+        if num_to_fetch is None:
+            num_to_fetch = await self._num_to_fetch(session, filters, pct)
+        if num_to_fetch == 0:
             raise ValueError("No audio samples found for the selected criteria.")
 
-        # Determine how many records to fetch
-        if pct is not None:
-            if not (0 < pct <= 100):
-                raise ValueError("Percentage must be between 0 and 100")
-            num_to_fetch = math.ceil((pct / 100) * total_available)
-        else:
-            # Default to all if no percentage is given
-            num_to_fetch = total_available
-
         # Build the main query that will be streamed
         query = (
             select(AudioSample)
@@ -241,54 +289,201 @@ class DownloadService:
         )
 
         # Use session.stream_scalars to get an async iterator. This is the key change.
-        result_stream = await session.stream_scalars(query)
+        with FILTER_CORE_STREAM_QUERY_SECONDS.labels(query="open_stream").time():
+            result_stream = await session.stream_scalars(query)
         
         return result_stream, num_to_fetch
 
 
 
-    async def estimate_zip_size_only(
+    async def export_size(
         self,
         session: AsyncSession,
         language: str,
         pct: int | float,
-        category: str = None,
-        gender: GenderEnum | None = None,
+        category: str | None = None,
+        gender: str | None = None,
         age_group: str | None = None,
         education: str | None = None,
         split: str | None = None,
         domain: str | None = None,
+        num_to_fetch: Optional[int] = None,
     ) -> dict:
         """
-        Estimate total dataset ZIP size using durations instead of actual file sizes.
+        Size of the export ZIP for these filters, from stored `size_bytes`.
+
+        Selects the same rows as `filter_core_stream` and aggregates them in
+        one query; the ZIP overhead is computed by `ZipSizePlan`. Samples
+        without `size_bytes` fall back to a PCM estimate from their duration,
+        and `exact` is False then. Its `sample_count` is the `num_to_fetch`
+        of `filter_core_stream`, which can take it instead of counting again.
         """
-        # Reuse your filter logic
-        samples, total = await self.filter_core(
-            session=session,
-            language=language,
-            category=category,
-            gender=gender,
-            split=split,
-            age_group=age_group,
-            education=education,
-            domain=domain,
-            pct=pct
+        if not (0 < pct <= 100):
+            raise ValueError("Percentage must be between 0 and 100")
+
+        filters = sample_filters(language, category, gender, age_group, education, split, domain)
+        if num_to_fetch is None:
+            num_to_fetch = await self._num_to_fetch(session, filters, pct)
+
+        picked = (
+            select(AudioSample.id, *size_columns())
+            .where(and_(*filters))
+            .order_by(AudioSample.id)
+            .limit(num_to_fetch)
+            .subquery()
         )
+        return await self._plan_size(session, picked, ["id"])
 
-        total_duration = sum(float(s.duration) for s in samples if s.duration)
+    async def _num_to_fetch(self, session: AsyncSession, filters: list, pct: Optional[float]) -> int:
+        """Rows an export of `pct` percent of the `filters` matches takes (all of them without `pct`)."""
+        if pct is not None and not (0 < pct <= 100):
+            raise ValueError("Percentage must be between 0 and 100")
+        count_query = select(func.count(AudioSample.id)).where(and_(*filters))
+        with FILTER_CORE_STREAM_QUERY_SECONDS.labels(query="count").time():
+            total_available = (await session.execute(count_query)).scalar_one()
+        return total_available if pct is None else math.ceil((pct / 100) * total_available)
+
+    async def _plan_size(self, session: AsyncSession, picked, order_by: List[str], folders=("",)) -> dict:
+        """Aggregate `size_columns` rows of `picked`, archived in `order_by` order."""
+        stmt = select(
+            func.count(),
+            func.count(picked.c.size_bytes),
+            func.coalesce(func.sum(picked.c.audio_bytes), 0),
+            func.coalesce(func.sum(picked.c.name_bytes), 0),
+            func.coalesce(func.sum(picked.c.seconds), 0),
+            func.coalesce(func.sum(picked.c.metadata_bytes), 0),
+        )
+        with FILTER_CORE_QUERY_SECONDS.labels(query="size").time():
+            count, sized, audio, names, duration, metadata = (await session.execute(stmt)).one()
+
+        # Entries starting past ZIP64_LIMIT need a larger central header. Only an
+        # archive whose audio entries outgrow the limit has any; only then are
+        # the header offsets summed up, with a window over the same rows.
+        far = 0
+        if count * audio_entry_bytes(0, 0) + int(names) + int(audio) > ZIP64_LIMIT:
+            offset = func.sum(
+                audio_entry_bytes(picked.c.name_bytes, picked.c.audio_bytes)
+            ).over(order_by=[picked.c[column] for column in order_by], rows=(None, -1))
+            entries = select(offset.label("offset")).select_from(picked).subquery()
+            far_stmt = select(func.count()).select_from(entries).where(entries.c.offset > ZIP64_LIMIT)
+            with FILTER_CORE_QUERY_SECONDS.labels(query="size_offsets").time():
+                far = (await session.execute(far_stmt)).scalar_one()
+
+        plan = ZipSizePlan(
+            entries=count, audio_bytes=int(audio), name_bytes=int(names),
+            far_entries=far, metadata_bytes=int(metadata), folders=tuple(folders),
+        )
+        return {
+            "sample_count": count,
+            "sized_count": sized,
+            "audio_bytes": int(audio),
+            "total_bytes": plan.total_bytes() if count else 0,
+            "total_duration_seconds": round(float(duration), 2),
+            "exact": count > 0 and sized == count,
+        }
 
-        # Compute total size in bytes based on PCM WAV assumption
-        bytes_per_sample = AUDIO_BIT_DEPTH / 8
-        total_bytes = total_duration * AUDIO_SAMPLE_RATE * bytes_per_sample * AUDIO_CHANNELS
+    async def batch_counts(self, session: AsyncSession, specs: List[dict]) -> List[int]:
+        """
+        Samples each spec of a batch export takes (its `pct` of its matches),
+        counted for all the specs in one query.
+        """
+        clauses = [and_(*spec_filters(spec)) for spec in specs]
+        stmt = select(*[func.count().filter(clause) for clause in clauses]).where(or_(*clauses))
+        with FILTER_CORE_STREAM_QUERY_SECONDS.labels(query="batch_count").time():
+            totals = (await session.execute(stmt)).one()
+        return [math.ceil((spec["pct"] / 100) * total) for spec, total in zip(specs, totals)]
+
+    def _batch_picked(self, specs: List[dict], counts: List[int], *columns):
+        """
+        `(sample_id, spec, *columns)` of every sample a batch export takes:
+        each spec's first `count` matches by id, the same rows a single export
+        of that spec would take.
+        """
+        parts = [
+            select(AudioSample.id.label("sample_id"), literal(index).label("spec"), *columns)
+            .where(and_(*spec_filters(spec)))
+            .order_by(AudioSample.id)
+            .limit(count)
+            for index, (spec, count) in enumerate(zip(specs, counts))
+            if count
+        ]
+        return union_all(*parts).subquery("picked")
 
-        # Apply compression ratio
-        estimated_zip_bytes = total_bytes * COMPRESSION_RATIO
+    async def batch_export_size(
+        self,
+        session: AsyncSession,
+        specs: List[dict],
+        counts: List[int],
+    ) -> dict:
+        """`export_size` of a batch archive, with each spec's clips under `<folder>/`."""
+        picked = self._batch_picked(specs, counts, *size_columns())
+        folder_bytes = case(
+            {index: len(spec["folder"]) + 1 for index, spec in enumerate(specs)}, value=picked.c.spec, else_=0
+        )
+        entries = select(
+            *[column for column in picked.c if column.key != "name_bytes"],
+            (picked.c.name_bytes + folder_bytes).label("name_bytes"),
+        ).subquery()
+        folders = [f"{spec['folder']}/" for spec, count in zip(specs, counts) if count]
+        return await self._plan_size(session, entries, ["sample_id", "spec"], folders)
+
+    async def batch_stream(self, session: AsyncSession, specs: List[dict], counts: List[int]):
+        """
+        One server-side stream of `(AudioSample, spec index)` rows for all the
+        specs, ordered by sample id. A sample picked by several specs comes on
+        adjacent rows, so the worker fetches its audio once.
+        """
+        picked = self._batch_picked(specs, counts)
+        query = (
+            select(AudioSample, picked.c.spec)
+            .join(picked, picked.c.sample_id == AudioSample.id)
+            .order_by(AudioSample.id, picked.c.spec)
+        )
+        with FILTER_CORE_STREAM_QUERY_SECONDS.labels(query="open_stream").time():
+            return await session.stream(query)
+
+    async def estimate_zip_size_only(
+        self,
+        session: AsyncSession,
+        language: str,
+        pct: int | float,
+        category: str = None,
+        gender: GenderEnum | None = None,
+        age_group: str | None = None,
+        education: str | None = None,
+        split: str | None = None,
+        domain: str | None = None,
+    ) -> dict:
+        """
+        Size of the dataset ZIP: exact audio bytes plus computed ZIP overhead.
+        """
+        try:
+            size = await self.export_size(
+                session=session,
+                language=language,
+                pct=pct,
+                category=category,
+                gender=gender,
+                age_group=age_group,
+                education=education,
+                split=split,
+                domain=domain,
+            )
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+        if size["sample_count"] == 0:
+            raise HTTPException(
+                404,
+                "No audio samples found. There might not be enough data for the selected filters",
+            )
 
         return {
-            "estimated_size_bytes": int(estimated_zip_bytes),
-            "estimated_size_mb": round(estimated_zip_bytes / (1024 ** 2), 2),
-            "sample_count": len(samples),
-            "total_duration_seconds": round(total_duration, 2)
+            "estimated_size_bytes": size["total_bytes"],
+            "estimated_size_mb": round(size["total_bytes"] / (1024 ** 2), 2),
+            "sample_count": size["sample_count"],
+            "total_duration_seconds": size["total_duration_seconds"],
+            "exact": size["exact"],
         }
 
 
@@ -324,7 +519,7 @@ class DownloadService:
         if not samples:
             raise HTTPException(404, "No audio samples found for selected filters")
 
-        print("the total number of samples is ", total)
+        logger.info(f"The total number of samples is {total}")
         # 2. Log download
         background_tasks.add_task(
             session.add,
@@ -5,23 +5,26 @@ from typing import Optional, List
 import datetime
 import requests
 import aiohttp
-import asyncio, os, aioboto3
+import asyncio, os
 from fastapi import HTTPException
 from src.db.models import AudioSample, Category
 from src.download.s3_config import  SUPPORTED_LANGUAGES
-from src.download.s3_config import s3_aws
-from src.download.s3_config import generate_obs_signed_url, map_sentence_id_to_transcript_obs
+from src.download.s3_config import map_sentence_id_to_transcript_obs
+from src.storage.base import NotFound
+from src.storage.registry import get_async_storage, get_storage
 from sqlmodel import select, and_
 from src.config import settings
-from zipstream import ZipStream, ZIP_DEFLATED
+from zipstream import ZipStream, ZIP_DEFLATED, ZIP_STORED
+from src.core.metrics import MULTIPART_UPLOAD_PART_SECONDS, OBS_GET_OBJECT_BYTES, ZIP_BYTES_PRODUCED
+import logging
 
-s3 = s3_aws
+logger = logging.getLogger(__name__)
 
 # ================================================================================
 semaphore = asyncio.Semaphore(5)
 
 async def fetch_audio_stream(session, sample, retries=3):
-    print(f"Fetching {sample.sentence_id}")
+    logger.debug(f"Fetching {sample.sentence_id}")
     for attempt in range(1, retries + 1):
         try:
             async with session.get(sample.storage_link, timeout=10) as resp:
@@ -29,14 +32,14 @@ async def fetch_audio_stream(session, sample, retries=3):
                     audio_data = bytearray()
                     async for chunk in resp.content.iter_chunked(1024):
                         audio_data.extend(chunk)
-                    print(f"✅ Fetched {sample.sentence_id}")
+                    logger.debug(f"✅ Fetched {sample.sentence_id}")
                     return sample.sentence_id, bytes(audio_data)
                 else:
-                    print(f"❌ Non-200 status for {sample.sentence_id}: {resp.status}")
+                    logger.warning(f"❌ Non-200 status for {sample.sentence_id}: {resp.status}")
         except Exception as e:
-            print(f"[Attempt {attempt}] Error streaming {sample.sentence_id}: {e}")
+            logger.warning(f"[Attempt {attempt}] Error streaming {sample.sentence_id}: {e}")
             await asyncio.sleep(2 ** attempt)  # exponential backoff
-    print(f"❌ Failed to fetch {sample.sentence_id} after {retries} attempts")
+    logger.error(f"❌ Failed to fetch {sample.sentence_id} after {retries} attempts")
     return sample.sentence_id, None
 
 
@@ -48,25 +51,10 @@ async def fetch_all(samples):
     connector = aiohttp.TCPConnector(limit=10)
     async with aiohttp.ClientSession(connector=connector) as session:
         tasks = [fetch_audio_limited(session, s) for s in samples]
-        print(f"Downloading {len(samples)} samples")
+        logger.info(f"Downloading {len(samples)} samples")
         return await asyncio.gather(*tasks)
 
 
-async def fetch_size(session, url):
-    try:
-        async with session.head(url, timeout=5) as resp:
-            size = int(resp.headers.get("Content-Length", 0))
-            return size
-    except Exception:
-        return 0
-
-async def estimate_total_size(urls):
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_size(session, url) for url in urls]
-        sizes = await asyncio.gather(*tasks)
-        return sum(sizes)
-
-
 def generate_metadata_buffer(samples: List[AudioSample], as_excel=True):
     """Create metadata buffer in either Excel or CSV."""
     df = pd.DataFrame([{
@@ -147,16 +135,11 @@ async def stream_zip_with_metadata(samples, bucket: str, as_excel=True, language
     # # 1. Add audio files into /audio/
     for idx, s in enumerate(samples):
         audio_filename = f"{zip_folder}/audio/{s.sentence_id}.wav"
-        print("the language is: ", language, "\n\n")
-        print("the category is: ", category, "\n\n")
-
 
         key = f"{language.lower()}/{category.lower()}/{s.sentence_id}.wav"
 
-        print(f"\nDownloading {audio_filename}", "\n", key)
-        s3_stream = s3.get_object(Bucket=settings.OBS_BUCKET_NAME, Key=key)['Body']
-        print(f"\nDownloading {audio_filename}", "\n", s3_stream)
-        z.write_iter(audio_filename, s3_stream)
+        logger.debug(f"Downloading {audio_filename} from {key}")
+        z.write_iter(audio_filename, get_storage("obs").stream(key))
         sentence_id=s.sentence_id
 
     # 2. Add metadata (Excel or CSV)
@@ -183,113 +166,84 @@ async def stream_zip_to_s3(language: str, samples, as_excel: bool = True):
     object_key = f"exports/{zip_name}"
 
     # zs = zipstream.ZipFile(mode="w", compression=zipstream.ZIP_DEFLATED)
-    zs = ZipStream(compress_type=ZIP_DEFLATED, compress_level=9)
+    zs = ZipStream(compress_type=ZIP_STORED)
 
-    async with aiohttp.ClientSession() as http_session:
-        for s in samples:
-            try:
-                link = generate_obs_signed_url(
-                    language=s.language.lower(),
-                    category=s.category,
-                    filename=f"{s.sentence_id}.wav"
-                )
-                async with http_session.get(link) as resp:
-                    if resp.status != 200:
-                        print(f"⚠️ Skipping {s.sentence_id}, HTTP {resp.status}")
-                        continue
+    # --- STREAM UPLOAD TO S3 ---
+    # Each clip is written into `buffer` as soon as it is downloaded and full
+    # parts are uploaded right away, so memory stays at about one clip plus one part.
+    from src.tasks.export_pipeline import obs_key
+
+    exports = get_async_storage("aws")
+    obs = get_async_storage("obs")
+    upload_id = await exports.create_multipart(object_key)
 
-                    # read the audio file bytes asynchronously
-                    print(f"This is the download details: {s.sentence_id}, {s.sentence}")
-                    file_bytes = bytearray()
-                    async for chunk in resp.content.iter_chunked(1024 * 1024):
-                        file_bytes.extend(chunk)
+    parts = []
+    buffer = bytearray()
 
-                    # write the collected bytes as a single iterator for zipstream
-                    zs.add(iter([bytes(file_bytes)]), arcname=f"{zip_folder}/audio/{s.sentence_id}.wav")
+    def drain(chunks):
+        for chunk in chunks:
+            ZIP_BYTES_PRODUCED.labels(path="api").inc(len(chunk))
+            buffer.extend(chunk)
 
-                    
+    async def upload_parts(final: bool = False):
+        while len(buffer) >= CHUNK_SIZE or (final and buffer):
+            with memoryview(buffer) as view:
+                body = bytes(view[:CHUNK_SIZE])
+            del buffer[:CHUNK_SIZE]
 
+            part_number = len(parts) + 1
+            with MULTIPART_UPLOAD_PART_SECONDS.labels(path="api").time():
+                etag = await exports.upload_part(object_key, upload_id, part_number, body)
+            parts.append({"ETag": etag, "PartNumber": part_number})
 
+    try:
+        for s in samples:
+            try:
+                # read the audio file bytes asynchronously
+                logger.debug(f"Downloading {s.sentence_id}")
+                file_bytes = bytearray()
+                async for chunk in obs.stream(obs_key(s), 1024 * 1024):
+                    OBS_GET_OBJECT_BYTES.inc(len(chunk))
+                    file_bytes.extend(chunk)
+            except NotFound:
+                logger.warning(f"⚠️ Skipping {s.sentence_id}, not in OBS")
+                continue
             except Exception as e:
-                print(f"❌ Error fetching {s.sentence_id}: {e}")
+                logger.warning(f"❌ Error fetching {s.sentence_id}: {e}")
                 continue
 
-    # Add metadata
-    metadata_buf, metadata_filename = generate_metadata_buffer(samples, as_excel)
-    metadata_buf.seek(0)
-    zs.add(iter([metadata_buf.read()]), arcname=f"{zip_folder}/{metadata_filename}")
-    
-
-    # Add README
-    readme_text = generate_readme(language, 100, as_excel, len(samples), samples[-1].sentence_id)
-    zs.add(iter([readme_text.encode()]), arcname=f"{zip_folder}/README.txt")
-
-    # --- STREAM UPLOAD TO S3 ---
-    session = aioboto3.Session()
-    async with session.client(
-        "s3",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_REGION,
-        endpoint_url=settings.AWS_ENDPOINT_URL,
-    ) as s3_client:
-        # Start multipart upload
-        mpu = await s3_client.create_multipart_upload(
-            Bucket=settings.S3_BUCKET_NAME,
-            Key=object_key,
-        )
-
-        parts = []
-        part_number = 1
-        buffer = b""
-
-        try:
-            for chunk in zs:
-                buffer += chunk
-                if len(buffer) >= CHUNK_SIZE:
-                    part = await s3_client.upload_part(
-                        Bucket=settings.S3_BUCKET_NAME,
-                        Key=object_key,
-                        PartNumber=part_number,
-                        UploadId=mpu["UploadId"],
-                        Body=buffer,
-                    )
-                    parts.append({"ETag": part["ETag"], "PartNumber": part_number})
-                    part_number += 1
-                    buffer = b""
-
-            # Upload last remaining chunk
-            if buffer:
-                part = await s3_client.upload_part(
-                    Bucket=settings.S3_BUCKET_NAME,
-                    Key=object_key,
-                    PartNumber=part_number,
-                    UploadId=mpu["UploadId"],
-                    Body=buffer,
-                )
-                parts.append({"ETag": part["ETag"], "PartNumber": part_number})
-
-            # Complete multipart upload
-            await s3_client.complete_multipart_upload(
-                Bucket=settings.S3_BUCKET_NAME,
-                Key=object_key,
-                MultipartUpload={"Parts": parts},
-                UploadId=mpu["UploadId"],
-            )
-
-            signed_url = await s3_client.generate_presigned_url(
-                ClientMethod="get_object",
-                Params={"Bucket": settings.S3_BUCKET_NAME, "Key": object_key},
-                ExpiresIn=3600,
-            )
-
-            print(f"✅ Streamed directly to s3://{settings.S3_BUCKET_NAME}/{object_key}")
-            return {"download_url": signed_url}
-
-        except Exception as e:
-            await s3_client.abort_multipart_upload(
-                Bucket=settings.S3_BUCKET_NAME,
-                Key=object_key,
-                UploadId=mpu["UploadId"],
-            )
-            raise HTTPException(500, f"Streaming upload failed: {e}")
+            # write the collected bytes as a single iterator for zipstream;
+            # audio is stored, not deflated, so the archive size is exact
+            zs.add(iter([bytes(file_bytes)]), arcname=f"{zip_folder}/audio/{s.sentence_id}.wav", size=len(file_bytes))
+            del file_bytes
+            drain(zs.all_files())
+            await upload_parts()
+
+        # Add metadata
+        metadata_buf, metadata_filename = generate_metadata_buffer(samples, as_excel)
+        # Sized like the audio entries, so none of them needs zip64 placeholders
+        metadata_buf.seek(0)
+        metadata_bytes = metadata_buf.read()
+        zs.add(iter([metadata_bytes]), arcname=f"{zip_folder}/{metadata_filename}", size=len(metadata_bytes),
+               compress_type=ZIP_DEFLATED, compress_level=9)
+
+        # Add README
+        readme_bytes = generate_readme(language, 100, as_excel, len(samples), samples[-1].sentence_id).encode()
+        zs.add(iter([readme_bytes]), arcname=f"{zip_folder}/README.txt", size=len(readme_bytes),
+               compress_type=ZIP_DEFLATED, compress_level=9)
+
+        # Remaining entries plus the central directory, then the last part
+        drain(zs)
+        await upload_parts(final=True)
+
+        # Complete multipart upload
+        await exports.complete_multipart(object_key, upload_id, parts)
+
+        signed_url = await exports.sign(object_key, 3600)
+
+        logger.info(f"✅ Streamed directly to {exports.bucket}/{object_key}")
+        return {"download_url": signed_url}
+
+    except Exception as e:
+        await exports.abort_multipart(object_key, upload_id)
+        raise HTTPException(500, f"Streaming upload failed: {e}")
@@ -0,0 +1,75 @@
+"""
+Exact ZIP sizes for exports.
+
+Audio entries are written with ZIP_STORED and their size passed to
+zipstream-ng up front (see the export paths), so each one costs a fixed
+number of header bytes on top of the object itself:
+
+    local file header   30 + name
+    data descriptor     16
+    central directory   46 + name (+ 12 once its offset is past ZIP64_LIMIT)
+
+These mirror `ZipStream._add_size_from_file` in zipstream-ng. The
+metadata.csv and README.txt at the end are added with their size too, so
+their headers cost the same; only their deflated length is estimated. A
+batch export has one pair of them per folder (`folders`).
+"""
+import math
+from dataclasses import dataclass
+from typing import Tuple
+from zipfile import ZIP64_LIMIT
+
+LOCAL_HEADER = 30
+DATA_DESCRIPTOR = 16
+CENTRAL_HEADER = 46
+ZIP64_OFFSET_EXTRA = 12            # <HHQ>: a zip64 extra holding the header offset
+END_OF_CENTRAL_DIR = 22
+ZIP64_END_RECORDS = 56 + 20        # zip64 end record + locator
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+
+AUDIO_ARCNAME_EXTRA = len("audio/") + len(".wav")   # arcname = audio/<sentence_id>.wav
+# PCM fallback for samples whose size_bytes is not known yet
+AUDIO_SAMPLE_RATE = 48000
+AUDIO_BYTES_PER_SECOND = AUDIO_SAMPLE_RATE * 2       # 16-bit mono
+WAV_HEADER_BYTES = 44
+# metadata.csv: bytes per row besides transcript/ids, and how well it deflates
+METADATA_ROW_OVERHEAD = 96
+METADATA_DEFLATE_RATIO = 0.35
+README_BYTES = 1024
+
+
+def audio_entry_bytes(name_bytes: int, size_bytes: int) -> int:
+    """Bytes an audio entry adds before the central directory."""
+    return LOCAL_HEADER + name_bytes + size_bytes + DATA_DESCRIPTOR
+
+
+@dataclass
+class ZipSizePlan:
+    """Aggregates of the audio entries, as computed by `DownloadService.export_size`."""
+    entries: int
+    audio_bytes: int                # stored data (exact for sized samples)
+    name_bytes: int                 # total arcname bytes of the audio entries
+    far_entries: int                # entries whose header starts past ZIP64_LIMIT
+    metadata_bytes: int = 0         # metadata.csv before deflate
+    folders: Tuple[str, ...] = ("",)  # arcname prefix of each metadata.csv/README.txt pair
+
+    def total_bytes(self) -> int:
+        files = self.entries * (LOCAL_HEADER + DATA_DESCRIPTOR) + self.name_bytes + self.audio_bytes
+        central = self.entries * CENTRAL_HEADER + self.name_bytes + self.far_entries * ZIP64_OFFSET_EXTRA
+
+        # metadata.csv and README.txt: deflated, added last
+        metadata = math.ceil(self.metadata_bytes * METADATA_DEFLATE_RATIO / len(self.folders))
+        trailers = [
+            (f"{folder}{name}", size)
+            for folder in self.folders
+            for name, size in (("metadata.csv", metadata), ("README.txt", README_BYTES))
+        ]
+        for name, size in trailers:
+            far = files > ZIP64_LIMIT
+            files += LOCAL_HEADER + len(name) + size + DATA_DESCRIPTOR
+            central += CENTRAL_HEADER + len(name) + (ZIP64_OFFSET_EXTRA if far else 0)
+
+        end = END_OF_CENTRAL_DIR
+        if self.entries + len(trailers) > ZIP_FILECOUNT_LIMIT or files > ZIP64_LIMIT or central > ZIP64_LIMIT:
+            end += ZIP64_END_RECORDS
+        return files + central + end
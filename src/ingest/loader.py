@@ -0,0 +1,264 @@
+"""
+Bulk catalog loader: CSV/TSV, Parquet or XLSX manifests into `audiosample`.
+
+    python -m src.ingest.loader manifests/*.parquet --workers 4
+    python -m src.ingest.loader batch_07.xlsx --dataset-id yoruba
+
+Each file is streamed in chunks (`--chunk-size` rows), normalised with
+`normalize_catalog`, COPYed into a temp staging table and upserted on
+(`language`, `sentence_id`). Re-loading a file is therefore safe: unchanged
+rows are left alone, changed rows are updated in place and keep their id.
+Each chunk commits on its own, so an interrupted load is resumed by running
+it again.
+
+Files load in parallel, one process per file (`--workers`). Once every file
+is in, the rollups derived from the catalog are refreshed for the languages
+that were touched (`--no-refresh` skips that).
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.config import settings
+from src.db.bulk import copy_rows
+from src.db.models import AudioSample, Dataset
+from src.ingest.manifest import CATALOG_COLUMNS, manifest_records, normalize_catalog
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 50_000
+STAGE_TABLE = "audiosample_stage"
+# Never overwritten by a re-load: the sample keeps its id and first load time
+KEEP_ON_CONFLICT = ("id",)
+# Only overwritten when the manifest has a value (sizes may come from a backfill)
+KEEP_IF_MISSING = ("size_bytes",)
+
+# A sentence_id is unique within its language (the audio lives under the language's prefix)
+CONFLICT_KEY = ("language", "sentence_id")
+
+_UPDATE_COLUMNS = [c for c in CATALOG_COLUMNS if c not in KEEP_ON_CONFLICT and c not in CONFLICT_KEY]
+_COLUMN_LIST = ", ".join(CATALOG_COLUMNS)
+_NEW_VALUES = [
+    f"COALESCE(EXCLUDED.{c}, audiosample.{c})" if c in KEEP_IF_MISSING else f"EXCLUDED.{c}"
+    for c in _UPDATE_COLUMNS
+]
+
+# Only the loaded columns and no constraints; the upsert enforces those
+CREATE_STAGE_SQL = text(
+    f"CREATE TEMP TABLE {STAGE_TABLE} ON COMMIT DROP AS SELECT {_COLUMN_LIST} FROM audiosample WITH NO DATA"
+)
+UPSERT_SQL = text(f"""
+    INSERT INTO audiosample ({_COLUMN_LIST}, created_at, uploaded_at)
+    SELECT {_COLUMN_LIST}, LOCALTIMESTAMP, now() FROM {STAGE_TABLE}
+    ON CONFLICT ({", ".join(CONFLICT_KEY)}) DO UPDATE SET
+        {", ".join(f"{c} = {value}" for c, value in zip(_UPDATE_COLUMNS, _NEW_VALUES))}
+    WHERE ({", ".join(f"audiosample.{c}" for c in _UPDATE_COLUMNS)})
+        IS DISTINCT FROM ({", ".join(_NEW_VALUES)})
+    RETURNING (xmax = 0) AS inserted
+""")
+
+
+def iter_manifest_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield a manifest as DataFrames of at most `chunk_size` rows, without loading it whole."""
+    suffixes = Path(path).suffixes
+    suffix = suffixes[-2] if suffixes and suffixes[-1] == ".gz" and len(suffixes) > 1 else Path(path).suffix
+    suffix = suffix.lower()
+
+    if suffix in (".csv", ".tsv"):
+        # Read as text so ids like "007" survive; normalize_catalog coerces numbers
+        yield from pd.read_csv(
+            path, sep="\t" if suffix == ".tsv" else ",", dtype=str,
+            keep_default_na=False, na_values=[""], chunksize=chunk_size,
+        )
+    elif suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif suffix in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(c) if c is not None else "" for c in next(rows, ())]
+            while chunk := list(islice(rows, chunk_size)):
+                yield pd.DataFrame(chunk, columns=header)
+        finally:
+            workbook.close()
+    else:
+        raise ValueError(f"Unsupported manifest type: {path} (expected .csv, .tsv, .parquet or .xlsx)")
+
+
+async def upsert_chunk(session, rows: List[dict]) -> Dict[str, int]:
+    """Stage `rows` with COPY and upsert them into `audiosample` in the session's transaction."""
+    await session.execute(CREATE_STAGE_SQL)
+    await copy_rows(session, AudioSample, rows, columns=CATALOG_COLUMNS, table_name=STAGE_TABLE)
+    result = await session.execute(UPSERT_SQL)
+    written = [row.inserted for row in result]
+    inserted = sum(written)
+    return {
+        "inserted": inserted,
+        "updated": len(written) - inserted,
+        "unchanged": len(rows) - len(written),
+    }
+
+
+async def load_file(
+    path: str,
+    dataset_id: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    session_maker=None,
+) -> dict:
+    """Load one manifest. Returns its row counts and the languages it touched."""
+    from src.db.db import get_async_session_maker
+
+    session_maker = session_maker or get_async_session_maker()
+    totals: Counter = Counter()
+    rejected: Counter = Counter()
+    languages = set()
+    datasets = set()
+    started = time.perf_counter()
+
+    for number, chunk in enumerate(iter_manifest_chunks(path, chunk_size), start=1):
+        frame, reasons = normalize_catalog(chunk, dataset_id)
+        rejected.update(reasons)
+        languages.update(frame["language"].unique())
+        datasets.update(frame["dataset_id"].dropna().unique())
+        totals["read"] += len(chunk)
+
+        if len(frame):
+            async with session_maker() as session:
+                counts = await upsert_chunk(session, manifest_records(frame))
+                await session.commit()
+            totals.update(counts)
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"📥 {path} chunk {number}: {totals['read']} rows read, {totals['inserted']} new, "
+            f"{totals['updated']} updated, {totals['unchanged']} unchanged, {sum(rejected.values())} rejected "
+            f"({totals['read'] / elapsed:,.0f} rows/s)"
+        )
+
+    if rejected:
+        logger.warning(f"⚠️ {path}: rejected rows by reason: {dict(rejected)}")
+    return {
+        "path": path,
+        **{key: totals[key] for key in ("read", "inserted", "updated", "unchanged")},
+        "rejected": dict(rejected),
+        "languages": sorted(languages),
+        "datasets": sorted(datasets),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def _load_file_in_process(path: str, dataset_id: Optional[str], chunk_size: int) -> dict:
+    """Process-pool entry point: a fresh engine per process, disposed afterwards."""
+    _configure_logging()
+    from src.db.db import get_async_session_maker
+
+    async def run():
+        session_maker = get_async_session_maker(force_new=True)
+        try:
+            return await load_file(path, dataset_id, chunk_size, session_maker)
+        finally:
+            await session_maker.kw["bind"].dispose()
+
+    return asyncio.run(run())
+
+
+async def refresh_rollups(languages: Iterable[str], datasets: Iterable[str] = ()) -> None:
+    """Rebuild the catalog-derived tables for `languages` and `datasets` after a load."""
+    from src.admin.rollups import refresh_dataset_counts
+    from src.db.db import dispose_async_engine, get_async_session_maker
+    from src.download.preview_pool import refresh_preview_pool
+
+    session_maker = get_async_session_maker()
+    try:
+        async with session_maker() as session:
+            for language in sorted(set(languages)):
+                kept = await refresh_preview_pool(session, language)
+                logger.info(f"🔄 Preview pool for {language}: {kept} candidates")
+            await refresh_dataset_counts(session, sorted(set(datasets)))
+            await session.commit()
+    finally:
+        await dispose_async_engine()
+
+
+async def _check_dataset(dataset_id: str) -> None:
+    from src.db.db import dispose_async_engine, get_async_session_maker
+
+    try:
+        async with get_async_session_maker()() as session:
+            if await session.get(Dataset, dataset_id) is None:
+                raise SystemExit(f"Unknown dataset: {dataset_id}")
+    finally:
+        await dispose_async_engine()
+
+
+def load_files(
+    paths: List[str],
+    dataset_id: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    workers: int = 4,
+    refresh: bool = True,
+) -> List[dict]:
+    """Load `paths` in parallel (one process per file), then refresh rollups."""
+    if dataset_id:
+        asyncio.run(_check_dataset(dataset_id))
+
+    results = []
+    failed = []
+    context = multiprocessing.get_context("spawn")  # no inherited engine or event loop
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(paths))), mp_context=context) as pool:
+        futures = {pool.submit(_load_file_in_process, path, dataset_id, chunk_size): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"❌ Loading {futures[future]} failed: {e}")
+                failed.append(futures[future])
+
+    touched = {language for result in results for language in result["languages"]}
+    datasets = {dataset for result in results for dataset in result["datasets"]}
+    if refresh and touched:
+        asyncio.run(refresh_rollups(touched, datasets))
+    if failed:
+        raise SystemExit(f"{len(failed)} file(s) failed, re-run them to resume: {failed}")
+    return results
+
+
+def _configure_logging():
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(message)s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Manifest files (.csv, .tsv, .parquet, .xlsx)")
+    parser.add_argument("--dataset-id", help="Load every row into this dataset (default: the dataset_id column)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=4, help="Files loaded in parallel")
+    parser.add_argument("--no-refresh", action="store_true", help="Skip refreshing rollups after the load")
+    args = parser.parse_args()
+
+    _configure_logging()
+    started = time.perf_counter()
+    results = load_files(args.paths, args.dataset_id, args.chunk_size, args.workers, not args.no_refresh)
+    rows = sum(result["read"] for result in results)
+    elapsed = time.perf_counter() - started
+    logger.info(f"✅ Loaded {rows} rows from {len(results)} file(s) in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Upload manifests: the sheet that describes a batch of clips.
+
+`validate_manifest` checks a whole sheet with column-wise pandas operations
+(no `iterrows`) and reports every bad row at once. It returns a frame keyed
+by `audiosample` column names, ready for `manifest_records`.
+
+`normalize_catalog` is the lenient variant used by the bulk loader
+(src/ingest/loader.py): bad rows are dropped and counted instead of failing
+a million-row load.
+"""
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from src.db.models import Category, Split
+from src.download.s3_config import SUPPORTED_LANGUAGES, VALID_CATEGORIES
+
+
+# Sheet column -> audiosample column (see COLUMNS in s3_config / the template)
+COLUMN_MAP = {
+    "transcript": "sentence",
+    "transcript_id": "sentence_id",
+    "speaker_id": "speaker_id",
+    "category": "category",
+    "language": "language",
+    "gender": "gender",
+    "duration": "duration",
+    "snr": "snr",
+    "age": "age_group",
+}
+REQUIRED_COLUMNS = {"transcript", "sample_rate", "snr", "audio_path", "language", "gender", "duration"}
+GENDERS = {"male", "female"}
+# Rows quoted per problem in the error message
+MAX_REPORTED_ROWS = 10
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.astype("string").str.strip()
+
+
+def _sheet_rows(mask: pd.Series) -> List[int]:
+    # Spreadsheet row numbers: 1-based plus the header row
+    return [int(i) + 2 for i in mask[mask].index[:MAX_REPORTED_ROWS]]
+
+
+def validate_manifest(df: pd.DataFrame, filenames: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Validate and normalise an upload sheet.
+
+    Languages, genders and categories are lower-cased, numbers are coerced and
+    `audio_path` must be unique (and among `filenames`, if given). Raises
+    ValueError listing every problem with the sheet rows it was found on.
+    """
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    missing = REQUIRED_COLUMNS - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing columns: {sorted(missing)}")
+    df = df.reset_index(drop=True)
+
+    out = pd.DataFrame(index=df.index)
+    out["audio_path"] = _text(df["audio_path"])
+    for source, column in COLUMN_MAP.items():
+        if source in df.columns and column not in ("snr", "duration"):
+            out[column] = _text(df[source])
+
+    out["language"] = out["language"].str.lower()
+    out["gender"] = out["gender"].str.lower()
+    out["category"] = out["category"].str.lower().fillna("read") if "category" in out else "read"
+
+    snr = pd.to_numeric(df["snr"], errors="coerce")
+    duration = pd.to_numeric(df["duration"], errors="coerce")
+    sample_rate = pd.to_numeric(df["sample_rate"], errors="coerce")
+
+    languages = {language.lower() for language in SUPPORTED_LANGUAGES}
+    checks: Dict[str, pd.Series] = {
+        "missing audio_path": out["audio_path"].isna() | (out["audio_path"] == ""),
+        "duplicate audio_path": out["audio_path"].duplicated(keep=False) & out["audio_path"].notna(),
+        "missing transcript": out["sentence"].isna() | (out["sentence"] == ""),
+        f"unsupported language (expected one of {sorted(languages)})": ~out["language"].isin(languages),
+        f"invalid gender (expected one of {sorted(GENDERS)})": ~out["gender"].isin(GENDERS),
+        f"invalid category (expected one of {sorted(VALID_CATEGORIES)})": ~out["category"].isin(VALID_CATEGORIES),
+        "snr must be a number >= 0": snr.isna() | (snr < 0),
+        "duration must be a number > 0": duration.isna() | (duration <= 0),
+        "sample_rate must be a number > 0": sample_rate.isna() | (sample_rate <= 0),
+    }
+    if filenames is not None:
+        checks["file not found in upload"] = out["audio_path"].notna() & ~out["audio_path"].isin(set(filenames))
+
+    problems = [
+        f"{name}: {int(mask.sum())} row(s), e.g. rows {_sheet_rows(mask)}"
+        for name, mask in checks.items() if mask.any()
+    ]
+    if problems:
+        raise ValueError("Invalid manifest: " + "; ".join(problems))
+
+    out["snr"] = snr.round().astype(int)
+    out["duration"] = duration.map(lambda d: f"{d:.2f}")
+    return out
+
+
+# Catalog columns written by the loader, in COPY order
+CATALOG_COLUMNS = (
+    "id", "dataset_id", "sentence_id", "sentence", "storage_link", "gender", "source",
+    "speaker_id", "split", "age_group", "edu_level", "duration", "language", "snr",
+    "domain", "category", "size_bytes",
+)
+# Other spellings seen in manifests and metadata exports
+CATALOG_ALIASES = {
+    "transcript": "sentence",
+    "transcript_id": "sentence_id",
+    "audio_path": "storage_link",
+    "age": "age_group",
+    "education": "edu_level",
+    "durations": "duration",
+    "size": "size_bytes",
+    "file_size": "size_bytes",
+}
+GENDER_ALIASES = {"m": "male", "f": "female"}
+SPLIT_ALIASES = {"test": "dev_test", "devtest": "dev_test", "validation": "dev", "valid": "dev"}
+DEFAULT_SNR = 40
+
+
+def _seconds(duration: pd.Series) -> pd.Series:
+    """Durations as seconds: plain numbers, "3.2s", "mm:ss" or "hh:mm:ss"."""
+    text = _text(duration.astype(object)).str.rstrip("sS ")
+    seconds = pd.to_numeric(text, errors="coerce")
+    clock = text.str.contains(":", na=False)
+    if clock.any():
+        clock_text = text[clock].where(text[clock].str.count(":") == 2, "00:" + text[clock])
+        seconds[clock] = pd.to_timedelta(clock_text, errors="coerce").dt.total_seconds()
+    return seconds
+
+
+def normalize_catalog(df: pd.DataFrame, dataset_id: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Normalise a catalog chunk to `CATALOG_COLUMNS`.
+
+    Enums are lower-cased and mapped to the model's values, durations become
+    "%.2f" seconds, missing splits/categories/SNRs take the model defaults and
+    every row gets a fresh `id` (kept only if the row is new). Rows that
+    cannot be loaded are dropped; returns the frame and a count per reason.
+    """
+    df = df.rename(columns=lambda c: str(c).strip().lower()).rename(columns=CATALOG_ALIASES)
+    df = df.loc[:, ~df.columns.duplicated()].reset_index(drop=True)
+    out = pd.DataFrame(index=df.index)
+
+    for column in CATALOG_COLUMNS:
+        if column in ("id", "duration", "snr", "size_bytes"):
+            continue
+        out[column] = _text(df[column]) if column in df.columns else pd.Series(pd.NA, index=df.index, dtype="string")
+    out = out.replace("", pd.NA)
+
+    for column in ("language", "gender", "category", "split"):
+        out[column] = out[column].str.lower()
+    out["gender"] = out["gender"].replace(GENDER_ALIASES)
+    out["category"] = out["category"].str.replace(r"[\s-]+", "_", regex=True).fillna(Category.read.value)
+    out["split"] = out["split"].str.replace(r"[\s-]+", "_", regex=True).replace(SPLIT_ALIASES).fillna(Split.train.value)
+    if dataset_id:
+        out["dataset_id"] = dataset_id
+    out["dataset_id"] = out["dataset_id"].fillna("naija")
+
+    seconds = _seconds(df["duration"]) if "duration" in df.columns else pd.Series(float("nan"), index=df.index)
+    snr = pd.to_numeric(df["snr"], errors="coerce") if "snr" in df.columns else pd.Series(float("nan"), index=df.index)
+    has_duration = df["duration"].notna() if "duration" in df.columns else pd.Series(False, index=df.index)
+    size = pd.to_numeric(df["size_bytes"], errors="coerce") if "size_bytes" in df.columns else pd.Series(float("nan"), index=df.index)
+
+    checks = {
+        "missing sentence_id": out["sentence_id"].isna(),
+        "missing language": out["language"].isna(),
+        "invalid gender": out["gender"].notna() & ~out["gender"].isin(GENDERS),
+        "invalid category": ~out["category"].isin([c.value for c in Category]),
+        "invalid split": ~out["split"].isin([s.value for s in Split]),
+        "invalid duration": has_duration & (seconds.isna() | (seconds < 0)),
+        "negative snr": snr < 0,
+        "negative size_bytes": size < 0,
+    }
+    rejected = pd.Series(False, index=df.index)
+    counts: Dict[str, int] = {}
+    for reason, mask in checks.items():
+        mask = mask & ~rejected  # count each row once, under its first problem
+        if mask.any():
+            counts[reason] = int(mask.sum())
+            rejected |= mask
+
+    out["duration"] = seconds.map(lambda d: f"{d:.2f}", na_action="ignore")
+    out["snr"] = snr.fillna(DEFAULT_SNR).round()
+    out["size_bytes"] = size.round().astype("Int64")
+    out = out[~rejected].drop_duplicates(["language", "sentence_id"], keep="last")
+    out["snr"] = out["snr"].astype(int)
+    out["id"] = [str(uuid.uuid4()) for _ in range(len(out))]
+    return out[list(CATALOG_COLUMNS)], counts
+
+
+def manifest_records(df: pd.DataFrame) -> List[dict]:
+    """Rows of a validated manifest as dicts, with missing values as None."""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
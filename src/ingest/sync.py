@@ -0,0 +1,305 @@
+"""
+Incremental, parallel upload of a local folder to S3 or OBS.
+
+    python -m src.ingest.sync samples --prefix data
+    python -m src.ingest.sync /mnt/recordings/yoruba --target obs --prefix yoruba-test/read --workers 32
+
+The remote prefix is listed once. A local file is uploaded only if it is
+missing remotely or differs in size or ETag. Large files go up as multipart
+uploads of `--part-size`, and the local ETag is computed the same way (MD5,
+or the MD5 of part MD5s with a "-N" suffix).
+
+Hashing is the slow part of a re-run, so a state file remembers each file's
+size, mtime and ETag from the last sync. An unchanged file whose remote
+ETag still matches is skipped without being read, and a re-run over a synced
+folder costs one listing plus a `stat` per file. The state is saved as
+uploads finish, so an interrupted sync resumes where it stopped.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+from boto3.s3.transfer import TransferConfig
+
+
+logger = logging.getLogger(__name__)
+
+MiB = 1024 * 1024
+DEFAULT_PART_SIZE = 8 * MiB          # boto3's default multipart chunk size
+PART_CONCURRENCY = 4                 # parts of one file uploaded in parallel
+# Part sizes other tools commonly use, tried when a remote multipart ETag
+# does not match `--part-size`
+COMMON_PART_SIZES = (5 * MiB, 8 * MiB, 15 * MiB, 16 * MiB, 64 * MiB, 100 * MiB)
+STATE_FILE = ".s3sync-state.json"
+STATE_SAVE_INTERVAL = 5.0            # seconds between state checkpoints
+
+
+@dataclass
+class LocalFile:
+    path: str
+    key: str
+    size: int
+    mtime_ns: int
+
+
+def iter_local_files(root: str, prefix: str, exclude: Tuple[str, ...] = ()) -> Iterator[LocalFile]:
+    """Every regular file under `root`, with the object key it maps to."""
+    prefix = prefix.strip("/")
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, "/")
+            if relative in exclude:
+                continue
+            stat = os.stat(path)
+            key = f"{prefix}/{relative}" if prefix else relative
+            yield LocalFile(path, key, stat.st_size, stat.st_mtime_ns)
+
+
+def list_remote(client, bucket: str, prefix: str) -> Dict[str, Tuple[int, str]]:
+    """Map of key -> (size, ETag) for every object under `prefix`."""
+    remote = {}
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix.strip("/")):
+        for obj in page.get("Contents", []):
+            remote[obj["Key"]] = (obj["Size"], obj["ETag"].strip('"'))
+    return remote
+
+
+def local_etag(path: str, part_size: Optional[int] = None) -> str:
+    """
+    The ETag S3 gives `path`: its MD5 for a single-part upload, or the MD5 of
+    the part MD5s plus "-<parts>" when uploaded in parts of `part_size`.
+    """
+    if part_size is None:
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            while chunk := f.read(MiB):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    digests = []
+    with open(path, "rb") as f:
+        while part := f.read(part_size):
+            digests.append(hashlib.md5(part).digest())
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+def matching_etag(path: str, size: int, remote_etag: str, part_size: int) -> Optional[str]:
+    """Return the local ETag if it equals `remote_etag`, else None (the file differs)."""
+    if "-" not in remote_etag:
+        etag = local_etag(path)
+        return etag if etag == remote_etag else None
+
+    parts = int(remote_etag.rsplit("-", 1)[1])
+    candidates = [part_size] + [p for p in COMMON_PART_SIZES if p != part_size]
+    for candidate in candidates:
+        if math.ceil(size / candidate) == parts and local_etag(path, candidate) == remote_etag:
+            return remote_etag
+    return None
+
+
+class SyncState:
+    """Last known (size, mtime_ns, ETag) per key, persisted as JSON next to the data."""
+
+    def __init__(self, path: str, bucket: str, prefix: str):
+        self.path = path
+        self.scope = {"bucket": bucket, "prefix": prefix.strip("/")}
+        self.files: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self._dirty = False
+
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                if data.get("scope") == self.scope:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Ignoring unreadable sync state {path}: {e}")
+
+    def known_etag(self, file: LocalFile) -> Optional[str]:
+        entry = self.files.get(file.key)
+        if entry and entry[0] == file.size and entry[1] == file.mtime_ns:
+            return entry[2]
+        return None
+
+    def record(self, file: LocalFile, etag: str):
+        with self._lock:
+            self.files[file.key] = [file.size, file.mtime_ns, etag]
+            self._dirty = True
+        if time.monotonic() - self._saved_at > STATE_SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"scope": self.scope, "files": self.files}, f)
+            os.replace(tmp, self.path)
+            self._saved_at = time.monotonic()
+            self._dirty = False
+
+
+class Progress:
+    """Thread-safe counters with a once-a-second status line on stderr."""
+
+    def __init__(self, total_files: int, stream=sys.stderr, interval: float = 1.0):
+        self.total_files = total_files
+        self.stream = stream
+        self.interval = interval
+        self.checked = self.uploaded = self.skipped = self.failed = 0
+        self.bytes_sent = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._report, daemon=True)
+
+    def add_bytes(self, n: int):
+        with self._lock:
+            self.bytes_sent += n
+
+    def done(self, outcome: str):
+        with self._lock:
+            self.checked += 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def line(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"{self.checked}/{self.total_files} checked, {self.uploaded} uploaded, "
+            f"{self.skipped} unchanged, {self.failed} failed | "
+            f"{self.bytes_sent / MiB:,.1f} MiB at {self.bytes_sent / MiB / elapsed:,.1f} MiB/s, "
+            f"{self.uploaded / elapsed:,.1f} files/s"
+        )
+
+    def _report(self):
+        while not self._stop.wait(self.interval):
+            print(f"\r{self.line()}", end="", file=self.stream, flush=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        print(f"\r{self.line()}", file=self.stream, flush=True)
+
+
+def sync_folder(
+    client,
+    root: str,
+    bucket: str,
+    prefix: str = "",
+    workers: int = 16,
+    part_size: int = DEFAULT_PART_SIZE,
+    state_path: Optional[str] = None,
+    dry_run: bool = False,
+) -> dict:
+    """Upload new or changed files under `root` to `bucket`/`prefix`. Returns the counts."""
+    state_path = state_path or os.path.join(root, STATE_FILE)
+    exclude = tuple(
+        os.path.relpath(p, root).replace(os.sep, "/") for p in (state_path, f"{state_path}.tmp")
+    )
+    transfer = TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=PART_CONCURRENCY,  # per file; files themselves run `workers` at a time
+    )
+
+    state = SyncState(state_path, bucket, prefix)
+    remote = list_remote(client, bucket, prefix)
+    files = list(iter_local_files(root, prefix, exclude))
+    logger.info(f"🔎 {len(files)} local files, {len(remote)} remote objects under s3://{bucket}/{prefix}")
+
+    def sync_one(file: LocalFile, progress: Progress) -> str:
+        existing = remote.get(file.key)
+        if existing and existing[0] == file.size:
+            remote_etag = existing[1]
+            if state.known_etag(file) == remote_etag:
+                return "skipped"
+            etag = matching_etag(file.path, file.size, remote_etag, part_size)
+            if etag:
+                state.record(file, etag)
+                return "skipped"
+        if dry_run:
+            return "uploaded"
+
+        client.upload_file(file.path, bucket, file.key, Config=transfer, Callback=progress.add_bytes)
+        etag = client.head_object(Bucket=bucket, Key=file.key)["ETag"].strip('"')
+        state.record(file, etag)
+        return "uploaded"
+
+    with Progress(len(files)) as progress, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync") as pool:
+        futures = {pool.submit(sync_one, file, progress): file for file in files}
+        try:
+            for future in as_completed(futures):
+                try:
+                    progress.done(future.result())
+                except Exception as e:
+                    progress.done("failed")
+                    logger.error(f"❌ Upload of {futures[future].path} failed: {e}")
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            if not dry_run:
+                state.save()
+
+    return {
+        "files": len(files),
+        "uploaded": progress.uploaded,
+        "skipped": progress.skipped,
+        "failed": progress.failed,
+        "bytes": progress.bytes_sent,
+        "seconds": round(time.perf_counter() - progress.started, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="Local folder to upload")
+    parser.add_argument("--target", choices=["aws", "obs"], default="aws", help="Which configured store to upload to")
+    parser.add_argument("--bucket", help="Default: S3_BUCKET_NAME or OBS_BUCKET_NAME for the target")
+    parser.add_argument("--prefix", default="", help="Key prefix for the uploaded files")
+    parser.add_argument("--workers", type=int, default=16, help="Files uploaded concurrently")
+    parser.add_argument("--part-size", type=int, default=DEFAULT_PART_SIZE // MiB, help="Multipart part size in MiB")
+    parser.add_argument("--state", help=f"Sync state file (default: <root>/{STATE_FILE})")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be uploaded")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    from src.config import settings
+    from src.storage.registry import get_storage, pool_size
+
+    # Every worker can hold PART_CONCURRENCY connections at once; size the client's pool for all of them
+    settings.STORAGE_MAX_POOL_CONNECTIONS = max(pool_size(), args.workers * PART_CONCURRENCY)
+    # Multipart ETags are compared part by part, so this needs the S3 client itself
+    storage = get_storage(args.target)
+    if not hasattr(storage, "client"):
+        raise SystemExit(f"{type(storage).__name__} has no S3 client; sync needs STORAGE_BACKEND=s3")
+    result = sync_folder(
+        storage.client, args.root, args.bucket or storage.bucket, args.prefix,
+        workers=args.workers, part_size=args.part_size * MiB, state_path=args.state, dry_run=args.dry_run,
+    )
+    logger.info(f"✅ Sync finished: {result}")
+    if result["failed"]:
+        raise SystemExit(f"{result['failed']} file(s) failed; re-run to retry them")
+
+
+if __name__ == "__main__":
+    main()
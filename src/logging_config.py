@@ -1,31 +1,144 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from colorlog import ColoredFormatter
+
+from src.config import settings
+
+
+# Loggers on the export/download hot path. Their DEBUG/INFO records are sampled.
+SAMPLED_LOGGERS = ("src.download", "src.tasks")
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class SampleFilter(logging.Filter):
+    """Pass every WARNING+ record and a `rate` fraction of the others."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any fields passed via `extra=`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update({k: v for k, v in vars(record).items() if k not in _RESERVED_ATTRS})
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    QueueHandler that keeps the traceback apart from the message.
+
+    The stock `prepare` folds the traceback into `msg` and clears `exc_text`,
+    so the JSON file would only see it inside "message". Here the traceback
+    is rendered into `exc_text` (picklable, unlike `exc_info`) and the
+    message stays the bare message; both formatters append `exc_text`.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+_traceback_formatter = logging.Formatter()
+
 
 def setup_logging():
+    """
+    Route all logging through a queue.
+
+    Loggers only push records onto an in-memory queue (QueueHandler), so the
+    event loop never waits on file or console I/O. A QueueListener thread
+    writes them to app.log (JSON lines) and the console.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    file_handler = logging.FileHandler("app.log")
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(ColoredFormatter(
+        "%(log_color)s%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        log_colors={
+            'DEBUG': 'cyan',
+            'INFO': 'green',
+            'WARNING': 'yellow',
+            'ERROR': 'red',
+            'CRITICAL': 'bold_red',
+        },
+    ))
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
     LOGGING_CONFIG = {
         "version": 1,
         "disable_existing_loggers": False,
-        "formatters": {
-            "default": {
-                "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        "filters": {
+            "sample": {
+                "()": SampleFilter,
+                "rate": settings.LOG_SAMPLE_RATE,
             },
         },
         "handlers": {
-            "file": {
-                "class": "logging.FileHandler",
-                "filename": "app.log",
-                "formatter": "default"
+            "queue": {
+                "()": StructuredQueueHandler,
+                "queue": log_queue,
             },
-            "console": {
-                "class": "logging.StreamHandler",
-                "formatter": "default"
+            "sampled_queue": {
+                "()": StructuredQueueHandler,
+                "queue": log_queue,
+                "filters": ["sample"],
             },
         },
+        "root": {
+            "handlers": ["queue"],
+            "level": settings.LOG_LEVEL,
+        },
         "loggers": {
-            "govllminer": {
-                "handlers": ["file", "console"],
-                "level": "INFO",
-                "propagate": False,
+            **{
+                # Same level as the root: sampling only thins out records that pass it
+                name: {
+                    "handlers": ["sampled_queue"],
+                    "level": settings.LOG_LEVEL,
+                    "propagate": False,
+                }
+                for name in SAMPLED_LOGGERS
             },
             "uvicorn": {
                 "level": "WARNING",
@@ -33,12 +146,23 @@ def setup_logging():
             "watchfiles": {
                 "level": "WARNING",
             },
+            "httpx": {
+                "level": "WARNING",
+            },
         },
     }
-    
+
     dictConfig(LOGGING_CONFIG)
-    
+
     # Explicitly set these to avoid conflicts
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("uvicorn.error").setLevel(logging.WARNING)
     logging.getLogger("watchfiles").setLevel(logging.WARNING)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
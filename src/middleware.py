@@ -1,47 +1,84 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request, HTTPException
-from starlette.responses import Response
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from colorlog import ColoredFormatter
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import time, json, logging, traceback
 
 
 
+# Records go through the queue handlers set up in src/logging_config.py
+logger = logging.getLogger("aiforgov.middleware")
 
-# Formatter for console
-console_formatter = ColoredFormatter(
-    "%(log_color)s%(asctime)s - %(levelname)s - %(message)s",
-    log_colors={
-        'DEBUG': 'cyan',
-        'INFO': 'green',
-        'WARNING': 'yellow',
-        'ERROR': 'red',
-        'CRITICAL': 'bold_red',
-    },
-)
 
-# Formatter for file (no color)
-file_formatter = logging.Formatter(
-    "%(asctime)s - %(levelname)s - %(message)s"
-)
+class RequestLoggingMiddleware:
+    """
+    Pure ASGI access log.
 
-# Console handler (with color)
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(console_formatter)
+    Records status and timing by watching the messages the app sends. The
+    response body is never buffered or rebuilt, so streaming responses keep
+    streaming. For error responses the first bytes of the body are copied to
+    log the reason.
+    """
 
-# File handler (without color)
-file_handler = logging.FileHandler("app.log")
-file_handler.setFormatter(file_formatter)
+    def __init__(self, app: ASGIApp, max_reason_bytes: int = 512):
+        self.app = app
+        self.max_reason_bytes = max_reason_bytes
 
-# Logger setup
-logger = logging.getLogger("aiforgov.middleware")
-logger.setLevel(logging.INFO)
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+        reason_bytes = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, reason_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body" and status_code >= 400 and reason_bytes is None:
+                reason_bytes = message.get("body", b"")[:self.max_reason_bytes]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            logger.exception(f"Unhandled error for {scope['method']} {scope['path']}")
+            raise
+        finally:
+            process_time = time.perf_counter() - start_time
+            client = scope.get("client") or ("-", "-")
+            fields = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round(process_time * 1000, 2),
+                "client": f"{client[0]}:{client[1]}",
+            }
+
+            log_msg = (
+                f"{fields['client']} - {fields['method']} {fields['path']} - "
+                f"Status: {status_code} - Time: {process_time:.2f}s"
+            )
+            if reason_bytes:
+                reason = self._reason(reason_bytes)
+                fields["reason"] = reason
+                log_msg += f" - Reason: {reason}"
+
+            logger.info(log_msg, extra=fields)
+
+    @staticmethod
+    def _reason(body: bytes):
+        try:
+            error_content = json.loads(body.decode())
+            return error_content.get("detail", error_content) if isinstance(error_content, dict) else error_content
+        except Exception:
+            return body.decode(errors="ignore")
 
 
 allowed_origins = [
@@ -87,54 +124,7 @@ def register_middleware(app: FastAPI):
 
 
 
-    def get_status_color(status_code: int) -> str:
-        if 200 <= status_code < 300:
-            return "\033[92m"  # Green
-        elif 400 <= status_code < 500:
-            return "\033[93m"  # Yellow
-        elif 500 <= status_code < 600:
-            return "\033[91m"  # Red
-        else:
-            return "\033[0m"   # Default
-
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        start_time = time.time()
-        try:
-            response = await call_next(request)
-        except Exception as exc:
-            logger.exception(f"Unhandled error for {request.method} {request.url.path}")
-            raise exc
-        process_time = time.time() - start_time
-
-        status_color = get_status_color(response.status_code)
-        reset_color = "\033[0m"
-
-        log_msg = (
-            f"{request.client.host}:{request.client.port} - {request.method} {request.url.path} - "
-            f"Status: {status_color}{response.status_code}{reset_color} - Time: {process_time:.2f}s"
-        )
-
-        if response.status_code >= 400:
-            body = b""
-            async for chunk in response.body_iterator:
-                body += chunk
-            response = Response(
-                content=body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type,
-            )
-            try:
-                error_content = json.loads(body.decode())
-                reason = error_content.get("detail", error_content)
-                log_msg += f" - Reason: {reason}"
-            except Exception:
-                log_msg += f" - Reason: {body.decode(errors='ignore')}"
-
-        logger.info(log_msg)
-        return response
-
+    app.add_middleware(RequestLoggingMiddleware)
 
     app.add_middleware(CORSMiddleware, allow_origins=allowed_origins, allow_methods=["*"], allow_headers=["*"], allow_credentials=True,)
     from fastapi import FastAPI
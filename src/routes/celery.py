@@ -1,15 +1,29 @@
+from typing import Literal
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.db.db import get_session
 from src.db.models import  GenderEnum, Category, DownloadStatusEnum
 from src.auth.utils import get_current_user
 from src.auth.schemas import TokenUser
-from src.schemas.export import ExportJobCreate, ExportJobStatus
-from src.crud.crud_export import create_export_job, get_export_job
+from src.schemas.export import BatchExportCreate, ExportJobCreate, ExportJobStatus, ExportJobPage
+from src.crud.crud_export import create_export_job, get_export_job, list_export_jobs
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
 import asyncio
 from src.schemas.export import ExportJobStatus
+from src.config import settings
+from src.core.job_status import (
+    FINISHED_STATUSES, etag_matches, read_status, replay_events, sse_frame, sse_reset_frame, status_etag,
+    status_hub, status_payload, stream_head, stream_id_key,
+)
+from src.core.metrics import EXPORT_STATUS_RESPONSES, EXPORT_STATUS_SSE_SUBSCRIBERS, EXPORT_STATUS_WS_SUBSCRIBERS
+from src.db.models import DownloadLog
+from sqlmodel import select
+from src.core.tracing import tracer, inject_headers, with_job_id, JOB_ID_KEY
+from opentelemetry.trace import SpanKind
 
 # logger
 import logging
@@ -20,6 +34,42 @@ logger = logging.getLogger(__name__)
 celery_router = APIRouter()
 
 
+def export_filters(
+    language: str,
+    pct: int | float,
+    gender: str | None = None,
+    age: str | None = None,
+    education: str | None = None,
+    domain: str | None = None,
+    category: str | None = None,
+    split: str | None = None,
+) -> dict:
+    """
+    One export's filters as the worker and `DownloadLog.specs` take them:
+    "all" means no filter, Yoruba "read" is stored as spontaneous, Hausa EC
+    as EV. Raises a 400 for an unknown gender or category.
+    """
+    from .routes import map_all_to_none, map_EV_to_EV
+
+    gender = map_all_to_none(value=gender)
+    category = map_all_to_none(category, language)
+    try:
+        gender = GenderEnum(gender).value if gender else None
+        category = Category(category).value if category else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "language": language.lower(),
+        "pct": pct,
+        "category": category,
+        "gender": gender,
+        "age_group": map_all_to_none(value=age),
+        "education": map_all_to_none(value=education),
+        "split": split,
+        "domain": map_EV_to_EV(domain, language),
+    }
+
+
 @celery_router.post(
     "/exports/{language}/{pct}/second",
     response_model=ExportJobStatus,
@@ -35,68 +85,305 @@ async def enqueue_export_job(
     domain: str | None = Query(None),
     category: str | None = Query(None),
     split: str | None = Query(None),
+    export_format: Literal["zip", "tar", "parquet"] = Query(
+        "zip", alias="format", description="zip, or tar (WebDataset) or parquet shards"
+    ),
     current_user: TokenUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
     """Enqueue export job and return job ID for tracking."""
-    from .routes import map_all_to_none, map_EV_to_EV
     # Enqueue task with job ID
     from src.tasks.export_worker import create_dataset_zip_s3_task_new
     
-    # Sanitize inputs
-    gender = map_all_to_none(value=gender)
-    age = map_all_to_none(value=age)
-    education = map_all_to_none(value=education)
-    domain = map_EV_to_EV(domain, language)
-    category = map_all_to_none(category, language)
+    spec = export_filters(language, pct, gender, age, education, domain, category, split)
+    language = spec["language"]
 
-    gender = GenderEnum(gender) if gender else None
-    category = Category(category) if category else None
-    language = language.lower()
+    with tracer.start_as_current_span(
+        "enqueue_export_job",
+        kind=SpanKind.PRODUCER,
+        attributes={"export.language": language, "export.pct": float(pct)},
+    ) as span:
+        # Create job record
+        user_id = current_user.id
+        job_create = ExportJobCreate(
+            user_id=user_id, 
+            language=language, 
+            percentage=pct,
+            # Read back by a fan-out worker exporting this job with others
+            specs=[{**spec, **({"format": export_format} if export_format != "zip" else {})}],
+        )
+        job = await create_export_job(session=session, job_create=job_create)
+        span.set_attribute(JOB_ID_KEY, str(job.id))
 
-    # Create job record
-    user_id = current_user.id
-    job_create = ExportJobCreate(
-        user_id=user_id, 
-        language=language, 
-        percentage=pct,
-    )
-    job = await create_export_job(session=session, job_create=job_create)
-
-    
-    task = create_dataset_zip_s3_task_new.delay(
-        job_id=str(job.id), 
-        language=language, 
-        pct=pct,
-        gender=gender,
-        age_group=age,
-        education=education,
-        domain=domain,
-        category=category,
-        split=split,
-    )
+        # Trace context and job id travel to the worker in the message headers
+        task = create_dataset_zip_s3_task_new.apply_async(
+            kwargs=dict(job_id=str(job.id), **spec, export_format=export_format),
+            headers=inject_headers(with_job_id(job.id)),
+        )
     logger.info(f"Enqueued job {job.id} with task_id {task.id}")
     
     return ExportJobStatus.model_validate(job, from_attributes=True)
 
 
 
+@celery_router.post(
+    "/exports/batch",
+    response_model=ExportJobStatus,
+    status_code=202, # Accepted
+    summary="Enqueue one export job for several languages or filter specs"
+)
+async def enqueue_batch_export(
+    batch: BatchExportCreate,
+    current_user: TokenUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Export every spec into one archive, each under its own folder (the
+    language by default). Track it like any other job.
+    """
+    from src.download.s3_config import SUPPORTED_LANGUAGES
+    from src.tasks.batch_export_worker import create_batch_zip_task
+
+    if len(batch.specs) > settings.EXPORT_BATCH_MAX_SPECS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.EXPORT_BATCH_MAX_SPECS} specs per batch export"
+        )
+
+    specs = []
+    for spec in batch.specs:
+        if spec.language.capitalize() not in SUPPORTED_LANGUAGES:
+            raise HTTPException(status_code=400, detail=f"Unsupported language: {spec.language}")
+        specs.append({
+            **export_filters(
+                spec.language, spec.pct, spec.gender, spec.age, spec.education, spec.domain, spec.category, spec.split,
+            ),
+            "folder": spec.folder,
+        })
+
+    languages = list(dict.fromkeys(spec["language"] for spec in specs))
+    with tracer.start_as_current_span(
+        "enqueue_batch_export",
+        kind=SpanKind.PRODUCER,
+        attributes={"export.language": ",".join(languages), "export.specs": len(specs)},
+    ) as span:
+        job_create = ExportJobCreate(
+            user_id=current_user.id,
+            language="+".join(languages),
+            percentage=max(spec["pct"] for spec in specs),
+            specs=specs,
+        )
+        job = await create_export_job(session=session, job_create=job_create)
+        span.set_attribute(JOB_ID_KEY, str(job.id))
+
+        task = create_batch_zip_task.apply_async(
+            kwargs=dict(job_id=str(job.id), specs=specs),
+            headers=inject_headers(with_job_id(job.id)),
+        )
+    logger.info(f"Enqueued batch job {job.id} with task_id {task.id}")
+
+    return ExportJobStatus.model_validate(job, from_attributes=True)
+
+
+@celery_router.get(
+    "/exports/jobs",
+    response_model=ExportJobPage,
+    summary="List the current user's export jobs"
+)
+async def list_my_export_jobs(
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: TokenUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Newest first. Follow `next_cursor` until it is null."""
+    try:
+        jobs, next_cursor = await list_export_jobs(session, current_user.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": jobs, "next_cursor": next_cursor}
+
+
 @celery_router.get(
     "/exports/status/{request_id}",
     response_model=ExportJobStatus,
+    responses={304: {"description": "Status unchanged since the ETag in If-None-Match"}},
     summary="Get the status of an export job"
 )
 async def get_export_status(
     request_id: UUID | str, 
-    session: AsyncSession = Depends(get_session)
+    wait: float | None = Query(
+        None, ge=0, le=settings.EXPORT_STATUS_MAX_WAIT_SECONDS,
+        description="With If-None-Match, hold the request up to this many seconds until the status changes",
+    ),
+    if_none_match: str | None = Header(None),
 ):
     """
     Poll this endpoint to get the status and download URL of an export job.
+
+    Send the last ETag back as If-None-Match: an unchanged status returns
+    304 with no body. Adding `?wait=30` turns the poll into a long-poll that
+    returns as soon as the job changes, or 304 after 30 seconds.
     """
-    job = await get_export_job(session, request_id)
-    if not job:
+    job_id = str(request_id)
+    payload, source = await read_status(job_id)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    return job
+
+    if wait and if_none_match:
+        deadline = asyncio.get_running_loop().time() + wait
+        while etag_matches(if_none_match, status_etag(payload)) and payload["status"] not in FINISHED_STATUSES:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            await status_hub.wait(job_id, remaining)
+            payload, source = await read_status(job_id)
+            if payload is None:
+                raise HTTPException(status_code=404, detail="Job not found")
+
+    etag = status_etag(payload)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        EXPORT_STATUS_RESPONSES.labels(result="not_modified", source=source).inc()
+        return Response(status_code=304, headers=headers)
+    EXPORT_STATUS_RESPONSES.labels(result="ok", source=source).inc()
+    return JSONResponse(ExportJobStatus.model_validate(payload).model_dump(mode="json"), headers=headers)
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # keep nginx from buffering the stream
+}
+SSE_RETRY = b"retry: 3000\n\n"
+SSE_PING = b": ping\n\n"
+
+
+async def _active_job_statuses(user_id: str) -> list:
+    """Current status of a user's unfinished jobs, from one short-lived session."""
+    from src.db.db import get_async_session_maker
+
+    async with get_async_session_maker()() as session:
+        stmt = (
+            select(DownloadLog)
+            .where(DownloadLog.user_id == user_id, DownloadLog.status.notin_(FINISHED_STATUSES))
+            .order_by(DownloadLog.created_at)
+        )
+        return [status_payload(job) for job in (await session.execute(stmt)).scalars()]
+
+
+async def _status_events(job_id: str | None, user_id: str | None, last_event_id: str | None):
+    """
+    text/event-stream body: the missed events (from Last-Event-ID) or the
+    current status first, then live events from the status hub. A job stream
+    ends once the job is finished.
+    """
+    subscription = status_hub.subscribe(job_id=job_id, user_id=user_id)
+    EXPORT_STATUS_SSE_SUBSCRIBERS.inc()
+    sent_versions = {}
+
+    def fresh(payload: dict) -> bool:
+        """True the first time a version of a job is seen, so overlaps are sent once."""
+        if sent_versions.get(payload["id"], -1) >= payload["version"]:
+            return False
+        sent_versions[payload["id"]] = payload["version"]
+        return True
+
+    try:
+        yield SSE_RETRY
+        backlog = await replay_events(last_event_id, job_id, user_id) if last_event_id else None
+        if backlog is None:
+            # Fresh start, or the missed events are gone: send a snapshot
+            seen = await stream_head()
+            if last_event_id:
+                yield sse_reset_frame(seen)
+            if job_id:
+                payload, _ = await read_status(job_id)
+                snapshot = [payload] if payload else []
+            else:
+                snapshot = await _active_job_statuses(user_id)
+            for payload in snapshot:
+                fresh(payload)
+                yield sse_frame(payload, seen)
+            if job_id and (not snapshot or snapshot[0]["status"] in FINISHED_STATUSES):
+                return
+        else:
+            seen = last_event_id
+            for event_id, payload in backlog:
+                seen = event_id
+                if fresh(payload):
+                    yield sse_frame(payload, event_id)
+                if job_id and payload["status"] in FINISHED_STATUSES:
+                    return
+
+        while status_hub.connected and not subscription.dropped:
+            event = await subscription.next(settings.EXPORT_STATUS_SSE_KEEPALIVE_SECONDS)
+            if event is None:
+                yield SSE_PING
+                continue
+            event_id, payload, frame = event
+            if stream_id_key(event_id) <= stream_id_key(seen) or not fresh(payload):
+                continue  # already sent with the snapshot or the backlog
+            seen = event_id
+            yield frame
+            if job_id and payload["status"] in FINISHED_STATUSES:
+                return
+        # Hub lost Redis or the client fell behind: it reconnects with Last-Event-ID
+    finally:
+        status_hub.unsubscribe(subscription)
+        EXPORT_STATUS_SSE_SUBSCRIBERS.dec()
+
+
+async def _event_stream_response(
+    job_id: str | None,
+    user_id: str | None,
+    last_event_id: str | None,
+    owner_id: str | None = None,
+):
+    if job_id:
+        payload, _ = await read_status(job_id)
+        # Another user's job is reported as missing, not as forbidden
+        if payload is None or payload.get("user_id") != owner_id:
+            raise HTTPException(status_code=404, detail="Job not found")
+    if last_event_id:
+        try:
+            stream_id_key(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    if not status_hub.connected:
+        raise HTTPException(status_code=503, detail="Live status is unavailable, poll /exports/status instead")
+    return StreamingResponse(
+        _status_events(job_id, user_id, last_event_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@celery_router.get("/exports/events", summary="Stream progress of all the current user's export jobs (SSE)")
+async def export_events_for_user(
+    last_event_id: str | None = Header(None),
+    current_user: TokenUser = Depends(get_current_user),
+):
+    """
+    Server-Sent Events for every export job of the current user, for clients
+    whose proxies break the WebSocket. Starts with the status of the user's
+    unfinished jobs; reconnecting with Last-Event-ID resumes where it left off,
+    or, when those events are gone, sends a `reset` event and a new snapshot.
+    """
+    return await _event_stream_response(None, current_user.id, last_event_id)
+
+
+@celery_router.get("/exports/events/{job_id}", summary="Stream progress of one of the current user's export jobs (SSE)")
+async def export_events_for_job(
+    job_id: str,
+    last_event_id: str | None = Header(None),
+    current_user: TokenUser = Depends(get_current_user),
+):
+    """
+    Server-Sent Events with the same progress as /ws/export-status/{job_id}:
+    the current status, then one `status` event per change. The stream ends
+    once the job is ready or failed. Only the job's owner can follow it: the
+    events carry the signed download URL.
+    """
+    return await _event_stream_response(job_id, None, last_event_id, owner_id=current_user.id)
 
 
 @celery_router.websocket("/ws/export-status/{job_id}")
@@ -106,6 +393,7 @@ async def export_status_ws(websocket: WebSocket, job_id: str):
     Clients connect here to see live updates.
     """
     await websocket.accept()
+    EXPORT_STATUS_WS_SUBSCRIBERS.inc()
     
     from src.tasks.export_worker import get_async_session_maker
     
@@ -138,12 +426,12 @@ async def export_status_ws(websocket: WebSocket, job_id: str):
                 if current_progress != last_sent_progress:
                     status_data = {
                         "job_id": str(job.id),
-                        "status": job.status.value,
+                        "status": job.status,
                         "progress": current_progress,
                         "download_url": job.download_url,
                         "error_message": job.error_message,
-                        "created_at": job.created_at.isoformat(),
-                        "updated_at": job.updated_at.isoformat(),
+                        "created_at": job.created_at.isoformat() if job.created_at else None,
+                        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
                     }
                     await websocket.send_json(status_data)
                     last_sent_progress = current_progress
@@ -151,9 +439,15 @@ async def export_status_ws(websocket: WebSocket, job_id: str):
                 # Close when done
                 if job.status in [DownloadStatusEnum.READY, DownloadStatusEnum.FAILED]:
                     break
-                
-                # Poll every 1 second (adjust as needed)
-                await asyncio.sleep(1)
+
+            # Poll every 1 second without holding a pooled connection. Waiting on
+            # receive() also notices clients that left, since this loop only sends.
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
                 
     except WebSocketDisconnect:
         logger.info(f"Client disconnected from job {job_id}")
@@ -164,4 +458,6 @@ async def export_status_ws(websocket: WebSocket, job_id: str):
         except:
             pass
     finally:
-        await websocket.close()
\ No newline at end of file
+        EXPORT_STATUS_WS_SUBSCRIBERS.dec()
+        if websocket.client_state != WebSocketState.DISCONNECTED:
+            await websocket.close()
\ No newline at end of file
@@ -1,11 +1,12 @@
 from ast import Not
-from fastapi import APIRouter, Depends, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, BackgroundTasks, Header, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import StreamingResponse
 from src.db.db import get_session
 from src.auth.utils import get_current_user
 from src.auth.schemas import TokenUser
 from src.download.service import DownloadService
+from src.download.audio_proxy import audio_response
 from src.download.schemas import AudioPreviewResponse, EstimatedSizeResponse
 from src.db.models import  Category, GenderEnum
 from typing import Optional
@@ -23,7 +24,7 @@ def map_all_to_none(value: Optional[str], language: Optional[str] = None) -> Opt
     if not value:
         return None
     val = value.lower()
-    lang = language.lower()
+    lang = (language or "").lower()
 
     if val == "all":
         return None
@@ -94,6 +95,21 @@ async def preview_audio_samples(
     )
 
 
+@download_router.get(
+    "/audio/{sample_id}",
+    response_class=StreamingResponse,
+    summary="Stream a preview clip",
+    description="WAV bytes of a sample in the preview pools, with Range requests, ETag revalidation and Cache-Control.",
+)
+async def stream_audio(
+    sample_id: str,
+    range_header: str | None = Header(None, alias="Range"),
+    if_none_match: str | None = Header(None),
+    if_range: str | None = Header(None),
+):
+    return await audio_response(sample_id, range_header, if_none_match, if_range)
+
+
 @download_router.get("/zip/estimate-size/{language}/{pct}", response_model=EstimatedSizeResponse)
 async def estimate_zip_size(
     language: str,
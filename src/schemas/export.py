@@ -1,8 +1,8 @@
 # app/schemas/export.py
 
 from email import message
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 
 # Schema for creating a job (validates incoming data)
@@ -10,6 +10,7 @@ class ExportJobCreate(BaseModel):
     user_id: str
     language: str
     percentage: float = Field(..., gt=0, le=100) # Percentage must be between 1-100
+    specs: Optional[List[dict]] = None  # filters the worker reads back (src/tasks/fanout_export.py)
 
 # Schema for returning job status (formats outgoing data)
 class ExportJobStatus(BaseModel):
@@ -23,6 +24,51 @@ class ExportJobStatus(BaseModel):
     error_message: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    version: Optional[int] = None
+    specs: Optional[List[dict]] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# One page of a user's export jobs; pass `next_cursor` back to get the next one
+class ExportJobPage(BaseModel):
+    items: List[ExportJobStatus]
+    next_cursor: Optional[str] = None
+
+
+# One part of a batch export: the same filters as a single export, archived under `folder`/
+class ExportSpec(BaseModel):
+    language: str
+    pct: float = Field(..., gt=0, le=100)
+    gender: Optional[str] = None
+    age: Optional[str] = None
+    education: Optional[str] = None
+    domain: Optional[str] = None
+    category: Optional[str] = None
+    split: Optional[str] = None
+    folder: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_-]{1,64}$")
+
+
+# Several specs exported into one archive; folders default to the language name
+class BatchExportCreate(BaseModel):
+    specs: List[ExportSpec] = Field(..., min_length=1)
+
+    @model_validator(mode="after")
+    def assign_folders(self):
+        taken = set()
+        for spec in self.specs:
+            if spec.folder:
+                if spec.folder.lower() in taken:
+                    raise ValueError(f"Duplicate folder: {spec.folder}")
+                taken.add(spec.folder.lower())
+        for spec in self.specs:
+            if not spec.folder:
+                base = spec.language.lower()
+                folder, n = base, 1
+                while folder in taken:
+                    n += 1
+                    folder = f"{base}_{n}"
+                spec.folder = folder
+                taken.add(folder)
+        return self
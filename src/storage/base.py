@@ -0,0 +1,301 @@
+"""
+The storage interface: one bucket, sync (`Storage`) or async (`AsyncStorage`).
+
+Backends raise `NotFound`, `NotModified` and `RangeNotSatisfiable` instead
+of their client's errors, so callers handle a missing clip or a `304` the
+same way whatever the store is.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StorageError(Exception):
+    pass
+
+
+class NotFound(StorageError):
+    pass
+
+
+class NotModified(StorageError):
+    """A conditional get found the object unchanged (`if_none_match`)."""
+
+    def __init__(self, etag: Optional[str] = None):
+        super().__init__(f"Not modified: {etag}")
+        self.etag = etag
+
+
+class RangeNotSatisfiable(StorageError):
+    """The requested range starts past the end of the object (`size`, if known)."""
+
+    def __init__(self, size: Optional[int] = None):
+        super().__init__(f"Range not satisfiable (size {size})")
+        self.size = size
+
+
+class ObjectInfo(NamedTuple):
+    key: str
+    size: int
+    etag: Optional[str]
+    last_modified: Optional[datetime] = None
+
+
+class StoredObject:
+    """
+    An object being read. `body` is a file-like with `read(n)` and `close()`;
+    `size` is the length of the body (of the range, for a ranged get).
+    """
+
+    def __init__(self, body, size: int, etag: Optional[str], content_range: Optional[str] = None):
+        self.body = body
+        self.size = size
+        self.etag = etag
+        self.content_range = content_range
+
+    def chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        while True:
+            chunk = self.body.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def read(self) -> bytes:
+        return self.body.read()
+
+    def close(self):
+        self.body.close()
+
+
+class AsyncStoredObject:
+    """`StoredObject` with an async body (`await body.read(n)`)."""
+
+    def __init__(self, body, size: int, etag: Optional[str], content_range: Optional[str] = None):
+        self.body = body
+        self.size = size
+        self.etag = etag
+        self.content_range = content_range
+
+    async def chunks(self, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await self.body.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    async def read(self) -> bytes:
+        return await self.body.read()
+
+    def close(self):
+        self.body.close()
+
+
+def parse_range(header: Optional[str]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    `(start, end)` of a single `bytes=` range, either of which may be None
+    (`bytes=100-`, `bytes=-500`). None for no range, a malformed one or
+    several ranges: those are answered with the whole object.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    first, sep, last = spec.partition("-")
+    if not sep or "," in spec:
+        return None
+    try:
+        start = int(first) if first.strip() else None
+        end = int(last) if last.strip() else None
+    except ValueError:
+        return None
+    if start is None and end is None:
+        return None
+    if (start is not None and start < 0) or (end is not None and end < 0):
+        return None
+    if start is not None and end is not None and end < start:
+        return None
+    return start, end
+
+
+def resolve_range(requested: Tuple[Optional[int], Optional[int]], size: int) -> Tuple[int, int]:
+    """First and last byte (inclusive) of `requested` in an object of `size` bytes."""
+    start, end = requested
+    if start is None:
+        if not end or not size:
+            raise RangeNotSatisfiable(size)
+        return max(size - end, 0), size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(size)
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+class Storage(ABC):
+    """Blocking access to one bucket. Safe to share between threads."""
+
+    bucket: str
+
+    @abstractmethod
+    def get(self, key: str, range: Optional[str] = None, if_none_match: Optional[str] = None) -> StoredObject:
+        """Open `key` for reading; `range` is an HTTP `bytes=` range."""
+
+    @abstractmethod
+    def head(self, key: str) -> ObjectInfo:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    def upload_fileobj(self, key: str, fileobj: BinaryIO) -> None:
+        """Upload a file-like from its current position, on the calling thread only."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove `key`; a missing key is not an error."""
+
+    @abstractmethod
+    def create_multipart(self, key: str) -> str:
+        """Start a multipart upload and return its id."""
+
+    @abstractmethod
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """Upload one part and return its ETag."""
+
+    @abstractmethod
+    def complete_multipart(self, key: str, upload_id: str, parts: List[dict]) -> None:
+        """Assemble `parts` (`{"PartNumber", "ETag"}`, in order) into `key`."""
+
+    @abstractmethod
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def sign(self, key: str, expires: int = 3600) -> str:
+        """A URL that downloads `key` without credentials for `expires` seconds."""
+
+    @abstractmethod
+    def list(self, prefix: str) -> Iterator[ObjectInfo]:
+        """Every object under `prefix`, in key order, fetched page by page."""
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        obj = self.get(key)
+        try:
+            yield from obj.chunks(chunk_size)
+        finally:
+            obj.close()
+
+
+class AsyncStorage(ABC):
+    """`Storage` for the event loop."""
+
+    bucket: str
+
+    @abstractmethod
+    async def get(self, key: str, range: Optional[str] = None, if_none_match: Optional[str] = None) -> AsyncStoredObject:
+        ...
+
+    @abstractmethod
+    async def head(self, key: str) -> ObjectInfo:
+        ...
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def create_multipart(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        ...
+
+    @abstractmethod
+    async def complete_multipart(self, key: str, upload_id: str, parts: List[dict]) -> None:
+        ...
+
+    @abstractmethod
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def sign(self, key: str, expires: int = 3600) -> str:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str) -> AsyncIterator[ObjectInfo]:
+        ...
+
+    async def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        obj = await self.get(key)
+        try:
+            async for chunk in obj.chunks(chunk_size):
+                yield chunk
+        finally:
+            obj.close()
+
+    async def close(self):
+        pass
+
+
+class _ThreadedBody:
+    def __init__(self, body):
+        self._body = body
+
+    async def read(self, n: int = -1) -> bytes:
+        return await asyncio.to_thread(self._body.read, n)
+
+    def close(self):
+        self._body.close()
+
+
+class ThreadedAsyncStorage(AsyncStorage):
+    """Any `Storage` on the event loop, each call run in a worker thread."""
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self.bucket = storage.bucket
+
+    async def get(self, key: str, range: Optional[str] = None, if_none_match: Optional[str] = None) -> AsyncStoredObject:
+        obj = await asyncio.to_thread(self.storage.get, key, range, if_none_match)
+        return AsyncStoredObject(_ThreadedBody(obj.body), obj.size, obj.etag, obj.content_range)
+
+    async def head(self, key: str) -> ObjectInfo:
+        return await asyncio.to_thread(self.storage.head, key)
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        await asyncio.to_thread(self.storage.put, key, data, content_type)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.storage.delete, key)
+
+    async def create_multipart(self, key: str) -> str:
+        return await asyncio.to_thread(self.storage.create_multipart, key)
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        return await asyncio.to_thread(self.storage.upload_part, key, upload_id, part_number, data)
+
+    async def complete_multipart(self, key: str, upload_id: str, parts: List[dict]) -> None:
+        await asyncio.to_thread(self.storage.complete_multipart, key, upload_id, parts)
+
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        await asyncio.to_thread(self.storage.abort_multipart, key, upload_id)
+
+    async def sign(self, key: str, expires: int = 3600) -> str:
+        return self.storage.sign(key, expires)
+
+    async def list(self, prefix: str) -> AsyncIterator[ObjectInfo]:
+        objects = self.storage.list(prefix)
+        while True:
+            info = await asyncio.to_thread(next, objects, None)
+            if info is None:
+                return
+            yield info
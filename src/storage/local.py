@@ -0,0 +1,202 @@
+"""
+Local-filesystem backend, for running and benchmarking exports offline.
+
+Objects are files under `<root>/<bucket>/<key>`. ETags are the MD5 of the
+content (`"<md5>-<parts>"` for multipart uploads, as S3 does), remembered per
+file size and mtime. Multipart parts are staged in `<root>/.multipart/` and
+concatenated on completion. Signed URLs are `file://` URLs.
+
+    STORAGE_BACKEND=local STORAGE_LOCAL_ROOT=/tmp/storage
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from src.storage.base import (
+    NotFound,
+    NotModified,
+    ObjectInfo,
+    Storage,
+    StoredObject,
+    parse_range,
+    resolve_range,
+)
+
+
+class _RangeReader:
+    """`length` bytes of an open file, read like a response body."""
+
+    def __init__(self, f: BinaryIO, length: int):
+        self._f = f
+        self._remaining = length
+
+    def read(self, n: int = -1) -> bytes:
+        if n < 0 or n > self._remaining:
+            n = self._remaining
+        data = self._f.read(n)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str, bucket: str):
+        self.root = root
+        self.bucket = bucket
+        self.directory = os.path.join(root, bucket)
+        self._uploads = os.path.join(root, ".multipart")
+        self._etags: Dict[str, Tuple[int, int, str]] = {}  # path -> (size, mtime_ns, etag)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.directory, key))
+        if not path.startswith(self.directory + os.sep):
+            raise ValueError(f"Key outside the bucket: {key}")
+        return path
+
+    def _etag(self, path: str, stat: os.stat_result) -> str:
+        with self._lock:
+            known = self._etags.get(path)
+        if known and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+        self._remember(path, etag)
+        return etag
+
+    def _remember(self, path: str, etag: str):
+        stat = os.stat(path)
+        with self._lock:
+            self._etags[path] = (stat.st_size, stat.st_mtime_ns, etag)
+
+    def _write(self, key: str, write) -> str:
+        """Write `key` through `write(f)` into a temp file and move it into place."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path
+
+    def get(self, key: str, range: Optional[str] = None, if_none_match: Optional[str] = None) -> StoredObject:
+        try:
+            f = open(self.path(key), "rb")
+        except FileNotFoundError:
+            raise NotFound(key)
+        try:
+            stat = os.fstat(f.fileno())
+            etag = self._etag(f.name, stat)
+            if if_none_match and if_none_match == etag:
+                raise NotModified(etag)
+            requested = parse_range(range)
+            if requested is None:
+                return StoredObject(f, stat.st_size, etag)
+            start, end = resolve_range(requested, stat.st_size)
+            f.seek(start)
+            return StoredObject(
+                _RangeReader(f, end + 1 - start), end + 1 - start, etag,
+                content_range=f"bytes {start}-{end}/{stat.st_size}",
+            )
+        except BaseException:
+            f.close()
+            raise
+
+    def head(self, key: str) -> ObjectInfo:
+        path = self.path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise NotFound(key)
+        return ObjectInfo(key, stat.st_size, self._etag(path, stat), datetime.fromtimestamp(stat.st_mtime, timezone.utc))
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        path = self._write(key, lambda f: f.write(data))
+        self._remember(path, f'"{hashlib.md5(data).hexdigest()}"')
+
+    def upload_fileobj(self, key: str, fileobj: BinaryIO) -> None:
+        self._write(key, lambda f: shutil.copyfileobj(fileobj, f, 1024 * 1024))
+
+    def delete(self, key: str) -> None:
+        path = self.path(key)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._etags.pop(path, None)
+
+    def create_multipart(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self._uploads, upload_id))
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        directory = os.path.join(self._uploads, upload_id)
+        if not os.path.isdir(directory):
+            raise NotFound(f"upload {upload_id}")
+        with open(os.path.join(directory, f"{part_number:05d}"), "wb") as f:
+            f.write(data)
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[dict]) -> None:
+        directory = os.path.join(self._uploads, upload_id)
+        digests = b"".join(bytes.fromhex(part["ETag"].strip('"')) for part in parts)
+
+        def write(f):
+            for part in parts:
+                with open(os.path.join(directory, f"{part['PartNumber']:05d}"), "rb") as src:
+                    shutil.copyfileobj(src, f, 1024 * 1024)
+
+        path = self._write(key, write)
+        self._remember(path, f'"{hashlib.md5(digests).hexdigest()}-{len(parts)}"')
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        shutil.rmtree(os.path.join(self._uploads, upload_id), ignore_errors=True)
+
+    def sign(self, key: str, expires: int = 3600) -> str:
+        return Path(self.path(key)).as_uri()
+
+    def list(self, prefix: str) -> Iterator[ObjectInfo]:
+        """Objects under `prefix` in key order, as S3 lists them, read while walking."""
+        # Start from the deepest directory the prefix names, then filter on the full prefix
+        start = os.path.dirname(prefix)
+        yield from self._walk(os.path.join(self.directory, start), f"{start}/" if start else "", prefix)
+
+    def _walk(self, directory: str, base: str, prefix: str) -> Iterator[ObjectInfo]:
+        try:
+            with os.scandir(directory) as it:
+                # Sorting directories as "name/" puts their keys where S3 would
+                entries = sorted(it, key=lambda e: e.name + "/" if e.is_dir() else e.name)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        for entry in entries:
+            key = base + entry.name
+            if entry.is_dir():
+                if (key + "/").startswith(prefix) or prefix.startswith(key + "/"):
+                    yield from self._walk(entry.path, key + "/", prefix)
+            elif key.startswith(prefix) and not entry.name.startswith(".upload-"):
+                try:
+                    stat = entry.stat()
+                    etag = self._etag(entry.path, stat)
+                except FileNotFoundError:
+                    continue  # deleted while listing
+                yield ObjectInfo(key, stat.st_size, etag, datetime.fromtimestamp(stat.st_mtime, timezone.utc))
@@ -0,0 +1,150 @@
+"""
+Object storage for the app: the export bucket ("aws") and the OBS audio
+bucket ("obs"), behind the `Storage` / `AsyncStorage` interface of
+`src.storage.base`.
+
+Clients are created once per process, on first use, with a connection pool
+as large as the widest fan-out that shares them (the export fetch pool,
+ingest uploads, inventory crawls, shard uploads), so concurrent calls reuse
+warm connections instead of queueing for one or opening their own. A
+prefork child builds its own on first use rather than inheriting its
+parent's sockets.
+
+    storage = get_storage("obs")
+    for chunk in storage.stream(key):
+        ...
+
+STORAGE_BACKEND=local keeps both buckets under STORAGE_LOCAL_ROOT instead,
+so exports, ingest and the audio proxy run without S3 or OBS.
+"""
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from src.config import settings
+from src.storage.base import AsyncStorage, Storage, ThreadedAsyncStorage
+
+
+logger = logging.getLogger(__name__)
+
+STORES = ("aws", "obs")
+
+_storages: Dict[str, Storage] = {}
+_async_storages: Dict[str, AsyncStorage] = {}
+_pid: Optional[int] = None
+_lock = threading.RLock()  # creating an async storage takes the sync one
+
+
+def pool_size() -> int:
+    if settings.STORAGE_MAX_POOL_CONNECTIONS:
+        return settings.STORAGE_MAX_POOL_CONNECTIONS
+    return max(
+        settings.EXPORT_FETCH_CONCURRENCY,
+        settings.INGEST_UPLOAD_CONCURRENCY,
+        settings.INVENTORY_CRAWL_CONCURRENCY,
+        settings.EXPORT_SHARD_UPLOAD_CONCURRENCY,
+        10,  # botocore's default
+    )
+
+
+def _bucket(name: str) -> str:
+    if name == "aws":
+        return settings.S3_BUCKET_NAME
+    if name == "obs":
+        return settings.OBS_BUCKET_NAME
+    raise ValueError(f"Unknown storage: {name} (expected one of {', '.join(STORES)})")
+
+
+def _client_kwargs(name: str) -> Tuple[dict, bool]:
+    """Credentials and endpoint of `name`, and whether it needs path-style addressing."""
+    if name == "obs":
+        return {
+            "aws_access_key_id": settings.OBS_ACCESS_KEY_ID,
+            "aws_secret_access_key": settings.OBS_SECRET_ACCESS_KEY,
+            "endpoint_url": settings.OBS_ENDPOINT_URL,
+            "region_name": settings.OBS_REGION,
+        }, True
+    return {
+        "aws_access_key_id": settings.AWS_ACCESS_KEY_ID,
+        "aws_secret_access_key": settings.AWS_SECRET_ACCESS_KEY,
+        "endpoint_url": settings.AWS_ENDPOINT_URL,
+        "region_name": settings.AWS_REGION,
+    }, False
+
+
+def _create_storage(name: str) -> Storage:
+    bucket = _bucket(name)
+    if settings.STORAGE_BACKEND == "local":
+        from src.storage.local import LocalStorage
+
+        return LocalStorage(settings.STORAGE_LOCAL_ROOT, bucket)
+
+    import boto3
+    from src.storage.s3 import ObsStorage, S3Storage, client_config
+
+    kwargs, path_style = _client_kwargs(name)
+    client = boto3.client("s3", config=client_config(pool_size(), path_style), **kwargs)
+    return (ObsStorage if name == "obs" else S3Storage)(client, bucket)
+
+
+def _create_async_storage(name: str) -> AsyncStorage:
+    storage = get_storage(name)
+    if settings.STORAGE_BACKEND == "local":
+        return ThreadedAsyncStorage(storage)
+
+    import aioboto3
+    from src.storage.s3 import AsyncS3Storage, client_config
+
+    kwargs, path_style = _client_kwargs(name)
+    return AsyncS3Storage(
+        aioboto3.Session(), storage.bucket, sign_with=storage,
+        config=client_config(pool_size(), path_style), **kwargs,
+    )
+
+
+def _check_pid():
+    global _pid
+    if _pid != os.getpid():
+        _storages.clear()
+        _async_storages.clear()
+        _pid = os.getpid()
+
+
+def get_storage(name: str) -> Storage:
+    """This process's storage for `name` ("aws" or "obs")."""
+    with _lock:
+        _check_pid()
+        storage = _storages.get(name)
+        if storage is None:
+            storage = _storages[name] = _create_storage(name)
+            logger.info(f"🗄️ Storage {name}: {type(storage).__name__} bucket={storage.bucket} pool={pool_size()}")
+        return storage
+
+
+def get_async_storage(name: str) -> AsyncStorage:
+    """This process's async storage for `name`; sign URLs like `get_storage(name)`."""
+    with _lock:
+        _check_pid()
+        storage = _async_storages.get(name)
+        if storage is None:
+            storage = _async_storages[name] = _create_async_storage(name)
+        return storage
+
+
+def set_storage(name: str, storage: Storage, async_storage: Optional[AsyncStorage] = None):
+    """Use `storage` for `name` in this process (tests, benchmarks)."""
+    _bucket(name)
+    with _lock:
+        _check_pid()
+        _storages[name] = storage
+        _async_storages[name] = async_storage or ThreadedAsyncStorage(storage)
+
+
+async def close_async_storages():
+    """Close the async clients (on shutdown of the loop that used them)."""
+    with _lock:
+        storages = list(_async_storages.values())
+        _async_storages.clear()
+    for storage in storages:
+        await storage.close()
@@ -0,0 +1,266 @@
+"""
+S3-compatible backends: boto3 (`S3Storage`) and aioboto3 (`AsyncS3Storage`).
+
+`ObsStorage` is the OBS audio bucket. Its `sign` makes OBS share links (V2
+query signature), the format the preview player has always received, unless
+OBS_SIGNATURE is "s3v4" (moto or another S3 standing in for OBS).
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import time
+import urllib.parse
+from typing import AsyncIterator, BinaryIO, Iterator, List, Optional
+
+from boto3.s3.transfer import TransferConfig
+from botocore.client import Config
+from botocore.exceptions import ClientError
+
+from src.config import settings
+from src.storage.base import (
+    AsyncStorage,
+    AsyncStoredObject,
+    NotFound,
+    NotModified,
+    ObjectInfo,
+    RangeNotSatisfiable,
+    Storage,
+    StoredObject,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Parallelism is across objects (ingest, exports), not within one upload
+SINGLE_THREAD_TRANSFER = TransferConfig(use_threads=False)
+
+
+def client_config(pool_size: int, path_style: bool = False) -> Config:
+    if path_style:
+        return Config(max_pool_connections=pool_size, s3={"addressing_style": "path"}, signature_version="s3v4")
+    return Config(max_pool_connections=pool_size)
+
+
+def storage_error(e: ClientError, key: str) -> Exception:
+    """The `StorageError` for a client error, or `e` itself if it is none of them."""
+    metadata = e.response.get("ResponseMetadata", {})
+    status = metadata.get("HTTPStatusCode")
+    error = e.response.get("Error", {})
+    if status == 304:
+        return NotModified(metadata.get("HTTPHeaders", {}).get("etag"))
+    if status == 404 or error.get("Code") in ("NoSuchKey", "NotFound", "404"):
+        return NotFound(key)
+    if status == 416 or error.get("Code") == "InvalidRange":
+        size = error.get("ActualObjectSize")
+        return RangeNotSatisfiable(int(size) if size else None)
+    return e
+
+
+def _get_kwargs(bucket: str, key: str, range: Optional[str], if_none_match: Optional[str]) -> dict:
+    kwargs = {"Bucket": bucket, "Key": key}
+    if range:
+        kwargs["Range"] = range
+    if if_none_match:
+        kwargs["IfNoneMatch"] = if_none_match
+    return kwargs
+
+
+class S3Storage(Storage):
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    def get(self, key: str, range: Optional[str] = None, if_none_match: Optional[str] = None) -> StoredObject:
+        try:
+            obj = self.client.get_object(**_get_kwargs(self.bucket, key, range, if_none_match))
+        except ClientError as e:
+            raise storage_error(e, key) from e
+        return StoredObject(obj["Body"], obj["ContentLength"], obj.get("ETag"), obj.get("ContentRange"))
+
+    def head(self, key: str) -> ObjectInfo:
+        try:
+            obj = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            raise storage_error(e, key) from e
+        return ObjectInfo(key, obj["ContentLength"], obj.get("ETag"), obj.get("LastModified"))
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+
+    def upload_fileobj(self, key: str, fileobj: BinaryIO) -> None:
+        self.client.upload_fileobj(fileobj, self.bucket, key, Config=SINGLE_THREAD_TRANSFER)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def create_multipart(self, key: str) -> str:
+        return self.client.create_multipart_upload(Bucket=self.bucket, Key=key)["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        resp = self.client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            PartNumber=part_number, Body=data, ContentLength=len(data),
+        )
+        return resp["ETag"]
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[dict]) -> None:
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+        )
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    def sign(self, key: str, expires: int = 3600) -> str:
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=expires,
+        )
+
+    def list(self, prefix: str) -> Iterator[ObjectInfo]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield ObjectInfo(obj["Key"], obj["Size"], obj.get("ETag"), obj.get("LastModified"))
+
+
+def obs_share_link(bucket: str, key: str, expires: int) -> str:
+    """OBS share link: V2 query signature on the bucket's virtual host."""
+    expires_at = int(time.time()) + expires
+    string_to_sign = f"GET\n\n\n{expires_at}\n/{bucket}/{key}"
+    signature = base64.b64encode(hmac.new(
+        settings.OBS_SECRET_ACCESS_KEY.encode("utf-8"), string_to_sign.encode("utf-8"), hashlib.sha1,
+    ).digest()).decode("utf-8")
+    host = urllib.parse.urlparse(settings.OBS_ENDPOINT_URL).hostname
+    return (
+        f"https://{bucket}.{host}:443/{key}?AccessKeyId={settings.OBS_ACCESS_KEY_ID}"
+        f"&Expires={expires_at}&Signature={urllib.parse.quote(signature, safe='')}"
+    )
+
+
+class ObsStorage(S3Storage):
+    def sign(self, key: str, expires: int = 3600) -> str:
+        if settings.OBS_SIGNATURE == "s3v4":
+            return super().sign(key, expires)
+        return obs_share_link(self.bucket, key, expires)
+
+
+class _AsyncBody:
+    """aiobotocore's StreamingBody, released back to the pool on close."""
+
+    def __init__(self, body):
+        self._body = body
+
+    async def read(self, n: int = -1) -> bytes:
+        return await self._body.read(n if n >= 0 else None)
+
+    def close(self):
+        self._body.close()
+
+
+class AsyncS3Storage(AsyncStorage):
+    """
+    One aioboto3 client, opened on first use and kept for the process. A
+    client belongs to the event loop that opened it; a call from another
+    loop (each Celery task runs its own) closes it and opens one for that
+    loop. The app closes it on shutdown (`close_async_storages`).
+    """
+
+    def __init__(self, session, bucket: str, sign_with: Optional[Storage] = None, **client_kwargs):
+        self.session = session
+        self.bucket = bucket
+        self.sign_with = sign_with
+        self.client_kwargs = client_kwargs
+        self._client = None
+        self._context = None
+        self._loop = None
+
+    async def _get_client(self):
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is loop:
+            return self._client
+        await self.close()  # another loop's client
+        context = self.session.client("s3", **self.client_kwargs)
+        client = await context.__aenter__()
+        if self._client is not None and self._loop is loop:
+            # A concurrent call on this loop got there first
+            await context.__aexit__(None, None, None)
+            return self._client
+        self._context, self._client, self._loop = context, client, loop
+        return client
+
+    async def close(self):
+        if self._context is None:
+            return
+        context, self._context, self._client, self._loop = self._context, None, None, None
+        try:
+            await context.__aexit__(None, None, None)
+        except Exception as e:
+            # Its sockets may belong to a loop that is already closed
+            logger.warning(f"⚠️ Could not close S3 client of {self.bucket}: {e}")
+
+    async def get(self, key: str, range: Optional[str] = None, if_none_match: Optional[str] = None) -> AsyncStoredObject:
+        client = await self._get_client()
+        try:
+            obj = await client.get_object(**_get_kwargs(self.bucket, key, range, if_none_match))
+        except ClientError as e:
+            raise storage_error(e, key) from e
+        return AsyncStoredObject(_AsyncBody(obj["Body"]), obj["ContentLength"], obj.get("ETag"), obj.get("ContentRange"))
+
+    async def head(self, key: str) -> ObjectInfo:
+        client = await self._get_client()
+        try:
+            obj = await client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            raise storage_error(e, key) from e
+        return ObjectInfo(key, obj["ContentLength"], obj.get("ETag"), obj.get("LastModified"))
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        client = await self._get_client()
+        extra = {"ContentType": content_type} if content_type else {}
+        await client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+
+    async def delete(self, key: str) -> None:
+        client = await self._get_client()
+        await client.delete_object(Bucket=self.bucket, Key=key)
+
+    async def create_multipart(self, key: str) -> str:
+        client = await self._get_client()
+        return (await client.create_multipart_upload(Bucket=self.bucket, Key=key))["UploadId"]
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        client = await self._get_client()
+        resp = await client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            PartNumber=part_number, Body=data, ContentLength=len(data),
+        )
+        return resp["ETag"]
+
+    async def complete_multipart(self, key: str, upload_id: str, parts: List[dict]) -> None:
+        client = await self._get_client()
+        await client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+        )
+
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        client = await self._get_client()
+        await client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    async def sign(self, key: str, expires: int = 3600) -> str:
+        # Signing is local: the sync storage's signer avoids a second implementation
+        if self.sign_with is not None:
+            return self.sign_with.sign(key, expires)
+        client = await self._get_client()
+        return await client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=expires,
+        )
+
+    async def list(self, prefix: str) -> AsyncIterator[ObjectInfo]:
+        client = await self._get_client()
+        paginator = client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield ObjectInfo(obj["Key"], obj["Size"], obj.get("ETag"), obj.get("LastModified"))
+
@@ -0,0 +1,236 @@
+"""
+Batch exports: several filter specs, one job, one archive.
+
+Each spec's clips go under `<folder>/audio/` next to its own metadata.csv and
+README.txt (folders default to the language, see `BatchExportCreate`). The
+specs share one count query, one server-side stream ordered by sample id
+(`DownloadService.batch_stream`) and one OBS fetch pool; a clip picked by
+several specs is fetched once and written into each of their folders.
+Progress is reported for the batch as a whole.
+"""
+import logging
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from opentelemetry import context as otel_context
+from opentelemetry.trace import SpanKind
+from zipstream import ZipStream, ZIP_STORED
+
+from src.config import settings
+from src.core.celery_app import celery_app
+from src.core.metrics import EXPORT_DURATION_SECONDS, EXPORT_QUEUE_WAIT_SECONDS
+from src.core.tracing import tracer, init_tracing, extract_task_context, with_job_id
+from src.crud.crud_export import get_export_job, update_export_job_status
+from src.db.db import get_async_session_maker
+from src.db.redis import close_redis_client
+from src.db.models import DownloadStatusEnum
+from src.tasks.export_helpers import generate_readme
+from src.storage.registry import get_storage
+from src.tasks.export_pipeline import fetch_pool, obs_key, prefetch_clips, samples_by_id
+from src.tasks.export_worker import (
+    DEFLATE,
+    METADATA_HEADER,
+    METADATA_SPOOL_SIZE,
+    S3MultipartWriter,
+    log_clip_cache_usage,
+    metadata_row,
+    plan_part_size,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True, name="exports.create_batch_zip", acks_late=True)
+def create_batch_zip_task(self, job_id: str, specs: List[dict]):
+    """
+    Synchronous wrapper that runs async logic in an isolated event loop.
+    """
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    # Continue the trace started by enqueue_batch_export
+    init_tracing("export-worker")
+    token = otel_context.attach(with_job_id(job_id, extract_task_context(self.request)))
+
+    try:
+        with tracer.start_as_current_span("exports.create_batch_zip", kind=SpanKind.CONSUMER):
+            return loop.run_until_complete(
+                async_create_batch_zip_impl(
+                    self, job_id, specs,
+                    fresh_session_maker=lambda: get_async_session_maker(force_new=True),
+                )
+            )
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        otel_context.detach(token)
+        loop.run_until_complete(close_redis_client())
+        loop.close()
+
+
+async def async_create_batch_zip_impl(task, job_id: str, specs: List[dict], fresh_session_maker=None):
+    """Main async implementation."""
+    logger.info(f"🚀 Starting batch export job {job_id} ({len(specs)} specs)")
+    started = time.perf_counter()
+
+    session_maker = fresh_session_maker() if fresh_session_maker else get_async_session_maker()
+
+    async with session_maker() as session:
+        job = await get_export_job(session, job_id)
+        if not job:
+            logger.error(f"Job not found: {job_id}")
+            task.update_state(state='FAILURE', meta={'error': 'Job not found'})
+            return
+
+        if job.created_at is not None:
+            EXPORT_QUEUE_WAIT_SECONDS.observe(
+                (datetime.now(timezone.utc) - job.created_at).total_seconds()
+            )
+
+        await update_export_job_status(
+            session, job_id, DownloadStatusEnum.PROCESSING, progress_pct=0
+        )
+
+    export_filename = f"exports/batch_{job_id}.zip"
+
+    try:
+        from src.download.service import DownloadService
+        download_service = DownloadService(s3_bucket_name=settings.OBS_BUCKET_NAME)
+
+        async with session_maker() as session:
+            counts = await download_service.batch_counts(session, specs)
+            total_to_process = sum(counts)
+
+            if total_to_process == 0:
+                logger.warning(f"No audio samples found for batch job {job_id}.")
+                async with session_maker() as session:
+                    await update_export_job_status(
+                        session, job_id, DownloadStatusEnum.FAILED,
+                        error_message="No audio samples found for the selected criteria.",
+                        progress_pct=0
+                    )
+                task.update_state(
+                    state='FAILURE',
+                    meta={'error': "No audio samples found for the selected criteria."}
+                )
+                return {'job_id': job_id, 'download_url': None, 'total_samples': 0}
+
+            export_size = await download_service.batch_export_size(session, specs, counts)
+            rows = await download_service.batch_stream(session, specs, counts)
+
+            part_size = plan_part_size(export_size["total_bytes"])
+            logger.info(
+                f"📐 Batch export {job_id}: {total_to_process} clips in {counts}, "
+                f"{export_size['total_bytes'] / 1024 ** 2:.1f} MB expected"
+                f"{'' if export_size['exact'] else ' (partly estimated)'}, "
+                f"{part_size // 1024 ** 2} MB parts"
+            )
+
+            zs = ZipStream(compress_type=ZIP_STORED)
+            writer = S3MultipartWriter(key=export_filename, part_size=part_size)
+            metadata = [tempfile.SpooledTemporaryFile(max_size=METADATA_SPOOL_SIZE) for _ in specs]
+            for spool in metadata:
+                spool.write(METADATA_HEADER)
+            written = [0] * len(specs)
+            last_sentence_id = ["N/A"] * len(specs)
+            processed_count = 0
+            reported = 0
+
+            try:
+                with fetch_pool() as pool:
+                    async for (sample, spec_indexes), body in prefetch_clips(
+                        samples_by_id(rows), lambda item: obs_key(item[0]), pool
+                    ):
+                        processed_count += len(spec_indexes)
+                        if body is not None:
+                            arcname = f"audio/{sample.sentence_id}.wav"
+                            with tracer.start_as_current_span("zip.write_entry"):
+                                for index in spec_indexes:
+                                    zs.add(iter([body]), arcname=f"{specs[index]['folder']}/{arcname}", size=len(body))
+                                    metadata[index].write(metadata_row(sample, arcname))
+                                    written[index] += 1
+                                    last_sentence_id[index] = sample.sentence_id
+                                writer.write_all(zs.all_files())
+
+                        # One status update per percent of the whole batch
+                        progress = int((processed_count / total_to_process) * 95)
+                        if progress > reported:
+                            reported = progress
+                            task.update_state(
+                                state='PROGRESS',
+                                meta={
+                                    'current': processed_count,
+                                    'total': total_to_process,
+                                    'status': f'Processing {processed_count}/{total_to_process}',
+                                    'job_id': job_id
+                                }
+                            )
+                            async with session_maker() as progress_session:
+                                await update_export_job_status(
+                                    progress_session, job_id,
+                                    DownloadStatusEnum.PROCESSING,
+                                    progress_pct=progress
+                                )
+
+                for index, spec in enumerate(specs):
+                    if not counts[index]:
+                        continue
+                    folder = spec["folder"]
+                    spool = metadata[index]
+                    spool_size = spool.tell()
+                    spool.seek(0)
+                    zs.add(
+                        iter(lambda: spool.read(64 * 1024), b""), arcname=f"{folder}/metadata.csv", size=spool_size, **DEFLATE,
+                    )
+                    readme = generate_readme(
+                        spec["language"], spec["pct"], False, written[index], last_sentence_id[index]
+                    ).encode("utf-8")
+                    zs.add(iter([readme]), arcname=f"{folder}/README.txt", size=len(readme), **DEFLATE)
+                    # Written now, while this spool is the one being read
+                    writer.write_all(zs.all_files())
+
+                # Central directory
+                writer.write_all(zs)
+                writer.close()
+            except Exception:
+                writer.abort()
+                raise
+            finally:
+                for spool in metadata:
+                    spool.close()
+
+        download_url = get_storage("aws").sign(export_filename, 86400)
+
+        samples_written = sum(written)
+        async with session_maker() as session:
+            await update_export_job_status(
+                session, job_id, DownloadStatusEnum.READY,
+                download_url=download_url, progress_pct=100,
+                samples=samples_written, bytes_written=writer.bytes_written
+            )
+
+        EXPORT_DURATION_SECONDS.labels(outcome="ready").observe(time.perf_counter() - started)
+        logger.info(f"✅ Batch job {job_id} completed: {download_url}")
+        log_clip_cache_usage()
+        return {
+            'job_id': job_id,
+            'download_url': download_url,
+            'total_samples': samples_written,
+            'samples_per_spec': written,
+        }
+
+    except Exception as e:
+        EXPORT_DURATION_SECONDS.labels(outcome="failed").observe(time.perf_counter() - started)
+        logger.exception(f"❌ Batch job {job_id} failed: {e}")
+        async with session_maker() as session:
+            await update_export_job_status(
+                session, job_id, DownloadStatusEnum.FAILED,
+                error_message=str(e), progress_pct=0
+            )
+        task.update_state(state='FAILURE', meta={'error': str(e)})
+        raise
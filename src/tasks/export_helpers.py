@@ -1,16 +1,16 @@
+import logging
 import io
 import datetime
 from typing import List, Optional
 import pandas as pd
 from src.db.models import AudioSample
 
+logger = logging.getLogger(__name__)
+
 def generate_metadata_buffer(samples: List[AudioSample], as_excel=True):
     """Create metadata buffer in either Excel or CSV."""
-    print(
-        f"The samples from the dataset have been selected for metadata export.", 
-        f"The metadata will be generated in {'Excel' if as_excel else 'CSV'} format."
-        f"The number of samples selected is {len(samples)}"
-        f"{samples}"
+    logger.debug(
+        f"Generating {'Excel' if as_excel else 'CSV'} metadata for {len(samples)} samples"
     )
     df = pd.DataFrame([{
         "speaker_id": s.speaker_id,
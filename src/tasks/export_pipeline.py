@@ -0,0 +1,109 @@
+"""
+Clip fetching for the export workers.
+
+`prefetch_clips` downloads clips from OBS on a thread pool while the caller
+writes the clips before them into its archive, so an export waits on one
+round trip per window instead of one per clip. Clips are yielded in input
+order, whole, and at most `window` of them are in flight or waiting.
+
+    with fetch_pool() as pool:
+        async for sample, body in prefetch_clips(samples, obs_key, pool):
+            ...
+"""
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, AsyncIterator, Callable, Optional, Tuple, TypeVar
+
+from opentelemetry import context as otel_context
+
+from src.config import settings
+from src.core.metrics import OBS_GET_OBJECT_ERRORS, OBS_GET_OBJECT_SECONDS
+from src.core.tracing import tracer
+from src.download.clip_cache import read_clip
+from src.storage.registry import get_storage
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+async def samples_by_id(rows):
+    """Merge the adjacent `(sample, spec)` rows of `batch_stream` into `(sample, [spec, ...])`."""
+    from src.tasks.export_worker import iter_stream_batches
+
+    current, specs = None, []
+    async for batch in iter_stream_batches(rows):
+        for sample, spec in batch:
+            if current is not None and sample.id != current.id:
+                yield current, specs
+                specs = []
+            current = sample
+            specs.append(spec)
+    if current is not None:
+        yield current, specs
+
+
+def obs_key(sample) -> str:
+    """OBS key of a sample's audio (`<language>-test/<folder>/<sentence_id>.wav`)."""
+    from src.tasks.export_worker import map_category_to_folder
+
+    folder = map_category_to_folder(sample.language, sample.category)
+    return f"{sample.language.lower()}-test/{folder}/{sample.sentence_id}.wav"
+
+
+def fetch_pool(workers: Optional[int] = None) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=workers or settings.EXPORT_FETCH_CONCURRENCY, thread_name_prefix="obs-fetch"
+    )
+
+
+def fetch_clip(key: str, ctx=None) -> Optional[bytes]:
+    """
+    Body of one OBS object, or None (logged and counted) if it cannot be read.
+    A clip served by the disk cache is a read-only memoryview of its file.
+    """
+    token = otel_context.attach(ctx) if ctx is not None else None
+    try:
+        with tracer.start_as_current_span("obs.get_object", attributes={"obs.key": key}), \
+                OBS_GET_OBJECT_SECONDS.time():
+            return read_clip(get_storage("obs"), key)
+    except Exception as e:
+        OBS_GET_OBJECT_ERRORS.inc()
+        logger.warning(f"Skipping missing audio: {key} - {e}")
+        return None
+    finally:
+        if token is not None:
+            otel_context.detach(token)
+
+
+async def prefetch_clips(
+    items: AsyncIterable[T],
+    key_of: Callable[[T], str],
+    pool: ThreadPoolExecutor,
+    window: Optional[int] = None,
+) -> AsyncIterator[Tuple[T, Optional[bytes]]]:
+    """
+    Yield `(item, body)` for each item in order, `body` being None for a clip
+    that could not be fetched. Fetches run ahead of the consumer by up to
+    `window` clips (EXPORT_PREFETCH_WINDOW).
+    """
+    window = window or settings.EXPORT_PREFETCH_WINDOW
+    loop = asyncio.get_running_loop()
+    ctx = otel_context.get_current()
+    pending: deque = deque()
+    try:
+        async for item in items:
+            pending.append((item, loop.run_in_executor(pool, fetch_clip, key_of(item), ctx)))
+            if len(pending) >= window:
+                item, fetch = pending.popleft()
+                yield item, await fetch
+        while pending:
+            item, fetch = pending.popleft()
+            yield item, await fetch
+    finally:
+        # Abandoned early: drop the clips still queued on the pool
+        for _, fetch in pending:
+            fetch.cancel()
@@ -1,19 +1,47 @@
 
 import logging
-from zipstream import ZipStream, ZIP_DEFLATED
+import math
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timezone
+from zipstream import ZipStream, ZIP_DEFLATED, ZIP_STORED
 import asyncio
 from typing import Iterable, Optional
 from src.core.celery_app import celery_app
 from src.db.db import get_async_session_maker
+from src.db.redis import close_redis_client
 from src.db.models import DownloadStatusEnum
 from src.crud.crud_export import get_export_job, update_export_job_status
-from src.download.s3_config import  s3_obs, s3_aws
+from src.storage.base import Storage
+from src.storage.registry import get_storage
+from src.download.clip_cache import get_clip_cache, open_clip
 from src.config import settings
+from src.core.metrics import (
+    EXPORT_DURATION_SECONDS,
+    EXPORT_QUEUE_WAIT_SECONDS,
+    MULTIPART_UPLOAD_PART_SECONDS,
+    OBS_GET_OBJECT_ERRORS,
+    OBS_GET_OBJECT_SECONDS,
+    ZIP_BYTES_PRODUCED,
+)
+from src.core.tracing import tracer, init_tracing, extract_task_context, with_job_id
+from opentelemetry import context as otel_context
+from opentelemetry.trace import SpanKind
 
 
 
 logger = logging.getLogger(__name__)
 MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PART_SIZE = 5 * 1024 * 1024 * 1024
+S3_MAX_PARTS = 10_000
+PART_SIZE_HEADROOM = 1.25  # in case the archive outgrows its planned size
+STREAM_BATCH_SIZE = 500  # rows fetched per filter_core_stream round trip
+METADATA_SPOOL_SIZE = 1024 * 1024  # metadata.csv bytes kept in memory before spilling to disk
+# For the text entries only. Like the audio they are added with their size,
+# so their headers match what `zip_size` plans for.
+DEFLATE = {"compress_type": ZIP_DEFLATED, "compress_level": 9}
+METADATA_HEADER = b"speaker_id,transcript_id,transcript,audio_path,gender,age_group,education,duration,language,snr,domain\n"
 
 SAMPLE_RATE = 48000
 CHANNELS = 1
@@ -25,81 +53,167 @@ try:
     if not isinstance(asyncio.get_event_loop(), type(asyncio.new_event_loop())):
         nest_asyncio.apply()
 except Exception as e:
-    print(f"⚠️ nest_asyncio skipped: {e}")
+    logger.warning(f"⚠️ nest_asyncio skipped: {e}")
 
 
 
 
-def s3_stream_bytes(s3_body, chunk_size=64 * 1024) -> Iterable[bytes]:
-    """Generator to yield bytes from S3 StreamingBody."""
-    while True:
-        chunk = s3_body.read(chunk_size)
-        if not chunk:
-            break
-        yield chunk
-
 def buffered_zip_chunks(zip_gen, min_size=5*1024*1024):
     """Yield fixed-size byte chunks from a zipstream generator for S3 multipart upload."""
     buf = bytearray()
     for chunk in zip_gen:
         buf.extend(chunk)
         while len(buf) >= min_size:
-            yield bytes(buf[:min_size])
-            buf = buf[min_size:]
+            # One copy out of the buffer; `del` trims the front in place
+            with memoryview(buf) as view:
+                part = bytes(view[:min_size])
+            del buf[:min_size]
+            yield part
     if buf:
         yield bytes(buf)
 
-def zip_bytes_generator(zs, min_size=5*1024*1024):
-    """Yield contiguous byte chunks suitable for S3 multipart."""
-    buf = bytearray()
-    for chunk in zs:
-        buf.extend(chunk)
-        while len(buf) >= min_size:
-            yield bytes(buf[:min_size])
-            buf = buf[min_size:]
-    if buf:
-        yield bytes(buf)
 
 
+def metadata_row(sample, arcname: str) -> bytes:
+    """A sample's metadata.csv line; `arcname` is its audio path in the archive."""
+    row = (
+        f'"{sample.speaker_id}","{sample.sentence_id}","{sample.sentence or ""}","{arcname}",'
+        f'"{sample.gender}","{sample.age_group}","{sample.edu_level}","{sample.duration}",'
+        f'"{sample.language}","{sample.snr}","{sample.domain}"\n'
+    )
+    return row.encode('utf-8')
 
-def stream_zip_to_s3_blocking(zip_gen, bucket: str, key: str):
-    """Upload a zip generator to S3 safely, skipping empty chunks."""
-    resp = s3_aws.create_multipart_upload(Bucket=bucket, Key=key)
-    upload_id = resp['UploadId']
-    parts = []
-    part_number = 1
 
-    try:
-        for part_bytes in zip_bytes_generator(zip_gen, MIN_PART_SIZE):
-            if not part_bytes:  # Skip empty chunks
-                continue
-
-            resp = s3_aws.upload_part(
-                Bucket=bucket,
-                Key=key,
-                UploadId=upload_id,
-                PartNumber=part_number,
-                Body=part_bytes,
-                ContentLength=len(part_bytes)
-            )
-            parts.append({'PartNumber': part_number, 'ETag': resp['ETag']})
-            part_number += 1
+def plan_part_size(expected_bytes: int) -> int:
+    """
+    Multipart part size for an archive of about `expected_bytes`: the smallest
+    whole number of MiB (at least MIN_PART_SIZE) that keeps the upload under
+    S3's part limit. The writer holds about two parts in memory.
+    """
+    mib = 1024 * 1024
+    needed = math.ceil(expected_bytes * PART_SIZE_HEADROOM / S3_MAX_PARTS / mib) * mib
+    return min(MAX_PART_SIZE, max(MIN_PART_SIZE, needed))
+
+
+async def iter_stream_batches(samples_stream, size: int = STREAM_BATCH_SIZE):
+    """Yield lists of rows from a filter_core_stream result, one span per fetched batch."""
+    batches = samples_stream.partitions(size)
+    while True:
+        with tracer.start_as_current_span("filter_core_stream.batch") as span:
+            batch = await anext(batches, None)
+            span.set_attribute("batch.rows", len(batch) if batch else 0)
+        if not batch:
+            return
+        yield batch
+
+
+class S3MultipartWriter:
+    """
+    Incremental S3 multipart upload.
+
+    Written bytes are buffered until a full part is available, and each part
+    is uploaded as soon as it fills. Memory stays at about one part no matter
+    how large the archive gets.
+
+    With an `executor`, parts are sent on it and writing never waits for
+    them. A writer fed from the event loop awaits `drain()` between writes,
+    which holds it back until at most `max_pending` parts are in flight;
+    `close()` waits for all of them and belongs on a thread.
+    """
+
+    def __init__(
+        self, key: str, part_size: int = MIN_PART_SIZE, executor=None, max_pending: int = 2,
+        storage: Optional[Storage] = None,
+    ):
+        self.storage = storage or get_storage("aws")
+        self.key = key
+        self.part_size = part_size
+        self.executor = executor
+        self.max_pending = max_pending
+        self.parts = []
+        self.bytes_written = 0
+        self._buf = bytearray()
+        self._pending = deque()
+        self._next_part = 1
+        self._finished = False
+        self.upload_id = self.storage.create_multipart(key)
+
+    def write(self, data: bytes):
+        ZIP_BYTES_PRODUCED.labels(path="worker").inc(len(data))
+        self.bytes_written += len(data)
+        self._buf.extend(data)
+        while len(self._buf) >= self.part_size:
+            with memoryview(self._buf) as view:
+                part = bytes(view[:self.part_size])
+            del self._buf[:self.part_size]
+            self._upload_part(part)
+
+    def write_all(self, chunks: Iterable[bytes]):
+        for chunk in chunks:
+            if chunk:  # Skip empty chunks
+                self.write(chunk)
+
+    def _upload_part(self, part_bytes: bytes):
+        part_number = self._next_part
+        self._next_part += 1
+        if self.executor is None:
+            self.parts.append(self._send_part(part_number, part_bytes))
+            return
+        self._pending.append(self.executor.submit(self._send_part, part_number, part_bytes))
+        # Collect finished parts, in order, without blocking the caller
+        while self._pending and self._pending[0].done():
+            self.parts.append(self._pending.popleft().result())
+
+    async def drain(self):
+        """Wait, without blocking the event loop, until at most `max_pending` parts are in flight."""
+        while len(self._pending) > self.max_pending:
+            self.parts.append(await asyncio.wrap_future(self._pending[0]))
+            self._pending.popleft()
+
+    def _send_part(self, part_number: int, part_bytes: bytes) -> dict:
+        with tracer.start_as_current_span(
+            "s3.upload_part",
+            attributes={"part.number": part_number, "part.bytes": len(part_bytes)},
+        ), MULTIPART_UPLOAD_PART_SECONDS.labels(path="worker").time():
+            etag = self.storage.upload_part(self.key, self.upload_id, part_number, part_bytes)
+        return {'PartNumber': part_number, 'ETag': etag}
+
+    def close(self):
+        """Upload the remaining bytes as the last part and complete the upload."""
+        if self._buf:
+            self._upload_part(bytes(self._buf))
+            self._buf.clear()
+        while self._pending:
+            self.parts.append(self._pending.popleft().result())
 
         # Only complete upload if at least one part was uploaded
-        if parts:
-            s3_aws.complete_multipart_upload(
-                Bucket=bucket,
-                Key=key,
-                UploadId=upload_id,
-                MultipartUpload={'Parts': parts}
-            )
-        else:
-            # No parts uploaded, abort the upload
-            s3_aws.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
-            raise ValueError(f"No valid parts to upload for S3 key={key}")
+        if not self.parts:
+            self.abort()
+            raise ValueError(f"No valid parts to upload for S3 key={self.key}")
 
-    except Exception as e:
-        s3_aws.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        self.storage.complete_multipart(self.key, self.upload_id, self.parts)
+        self._finished = True
+
+    def abort(self):
+        if self._finished:
+            return
+        self._finished = True
+        # Let parts already in flight settle first, or they would outlive the upload
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.cancel():
+                future.exception()
+        self.storage.abort_multipart(self.key, self.upload_id)
+
+
+def stream_zip_to_s3_blocking(zip_gen, key: str):
+    """Upload a zip generator to S3 safely, skipping empty chunks."""
+    writer = S3MultipartWriter(key=key)
+    try:
+        writer.write_all(zip_gen)
+        writer.close()
+    except Exception:
+        writer.abort()
         raise
 
 
@@ -115,7 +229,8 @@ def create_dataset_zip_s3_task_new(
     age_group: str | None = None,
     education: str | None = None,
     split: str | None = None,
-    domain: str | None = None
+    domain: str | None = None,
+    export_format: str = "zip",
 ):
     """
     Synchronous wrapper that runs async logic in an isolated event loop.
@@ -130,17 +245,27 @@ def create_dataset_zip_s3_task_new(
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
+    # Continue the trace started by enqueue_export_job
+    init_tracing("export-worker")
+    token = otel_context.attach(with_job_id(job_id, extract_task_context(self.request)))
+
     try:
-        return loop.run_until_complete(
-            async_create_dataset_zip_s3_impl(
-                self, job_id, language, pct, category,
-                gender, age_group, education, split, domain,
-                fresh_session_maker=fresh_session_maker
+        with tracer.start_as_current_span(
+            "exports.create_dataset_zip_s3_task_new", kind=SpanKind.CONSUMER
+        ):
+            return loop.run_until_complete(
+                async_create_dataset_zip_s3_impl(
+                    self, job_id, language, pct, category,
+                    gender, age_group, education, split, domain,
+                    fresh_session_maker=fresh_session_maker,
+                    export_format=export_format,
+                )
             )
-        )
     except Exception as e:
         return {"error": str(e)}
     finally:
+        otel_context.detach(token)
+        loop.run_until_complete(close_redis_client())
         loop.close()
 
 
@@ -155,13 +280,23 @@ async def async_create_dataset_zip_s3_impl(
     education: str | None = None,
     split: str | None = None,
     domain: str | None = None,
-    fresh_session_maker=None
+    fresh_session_maker=None,
+    export_format: str = "zip",
     ):
     """Main async implementation."""
     logger.info(f"🚀 Starting export job {job_id}")
+    started = time.perf_counter()
     
     session_maker = fresh_session_maker() if fresh_session_maker else get_async_session_maker()
 
+    spec = dict(
+        language=language, pct=pct, category=category, gender=gender, age_group=age_group,
+        education=education, split=split, domain=domain,
+    )
+    if settings.EXPORT_FANOUT_ENABLED and export_format == "zip":
+        from .fanout_export import run_fanout_export
+        return await run_fanout_export(task, job_id, spec, session_maker)
+
     language = language
     pct = pct
 
@@ -171,11 +306,20 @@ async def async_create_dataset_zip_s3_impl(
             logger.error(f"Job not found: {job_id}")
             task.update_state(state='FAILURE', meta={'error': 'Job not found'})
             return
+
+        if job.created_at is not None:
+            EXPORT_QUEUE_WAIT_SECONDS.observe(
+                (datetime.now(timezone.utc) - job.created_at).total_seconds()
+            )
         
         await update_export_job_status(
             session, job_id, DownloadStatusEnum.PROCESSING, progress_pct=0
         )
 
+    if export_format != "zip":
+        from .shard_export import run_shard_export
+        return await run_shard_export(task, job_id, spec, export_format, session_maker)
+
     export_filename = f"exports/{language}_{pct}pct_{job_id}.zip"
     
     try:
@@ -185,7 +329,7 @@ async def async_create_dataset_zip_s3_impl(
         logger.warning(f"\nThe filter paramaters are {language}, {pct}, {category}, {gender}, {age_group}, {education}, {split}, {domain}")
         
         async with session_maker() as session:
-            samples_stream, total_to_process = await download_service.filter_core_stream(
+            export_size = await download_service.export_size(
                 session=session,
                 language=language,
                 pct=pct,
@@ -196,6 +340,19 @@ async def async_create_dataset_zip_s3_impl(
                 split=split,
                 domain=domain
             )
+            # export_size counted the rows already
+            samples_stream, total_to_process = await download_service.filter_core_stream(
+                session=session,
+                language=language,
+                pct=pct,
+                category=category,
+                gender=gender,
+                age_group=age_group,
+                education=education,
+                split=split,
+                domain=domain,
+                num_to_fetch=export_size["sample_count"],
+            )
 
 
             if total_to_process == 0:
@@ -217,83 +374,106 @@ async def async_create_dataset_zip_s3_impl(
                     'total_samples': 0
                 }
             
-            zs = ZipStream(compress_type=ZIP_DEFLATED, compress_level=9)
+            # Audio is stored as-is (WAV barely deflates), which keeps the archive
+            # size exact; only metadata.csv and README.txt are deflated
+            zs = ZipStream(compress_type=ZIP_STORED)
+            part_size = plan_part_size(export_size["total_bytes"])
+            logger.info(
+                f"📐 Export {job_id}: {export_size['sample_count']} clips, "
+                f"{export_size['total_bytes'] / 1024 ** 2:.1f} MB expected"
+                f"{'' if export_size['exact'] else ' (partly estimated)'}, "
+                f"{part_size // 1024 ** 2} MB parts (~{2 * part_size // 1024 ** 2} MB buffered)"
+            )
+            writer = S3MultipartWriter(key=export_filename, part_size=part_size)
             processed_count = 0
             last_sentence_id = "N/A"
-            all_metadata_rows = [
-                "speaker_id,transcript_id,transcript,audio_path,gender,age_group,education,duration,language,snr,domain\n"
-            ]
-
-            async for sample in samples_stream:
-                last_sentence_id = sample.sentence_id
-                arcname = f"audio/{sample.sentence_id}.wav"
-
-                folder = map_category_to_folder(sample.language, sample.category)
-                key = f"{sample.language.lower()}-test/{folder}/{sample.sentence_id}.wav"
+            # Metadata rows go to a spooled file so they do not pile up in memory
+            metadata = tempfile.SpooledTemporaryFile(max_size=METADATA_SPOOL_SIZE)
+            metadata.write(METADATA_HEADER)
+
+            try:
+                async for batch in iter_stream_batches(samples_stream):
+                    for sample in batch:
+                        last_sentence_id = sample.sentence_id
+                        arcname = f"audio/{sample.sentence_id}.wav"
+
+                        folder = map_category_to_folder(sample.language, sample.category)
+                        key = f"{sample.language.lower()}-test/{folder}/{sample.sentence_id}.wav"
+
+                        try:
+                            with tracer.start_as_current_span("obs.get_object", attributes={"obs.key": key}), \
+                                    OBS_GET_OBJECT_SECONDS.time():
+                                clip = open_clip(get_storage("obs"), key)
+                            zs.add(clip.chunks, arcname=arcname, size=clip.size)
+                        except Exception as e:
+                            OBS_GET_OBJECT_ERRORS.inc()
+                            logger.warning(f"Skipping missing audio for job {job_id}: {key} - {e}")
+                            continue
+
+                        # Compress and upload this clip now, instead of holding every
+                        # OBS response open until the archive is finalised
+                        with tracer.start_as_current_span("zip.write_entry"):
+                            writer.write_all(zs.all_files())
+
+                        metadata.write(metadata_row(sample, arcname))
+
+                        processed_count += 1
+
+                        # Update progress every 10 samples
+                        if processed_count % 5 == 0:
+                            progress = int((processed_count / total_to_process) * 95)
+
+                            # Update both Celery state AND database
+                            task.update_state(
+                                state='PROGRESS',
+                                meta={
+                                    'current': processed_count,
+                                    'total': total_to_process,
+                                    'status': f'Processing {processed_count}/{total_to_process}',
+                                    'job_id': job_id
+                                }
+                            )
+
+                            async with session_maker() as progress_session:
+                                await update_export_job_status(
+                                    progress_session, job_id, 
+                                    DownloadStatusEnum.PROCESSING,
+                                    progress_pct=progress
+                                )
+
+                # Finalize zip
+                metadata_size = metadata.tell()
+                metadata.seek(0)
+                zs.add(iter(lambda: metadata.read(64 * 1024), b""), arcname="metadata.csv", size=metadata_size, **DEFLATE)
                 
-                try:
-                    obj = s3_obs.get_object(Bucket=settings.OBS_BUCKET_NAME, Key=key)
-                    zs.add(s3_stream_bytes(obj["Body"]), arcname=arcname)
-                except Exception as e:
-                    logger.warning(f"Skipping missing audio for job {job_id}: {key} - {e}")
-                    continue
-                
-                row = (
-                    f'"{sample.speaker_id}","{sample.sentence_id}","{sample.sentence or ""}","{arcname}",'
-                    f'"{sample.gender}","{sample.age_group}","{sample.edu_level}","{sample.duration}",'
-                    f'"{sample.language}","{sample.snr}","{sample.domain}"\n'
-                )
-                all_metadata_rows.append(row)
                 
-                processed_count += 1
+                from .export_helpers import generate_readme
+                readme_content = generate_readme(language, pct, False, processed_count, last_sentence_id)
+                readme_bytes = readme_content.encode("utf-8")
+                zs.add(iter([readme_bytes]), arcname="README.txt", size=len(readme_bytes), **DEFLATE)
                 
-                # Update progress every 10 samples
-                if processed_count % 5 == 0:
-                    progress = int((processed_count / total_to_process) * 95)
-                    
-                    # Update both Celery state AND database
-                    task.update_state(
-                        state='PROGRESS',
-                        meta={
-                            'current': processed_count,
-                            'total': total_to_process,
-                            'status': f'Processing {processed_count}/{total_to_process}',
-                            'job_id': job_id
-                        }
-                    )
-                    
-                    async with session_maker() as progress_session:
-                        await update_export_job_status(
-                            progress_session, job_id, 
-                            DownloadStatusEnum.PROCESSING,
-                            progress_pct=progress
-                        )
-
-            # Finalize zip
-            metadata_content = "".join(all_metadata_rows).encode('utf-8')
-            zs.add(iter([metadata_content]), arcname="metadata.csv")
-            
-            
-            from .export_helpers import generate_readme
-            readme_content = generate_readme(language, pct, False, processed_count, last_sentence_id)
-            zs.add(iter([readme_content.encode("utf-8")]), arcname="README.txt")
-            
-            stream_zip_to_s3_blocking(zs, bucket=settings.S3_BUCKET_NAME, key=export_filename)
+                # Remaining entries plus the central directory
+                writer.write_all(zs)
+                writer.close()
+            except Exception:
+                writer.abort()
+                raise
+            finally:
+                metadata.close()
 
         # Generate presigned URL
-        download_url = s3_aws.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': settings.S3_BUCKET_NAME, 'Key': export_filename},
-            ExpiresIn=86400
-        )
+        download_url = get_storage("aws").sign(export_filename, 86400)
         
         async with session_maker() as session:
             await update_export_job_status(
                 session, job_id, DownloadStatusEnum.READY, 
-                download_url=download_url, progress_pct=100
+                download_url=download_url, progress_pct=100,
+                samples=processed_count, bytes_written=writer.bytes_written
             )
 
+        EXPORT_DURATION_SECONDS.labels(outcome="ready").observe(time.perf_counter() - started)
         logger.info(f"✅ Job {job_id} completed: {download_url}")
+        log_clip_cache_usage()
         return {
             'job_id': job_id, 
             'download_url': download_url, 
@@ -301,6 +481,7 @@ async def async_create_dataset_zip_s3_impl(
         }
 
     except Exception as e:
+        EXPORT_DURATION_SECONDS.labels(outcome="failed").observe(time.perf_counter() - started)
         logger.exception(f"❌ Job {job_id} failed: {e}")
         async with session_maker() as session:
             await update_export_job_status(
@@ -314,6 +495,15 @@ async def async_create_dataset_zip_s3_impl(
 
 
 
+def log_clip_cache_usage():
+    cache = get_clip_cache()
+    if cache is not None:
+        logger.info(
+            f"🗄️ Clip cache hit ratio {cache.hit_ratio:.0%} "
+            f"({cache.hits} of {cache.hits + cache.misses} clips since worker start)"
+        )
+
+
 def map_category_to_folder(language: str, category: Optional[str] = None) -> str:
     """
     Maps a given category and language to the corresponding folder name.
@@ -0,0 +1,196 @@
+"""
+Fan-out exports: one clip stream, several archives.
+
+With EXPORT_FANOUT_ENABLED, the worker that picks up an export job also
+claims up to EXPORT_FANOUT_MAX_JOBS - 1 other queued exports of the same
+language (`claim_export_jobs`). Their samples are read as one stream, ordered
+by sample id (`DownloadService.batch_stream`), and every clip is fetched
+once by the shared prefetch pipeline, then written into each archive that
+selects it. Overlapping jobs (Hausa 20% and Hausa female 40%) thus pay for
+the clips they share once. Every job keeps its own archive, key, progress
+and outcome, identical to a single export of its filters. The celery tasks
+of the claimed jobs find them no longer queued and return.
+"""
+import logging
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from zipstream import ZipStream, ZIP_STORED
+
+from src.config import settings
+from src.core.metrics import (
+    EXPORT_DURATION_SECONDS,
+    EXPORT_FANOUT_JOBS,
+    EXPORT_FANOUT_SHARED_CLIPS,
+    EXPORT_QUEUE_WAIT_SECONDS,
+)
+from src.core.tracing import tracer
+from src.crud.crud_export import claim_export_jobs, update_export_job_status
+from src.db.models import DownloadLog, DownloadStatusEnum
+from src.tasks.export_helpers import generate_readme
+from src.storage.registry import get_storage
+from src.tasks.export_pipeline import fetch_pool, obs_key, prefetch_clips, samples_by_id
+from src.tasks.export_worker import (
+    DEFLATE,
+    METADATA_HEADER,
+    METADATA_SPOOL_SIZE,
+    S3MultipartWriter,
+    log_clip_cache_usage,
+    metadata_row,
+    plan_part_size,
+)
+
+
+logger = logging.getLogger(__name__)
+
+NO_SAMPLES = "No audio samples found for the selected criteria."
+
+
+class JobArchive:
+    """One job's ZIP, streamed to its own multipart upload as clips arrive."""
+
+    def __init__(self, job: DownloadLog, spec: dict, total: int, part_size: int):
+        self.job_id = job.id
+        self.spec = spec
+        self.total = total
+        self.key = f"exports/{spec['language']}_{spec['pct']}pct_{job.id}.zip"
+        self.zs = ZipStream(compress_type=ZIP_STORED)
+        self.writer = S3MultipartWriter(key=self.key, part_size=part_size)
+        self.metadata = tempfile.SpooledTemporaryFile(max_size=METADATA_SPOOL_SIZE)
+        self.metadata.write(METADATA_HEADER)
+        self.processed = 0
+        self.written = 0
+        self.reported = 0
+        self.last_sentence_id = "N/A"
+
+    def add(self, sample, body) -> None:
+        """Write one clip (None: its fetch failed, skip it like a single export does)."""
+        self.processed += 1
+        if body is None:
+            return
+        arcname = f"audio/{sample.sentence_id}.wav"
+        self.zs.add(iter([body]), arcname=arcname, size=len(body))
+        self.writer.write_all(self.zs.all_files())
+        self.metadata.write(metadata_row(sample, arcname))
+        self.written += 1
+        self.last_sentence_id = sample.sentence_id
+
+    def progress(self) -> int:
+        return int((self.processed / self.total) * 95)
+
+    def finish(self) -> None:
+        metadata_size = self.metadata.tell()
+        self.metadata.seek(0)
+        self.zs.add(iter(lambda: self.metadata.read(64 * 1024), b""), arcname="metadata.csv", size=metadata_size, **DEFLATE)
+        readme = generate_readme(
+            self.spec["language"], self.spec["pct"], False, self.written, self.last_sentence_id
+        ).encode("utf-8")
+        self.zs.add(iter([readme]), arcname="README.txt", size=len(readme), **DEFLATE)
+        self.writer.write_all(self.zs)
+        self.writer.close()
+
+    def close(self) -> None:
+        self.writer.abort()  # no-op once finished
+        self.metadata.close()
+
+
+async def run_fanout_export(task, job_id: str, spec: dict, session_maker) -> dict:
+    """
+    Claim `job_id` with compatible queued jobs and export them together.
+    `spec` is `job_id`'s own filters; the others are read from their `specs`.
+    """
+    async with session_maker() as session:
+        jobs = await claim_export_jobs(session, job_id, spec["language"], settings.EXPORT_FANOUT_MAX_JOBS)
+    if not jobs:
+        logger.info(f"⏭️ Job {job_id} was already taken by another export worker")
+        return {'job_id': job_id, 'skipped': True}
+
+    started = time.perf_counter()
+    specs = [spec] + [job.specs[0] for job in jobs[1:]]
+    now = datetime.now(timezone.utc)
+    for job in jobs:
+        if job.created_at is not None:
+            EXPORT_QUEUE_WAIT_SECONDS.observe((now - job.created_at).total_seconds())
+    EXPORT_FANOUT_JOBS.observe(len(jobs))
+    logger.info(f"🚀 Fan-out export of {len(jobs)} job(s): {[job.id for job in jobs]}")
+
+    from src.download.service import DownloadService
+    download_service = DownloadService(s3_bucket_name=settings.OBS_BUCKET_NAME)
+    archives: dict = {}
+    finished = set()  # job ids already READY or FAILED
+    try:
+        async with session_maker() as session:
+            counts = await download_service.batch_counts(session, specs)
+            for job, count in zip(jobs, counts):
+                if not count:
+                    logger.warning(f"No audio samples found for job {job.id}.")
+                    await update_export_job_status(
+                        session, job.id, DownloadStatusEnum.FAILED, error_message=NO_SAMPLES, progress_pct=0
+                    )
+                    finished.add(job.id)
+            if not any(counts):
+                task.update_state(state='FAILURE', meta={'error': NO_SAMPLES})
+                return {'job_id': job_id, 'download_url': None, 'total_samples': 0}
+
+            for index, (job, job_spec, count) in enumerate(zip(jobs, specs, counts)):
+                if count:
+                    filters = {k: v for k, v in job_spec.items() if k != "folder"}
+                    size = await download_service.export_size(session, **filters, num_to_fetch=count)
+                    archives[index] = JobArchive(job, job_spec, count, plan_part_size(size["total_bytes"]))
+
+            rows = await download_service.batch_stream(session, specs, counts)
+            with fetch_pool() as pool:
+                async for (sample, indexes), body in prefetch_clips(
+                    samples_by_id(rows), lambda item: obs_key(item[0]), pool
+                ):
+                    if body is not None and len(indexes) > 1:
+                        EXPORT_FANOUT_SHARED_CLIPS.inc(len(indexes) - 1)
+                    with tracer.start_as_current_span("zip.write_entry"):
+                        for index in indexes:
+                            archives[index].add(sample, body)
+
+                    for index in indexes:
+                        archive = archives[index]
+                        progress = archive.progress()
+                        if progress > archive.reported:
+                            archive.reported = progress
+                            async with session_maker() as progress_session:
+                                await update_export_job_status(
+                                    progress_session, archive.job_id,
+                                    DownloadStatusEnum.PROCESSING, progress_pct=progress
+                                )
+
+        results = []
+        for archive in archives.values():
+            archive.finish()
+            download_url = get_storage("aws").sign(archive.key, 86400)
+            async with session_maker() as session:
+                await update_export_job_status(
+                    session, archive.job_id, DownloadStatusEnum.READY,
+                    download_url=download_url, progress_pct=100,
+                    samples=archive.written, bytes_written=archive.writer.bytes_written
+                )
+            finished.add(archive.job_id)
+            EXPORT_DURATION_SECONDS.labels(outcome="ready").observe(time.perf_counter() - started)
+            logger.info(f"✅ Job {archive.job_id} completed: {download_url}")
+            results.append({'job_id': archive.job_id, 'download_url': download_url, 'total_samples': archive.written})
+
+        log_clip_cache_usage()
+        own = results[0] if results and results[0]['job_id'] == job_id else {'job_id': job_id}
+        return {**own, 'fanout_jobs': results}
+
+    except Exception as e:
+        logger.exception(f"❌ Fan-out export of {[job.id for job in jobs]} failed: {e}")
+        async with session_maker() as session:
+            for job in jobs:
+                if job.id not in finished:
+                    EXPORT_DURATION_SECONDS.labels(outcome="failed").observe(time.perf_counter() - started)
+                    await update_export_job_status(
+                        session, job.id, DownloadStatusEnum.FAILED, error_message=str(e), progress_pct=0
+                    )
+        task.update_state(state='FAILURE', meta={'error': str(e)})
+        raise
+    finally:
+        for archive in archives.values():
+            archive.close()
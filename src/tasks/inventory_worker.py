@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from src.core.celery_app import celery_app
+from src.db.db import get_async_session_maker
+from src.db.redis import close_redis_client
+from src.download.inventory import crawl_inventory
+
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True, name="inventory.crawl", acks_late=True)
+def crawl_inventory_task(self, languages: Optional[List[str]] = None):
+    """
+    Reconcile `object_inventory` with the audio bucket, for some or all
+    catalog languages. Scheduled by Celery beat.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        return loop.run_until_complete(async_crawl_inventory(languages))
+    finally:
+        loop.run_until_complete(close_redis_client())
+        loop.close()
+
+
+async def async_crawl_inventory(languages: Optional[List[str]] = None) -> dict:
+    session_maker = get_async_session_maker(force_new=True)
+    results = await crawl_inventory(session_maker, languages)
+    failed = [prefix for prefix, result in results.items() if "error" in result]
+    if failed:
+        logger.warning(f"Inventory crawl finished with {len(failed)} failed prefixes: {failed}")
+    return results
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+from typing import Optional
+
+from src.core.celery_app import celery_app
+from src.db.db import get_async_session_maker
+from src.db.redis import close_redis_client
+from src.download.preview_pool import list_catalog_languages, refresh_preview_pool
+
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True, name="previews.refresh_preview_pools", acks_late=True)
+def refresh_preview_pools_task(self, language: Optional[str] = None):
+    """
+    Rebuild the preview pool of one language, or of every catalog language.
+    Scheduled by Celery beat and enqueued on demand when a pool is missing.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        return loop.run_until_complete(async_refresh_preview_pools(language))
+    finally:
+        loop.run_until_complete(close_redis_client())
+        loop.close()
+
+
+async def async_refresh_preview_pools(language: Optional[str] = None) -> dict:
+    session_maker = get_async_session_maker(force_new=True)
+
+    async with session_maker() as session:
+        languages = [language] if language else await list_catalog_languages(session)
+
+    refreshed = {}
+    for lang in languages:
+        async with session_maker() as session:
+            refreshed[lang] = await refresh_preview_pool(session, lang)
+        logger.info(f"Preview pool for {lang} rebuilt with {refreshed[lang]} candidates")
+
+    return refreshed
@@ -0,0 +1,368 @@
+"""
+Sharded exports for training pipelines.
+
+Instead of one ZIP, the export is written as numbered, size-bounded shards
+under `exports/<language>_<pct>pct_<job_id>/`, plus an `index.json` listing
+them with presigned URLs; the job's `download_url` points at the index.
+
+    tar       WebDataset layout: `<sentence_id>.wav` followed by
+              `<sentence_id>.json` (the metadata.csv columns), POSIX (pax)
+              tar members, EXPORT_SHARD_BYTES per shard.
+    parquet   One row per sample: the metadata.csv columns plus `audio`
+              (the WAV bytes). Row groups of about
+              EXPORT_PARQUET_ROW_GROUP_BYTES are built as Arrow record
+              batches; audio is stored uncompressed, so a memory-mapped
+              read (`pq.read_table(path, memory_map=True)`) does not copy it.
+
+Shards are complete, and can be consumed, as soon as their upload
+finishes (a tar needs no central directory; a Parquet footer is written
+when its shard is sealed). Every shard is its own multipart upload; its
+parts go up on a shared thread pool while the next bytes are written, and
+a full shard is completed in the background while the next one fills.
+"""
+import asyncio
+import json
+import logging
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.config import settings
+from src.core.metrics import EXPORT_DURATION_SECONDS
+from src.crud.crud_export import update_export_job_status
+from src.db.models import DownloadStatusEnum
+from src.storage.registry import get_storage
+from src.tasks.export_pipeline import fetch_pool, obs_key, prefetch_clips
+from src.tasks.export_worker import S3MultipartWriter, iter_stream_batches, log_clip_cache_usage, plan_part_size
+
+
+logger = logging.getLogger(__name__)
+
+SHARD_FORMATS = ("tar", "parquet")
+INDEX_URL_TTL_SECONDS = 86400
+
+
+def sample_record(sample, audio_path: str) -> dict:
+    """A sample's metadata, with the columns of `generate_metadata_buffer`."""
+    return {
+        "speaker_id": sample.speaker_id,
+        "transcript_id": sample.sentence_id,
+        "transcript": sample.sentence or "",
+        "audio_path": audio_path,
+        "gender": sample.gender,
+        "age_group": sample.age_group,
+        "edu_level": sample.edu_level,
+        "durations": sample.duration,
+        "language": sample.language,
+        "snr": sample.snr,
+        "domain": sample.domain,
+    }
+
+
+def tar_member(name: str, data: bytes, mtime: float) -> List[bytes]:
+    """Header, data and block padding of one regular file."""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    header = info.tobuf(format=tarfile.PAX_FORMAT, encoding="utf-8", errors="strict")
+    return [header, data, b"\0" * (-len(data) % tarfile.BLOCKSIZE)]
+
+
+def tar_member_size(size: int) -> int:
+    """Bytes of a member with a plain (ustar) header."""
+    return tarfile.BLOCKSIZE + size + (-size % tarfile.BLOCKSIZE)
+
+
+class ShardSet:
+    """
+    Numbered shards of one export. `open` starts the next shard's upload;
+    `seal` completes the current one in the background and records it for
+    the index.
+    """
+
+    def __init__(self, prefix: str, extension: str, shard_bytes: int, pool: ThreadPoolExecutor):
+        self.prefix = prefix
+        self.extension = extension
+        self.part_size = plan_part_size(shard_bytes)
+        self.pool = pool
+        self.entries: List[dict] = []
+        self.writer: Optional[S3MultipartWriter] = None
+        self._sealing: List[asyncio.Future] = []
+        self._open_writers: List[S3MultipartWriter] = []
+
+    def open(self) -> S3MultipartWriter:
+        name = f"shard-{len(self.entries):06d}.{self.extension}"
+        self.writer = S3MultipartWriter(
+            key=f"{self.prefix}/{name}", part_size=self.part_size,
+            executor=self.pool, max_pending=settings.EXPORT_SHARD_UPLOAD_CONCURRENCY,
+        )
+        self._open_writers.append(self.writer)
+        self.entries.append({"name": name, "key": self.writer.key, "samples": 0})
+        return self.writer
+
+    def record(self, sample):
+        """Count `sample` in the current shard's index entry."""
+        entry = self.entries[-1]
+        entry["samples"] += 1
+        entry.setdefault("first", sample.sentence_id)
+        entry["last"] = sample.sentence_id
+
+    async def drain(self):
+        """Hold the producer back while the current shard has too many parts in flight."""
+        if self.writer is not None:
+            await self.writer.drain()
+
+    def seal(self):
+        """Complete the current shard's upload without waiting for it."""
+        writer, self.writer = self.writer, None
+        self.entries[-1]["bytes"] = writer.bytes_written
+        self._sealing.append(asyncio.ensure_future(asyncio.to_thread(writer.close)))
+
+    async def finish(self) -> List[dict]:
+        """Wait for every shard upload; the index entries, with presigned URLs."""
+        await asyncio.gather(*self._sealing)
+        self._open_writers.clear()
+        for entry in self.entries:
+            entry["url"] = get_storage("aws").sign(entry["key"], INDEX_URL_TTL_SECONDS)
+        return self.entries
+
+    async def abort(self, *keys: str):
+        """Abort the open uploads and delete the shards (and `keys`) already completed."""
+        await asyncio.gather(*self._sealing, return_exceptions=True)
+        for writer in self._open_writers:
+            await asyncio.to_thread(writer.abort)
+        storage = get_storage("aws")
+        for key in [entry["key"] for entry in self.entries] + list(keys):
+            try:
+                await asyncio.to_thread(storage.delete, key)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not delete {key} of a failed export: {e}")
+
+
+class TarShardWriter:
+    """WebDataset tar shards: `<sentence_id>.wav` + `<sentence_id>.json` per sample."""
+
+    extension = "tar"
+
+    def __init__(self, shards: ShardSet, shard_bytes: int):
+        self.shards = shards
+        self.shard_bytes = shard_bytes
+        self.mtime = time.time()
+        self._size = 0
+
+    def add(self, sample, body: bytes):
+        record = json.dumps(
+            sample_record(sample, f"{sample.sentence_id}.wav"), ensure_ascii=False, default=str
+        ).encode("utf-8")
+        size = tar_member_size(len(body)) + tar_member_size(len(record))
+        # Start a new shard once this sample would overflow the current one
+        if self.shards.writer is not None and self._size + size + 2 * tarfile.BLOCKSIZE > self.shard_bytes:
+            self._seal()
+        writer = self.shards.writer or self.shards.open()
+        for chunk in tar_member(f"{sample.sentence_id}.wav", body, self.mtime):
+            writer.write(chunk)
+        for chunk in tar_member(f"{sample.sentence_id}.json", record, self.mtime):
+            writer.write(chunk)
+        self._size += size
+        self.shards.record(sample)
+
+    def _seal(self):
+        # End-of-archive marker: two zero blocks
+        self.shards.writer.write(b"\0" * (2 * tarfile.BLOCKSIZE))
+        self.shards.seal()
+        self._size = 0
+
+    def close(self):
+        if self.shards.writer is not None:
+            self._seal()
+
+
+PARQUET_SCHEMA = pa.schema([
+    ("speaker_id", pa.string()),
+    ("transcript_id", pa.string()),
+    ("transcript", pa.string()),
+    ("audio_path", pa.string()),
+    ("gender", pa.string()),
+    ("age_group", pa.string()),
+    ("edu_level", pa.string()),
+    ("durations", pa.string()),
+    ("language", pa.string()),
+    ("snr", pa.int32()),
+    ("domain", pa.string()),
+    ("audio", pa.binary()),
+])
+PARQUET_METADATA_COLUMNS = [name for name in PARQUET_SCHEMA.names if name != "audio"]
+
+
+class _ShardSink:
+    """File-like view of a shard upload for `pq.ParquetWriter`."""
+
+    def __init__(self, writer: S3MultipartWriter):
+        self.writer = writer
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.writer.write(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.writer.bytes_written
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class ParquetShardWriter:
+    """Parquet shards, one row group per EXPORT_PARQUET_ROW_GROUP_BYTES of audio."""
+
+    extension = "parquet"
+
+    def __init__(self, shards: ShardSet, shard_bytes: int):
+        self.shards = shards
+        self.shard_bytes = shard_bytes
+        self.row_group_bytes = min(settings.EXPORT_PARQUET_ROW_GROUP_BYTES, shard_bytes)
+        self._parquet: Optional[pq.ParquetWriter] = None
+        self._rows: List[dict] = []
+        self._buffered = 0
+
+    def add(self, sample, body: bytes):
+        if self._parquet is None:
+            sink = _ShardSink(self.shards.writer or self.shards.open())
+            self._parquet = pq.ParquetWriter(
+                pa.PythonFile(sink, mode="w"), PARQUET_SCHEMA,
+                compression={**{name: "zstd" for name in PARQUET_METADATA_COLUMNS}, "audio": "none"},
+                use_dictionary=PARQUET_METADATA_COLUMNS,
+                write_statistics=PARQUET_METADATA_COLUMNS,
+            )
+        record = sample_record(sample, f"{sample.sentence_id}.wav")
+        record["audio"] = body
+        self._rows.append(record)
+        self._buffered += len(body)
+        self.shards.record(sample)
+
+        if self._buffered >= self.row_group_bytes:
+            self._write_row_group()
+            if self.shards.writer.bytes_written >= self.shard_bytes - self.row_group_bytes:
+                self._seal()
+
+    def _write_row_group(self):
+        batch = pa.RecordBatch.from_pylist(self._rows, schema=PARQUET_SCHEMA)
+        self._parquet.write_batch(batch, row_group_size=len(self._rows))
+        self._rows = []
+        self._buffered = 0
+
+    def _seal(self):
+        if self._rows:
+            self._write_row_group()
+        self._parquet.close()  # writes the footer
+        self._parquet = None
+        self.shards.seal()
+
+    def close(self):
+        if self._parquet is not None:
+            self._seal()
+
+
+SHARD_WRITERS = {"tar": TarShardWriter, "parquet": ParquetShardWriter}
+
+
+async def run_shard_export(task, job_id: str, spec: dict, export_format: str, session_maker) -> dict:
+    """Export one job's samples as `export_format` shards (the job is already PROCESSING)."""
+    started = time.perf_counter()
+    prefix = f"exports/{spec['language']}_{spec['pct']}pct_{job_id}"
+    index_key = f"{prefix}/index.json"
+    shard_bytes = settings.EXPORT_SHARD_BYTES
+    upload_pool = ThreadPoolExecutor(
+        max_workers=settings.EXPORT_SHARD_UPLOAD_CONCURRENCY, thread_name_prefix="shard-upload"
+    )
+    shards = ShardSet(prefix, SHARD_WRITERS[export_format].extension, shard_bytes, upload_pool)
+    try:
+        from src.download.service import DownloadService
+        download_service = DownloadService(s3_bucket_name=settings.OBS_BUCKET_NAME)
+
+        async with session_maker() as session:
+            samples_stream, total_to_process = await download_service.filter_core_stream(session=session, **spec)
+            writer = SHARD_WRITERS[export_format](shards, shard_bytes)
+            processed_count = 0
+            reported = 0
+
+            async def samples():
+                async for batch in iter_stream_batches(samples_stream):
+                    for sample in batch:
+                        yield sample
+
+            with fetch_pool() as pool:
+                async for sample, body in prefetch_clips(samples(), obs_key, pool):
+                    processed_count += 1
+                    if body is not None:
+                        writer.add(sample, body)
+                        await shards.drain()
+
+                    progress = int((processed_count / total_to_process) * 95)
+                    if progress > reported:
+                        reported = progress
+                        task.update_state(
+                            state='PROGRESS',
+                            meta={
+                                'current': processed_count,
+                                'total': total_to_process,
+                                'status': f'Processing {processed_count}/{total_to_process}',
+                                'job_id': job_id
+                            }
+                        )
+                        async with session_maker() as progress_session:
+                            await update_export_job_status(
+                                progress_session, job_id, DownloadStatusEnum.PROCESSING, progress_pct=progress
+                            )
+            writer.close()
+
+        entries = await shards.finish()
+        written = sum(entry["samples"] for entry in entries)
+        if not written:
+            raise ValueError("No audio could be fetched for the selected criteria.")
+
+        index = {
+            "job_id": job_id,
+            "format": export_format,
+            "language": spec["language"],
+            "pct": spec["pct"],
+            "samples": written,
+            "shard_bytes": shard_bytes,
+            "url_expires_in": INDEX_URL_TTL_SECONDS,
+            "shards": entries,
+        }
+        get_storage("aws").put(index_key, json.dumps(index, indent=2).encode("utf-8"), "application/json")
+        download_url = get_storage("aws").sign(index_key, INDEX_URL_TTL_SECONDS)
+
+        async with session_maker() as session:
+            await update_export_job_status(
+                session, job_id, DownloadStatusEnum.READY,
+                download_url=download_url, progress_pct=100,
+                samples=written, bytes_written=sum(entry["bytes"] for entry in entries)
+            )
+        EXPORT_DURATION_SECONDS.labels(outcome="ready").observe(time.perf_counter() - started)
+        logger.info(f"✅ Job {job_id} completed: {len(entries)} {export_format} shard(s), index {index_key}")
+        log_clip_cache_usage()
+        return {'job_id': job_id, 'download_url': download_url, 'total_samples': written, 'shards': len(entries)}
+
+    except Exception as e:
+        await shards.abort(index_key)
+        EXPORT_DURATION_SECONDS.labels(outcome="failed").observe(time.perf_counter() - started)
+        logger.exception(f"❌ Job {job_id} failed: {e}")
+        async with session_maker() as session:
+            await update_export_job_status(
+                session, job_id, DownloadStatusEnum.FAILED, error_message=str(e), progress_pct=0
+            )
+        task.update_state(state='FAILURE', meta={'error': str(e)})
+        raise
+    finally:
+        upload_pool.shutdown(wait=True)
@@ -0,0 +1,24 @@
+import os
+import sys
+from pathlib import Path
+
+
+# Make `src` importable and give Settings the values it requires, so tests
+# run without a .env file or any external service.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+for name in (
+    "DATABASE_URL", "JWT_SECRET", "JWT_ALGORITHM", "GOOGLE_CLIENT_ID",
+    "GOOGLE_CLIENT_SECRET", "GOOGLE_REDIRECT_URI", "RESEND_API_KEY",
+    "FRONTEND_URL", "BACKEND_URL", "EMAIL_FROM", "OBS_ACCESS_KEY_ID",
+    "OBS_SECRET_ACCESS_KEY", "OBS_REGION", "S3_BUCKET_NAME",
+    "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "PGDATABASE", "PGUSER",
+    "PGPASSWORD", "PGHOST", "REDIS_HOST", "REDIS_PASSWORD", "REDIS_USERNAME",
+    "SESSION_SECRET_KEY",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_ENDPOINT_URL", "http://localhost:9000")
+os.environ.setdefault("OBS_ENDPOINT_URL", "http://localhost:9000")
+os.environ.setdefault("PGPORT", "5432")
+os.environ.setdefault("REDIS_PORT", "6379")
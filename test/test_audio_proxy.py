@@ -0,0 +1,119 @@
+"""
+The audio proxy: clips from the disk cache are opened only when their body
+is sent, ranges and 304s are answered from the clip, responses are private,
+and only samples in the preview pools resolve to a clip.
+"""
+import asyncio
+from collections import namedtuple
+
+import pytest
+from fastapi import HTTPException
+
+import src.download.audio_proxy as audio_proxy
+from src.download.audio_proxy import ClipSource, FileClip, MemoryClip, clip_response
+
+
+@pytest.fixture
+def file_clip(tmp_path):
+    path = tmp_path / "clip.wav"
+    path.write_bytes(bytes(range(256)) * 1024)
+    return FileClip('"etag-1"', str(path), 256 * 1024)
+
+
+async def body(response) -> bytes:
+    return b"".join([bytes(chunk) async for chunk in response.body_iterator])
+
+
+def test_clip_source_is_abstract():
+    with pytest.raises(TypeError):
+        ClipSource('"etag"', 0, "memory")
+
+
+def test_file_clip_reads_ranges(file_clip):
+    data = bytes(range(256)) * 1024
+    assert b"".join(file_clip.chunks(0, file_clip.size - 1)) == data
+    assert b"".join(file_clip.chunks(1000, 200_000)) == data[1000:200_001]
+
+
+def test_file_clip_is_not_opened_until_sent(file_clip, monkeypatch):
+    opened = []
+
+    def spy_open(*args, **kwargs):
+        opened.append(args[0])
+        return open(*args, **kwargs)
+
+    monkeypatch.setattr(audio_proxy, "open", spy_open, raising=False)
+    # A 304, and a response dropped before its first chunk, hold no file open
+    assert clip_response(file_clip, None, '"etag-1"', None).status_code == 304
+    response = clip_response(file_clip, (0, 99), None, None)
+    assert response.status_code == 206
+    assert opened == []
+    assert asyncio.run(body(response)) == bytes(range(100))
+    assert opened == [file_clip.path]
+
+
+def test_evicted_file_clip_ends_short(file_clip, tmp_path):
+    (tmp_path / "clip.wav").unlink()
+    assert list(file_clip.chunks(0, 10)) == []
+
+
+def test_responses_are_private():
+    clip = MemoryClip('"etag-1"', b"0123456789")
+    response = clip_response(clip, (2, 5), None, None)
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == "bytes 2-5/10"
+    assert response.headers["Cache-Control"].startswith("private")
+    assert asyncio.run(body(response)) == b"2345"
+
+    # If-Range naming another version gets the whole current clip
+    response = clip_response(clip, (2, 5), None, '"etag-0"')
+    assert response.status_code == 200 and asyncio.run(body(response)) == b"0123456789"
+
+    response = clip_response(clip, (10, None), None, None)
+    assert response.status_code == 416 and response.headers["Content-Range"] == "bytes */10"
+
+
+def test_only_pooled_samples_resolve(monkeypatch):
+    Row = namedtuple("Row", "language category sentence_id")
+    pooled = {"in-pool": Row("yoruba", "read", "s1")}
+    queries = []
+
+    class Result:
+        def __init__(self, row):
+            self.row = row
+
+        def first(self):
+            return self.row
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, stmt):
+            queries.append(stmt)
+            sample_id = stmt.whereclause.right.value
+            assert stmt.whereclause.left.table.name == "preview_candidates"
+            return Result(pooled.get(sample_id))
+
+    monkeypatch.setattr("src.db.db.get_async_session_maker", lambda: Session)
+    monkeypatch.setattr(audio_proxy, "_sample_keys", type(audio_proxy._sample_keys)())
+    monkeypatch.setattr("src.tasks.export_worker.map_category_to_folder", lambda language, category: category)
+
+    async def main():
+        assert await audio_proxy.sample_audio_key("in-pool") == "yoruba-test/read/s1.wav"
+        assert await audio_proxy.sample_audio_key("in-pool") == "yoruba-test/read/s1.wav"
+        assert len(queries) == 1  # remembered
+        with pytest.raises(HTTPException) as e:
+            await audio_proxy.sample_audio_key("not-in-pool")
+        assert e.value.status_code == 404
+
+        # Past the TTL the pool is asked again, and a sample dropped from it is gone
+        monkeypatch.setattr(audio_proxy, "SAMPLE_KEY_TTL_SECONDS", 0)
+        del pooled["in-pool"]
+        with pytest.raises(HTTPException):
+            await audio_proxy.sample_audio_key("in-pool")
+
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+The worker-local clip cache: `tee` stores a clip only once it has been read
+whole, eviction removes the least recently used clips down to 90% of the
+limit, and `open_clip` serves hits from the cache and refills it from the
+storage when the object changed or was evicted.
+"""
+import os
+
+import pytest
+
+import src.download.clip_cache as clip_cache
+from src.download.clip_cache import ClipCache, open_clip, read_clip
+from src.storage.local import LocalStorage
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ClipCache(str(tmp_path / "cache"), max_bytes=100_000)
+
+
+def tmp_files(cache):
+    return os.listdir(os.path.join(cache.directory, "tmp"))
+
+
+def fill(cache, key, data, etag='"v1"'):
+    assert b"".join(cache.tee(key, etag, len(data), iter([data[:10], data[10:]]))) == data
+
+
+def test_tee_commits_a_whole_clip(cache):
+    fill(cache, "a.wav", b"x" * 500)
+    assert cache.etag("a.wav") == '"v1"'
+    assert bytes(cache.read("a.wav")) == b"x" * 500
+    assert tmp_files(cache) == []
+
+    # A new version replaces the entry
+    fill(cache, "a.wav", b"y" * 300, etag='"v2"')
+    assert cache.etag("a.wav") == '"v2"'
+    assert bytes(cache.read("a.wav")) == b"y" * 300
+
+
+def test_tee_drops_a_clip_read_in_part(cache):
+    chunks = cache.tee("a.wav", '"v1"', 30, iter([b"x" * 10, b"x" * 10, b"x" * 10]))
+    next(chunks)
+    chunks.close()  # the reader stopped early
+    assert cache.etag("a.wav") is None and cache.open("a.wav") is None
+    assert tmp_files(cache) == []
+
+    # Fewer bytes than the object's size: never stored
+    assert b"".join(cache.tee("b.wav", '"v1"', 50, iter([b"x" * 20]))) == b"x" * 20
+    assert cache.etag("b.wav") is None
+    assert tmp_files(cache) == []
+
+
+def test_tee_passes_through_what_it_does_not_cache(cache):
+    big = b"x" * (cache.max_object_bytes + 1)
+    assert b"".join(cache.tee("big.wav", '"v1"', len(big), iter([big]))) == big
+    assert b"".join(cache.tee("no-etag.wav", None, 3, iter([b"abc"]))) == b"abc"
+    assert cache.etag("big.wav") is None and cache.etag("no-etag.wav") is None
+
+
+def test_eviction_removes_least_recently_used(cache, monkeypatch):
+    clock = iter(range(1, 1000))
+    monkeypatch.setattr(clip_cache.time, "time", lambda: next(clock))
+    clip = b"x" * cache.max_object_bytes  # 100 fill the cache exactly
+    for i in range(100):
+        fill(cache, f"{i}.wav", clip)
+    cache.open("0.wav").close()  # used again: now the most recent
+    assert all(cache.etag(f"{i}.wav") for i in range(100))
+
+    fill(cache, "100.wav", clip)  # one over: evict down to 90%
+    kept = [i for i in range(101) if cache.etag(f"{i}.wav") is not None]
+    assert kept == [0] + list(range(12, 101))
+    assert len(kept) * len(clip) <= cache.max_bytes * clip_cache.EVICT_TO
+    for i in range(101):
+        assert os.path.exists(cache.path(f"{i}.wav")) == (i in kept)
+
+
+def test_evicted_clip_stays_readable_while_mapped(cache):
+    fill(cache, "a.wav", b"abc" * 100)
+    view = cache.read("a.wav")
+    cache._evict(1)
+    assert cache.open("a.wav") is None
+    assert bytes(view) == b"abc" * 100
+
+
+@pytest.fixture
+def obs(tmp_path, monkeypatch):
+    monkeypatch.setattr(clip_cache.settings, "CLIP_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(clip_cache, "_cache", None)
+    storage = LocalStorage(str(tmp_path / "obs"), "bucket")
+    storage.put("a.wav", b"first" * 100)
+    return storage
+
+
+def test_open_clip_hit_stale_and_miss(obs):
+    cache = clip_cache.get_clip_cache()
+    clip = open_clip(obs, "a.wav")
+    assert not clip.cached and b"".join(clip.chunks) == b"first" * 100
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    clip = open_clip(obs, "a.wav")
+    assert clip.cached and bytes(clip.chunks[0]) == b"first" * 100
+    assert cache.hits == 1
+
+    obs.put("a.wav", b"second" * 100)
+    assert read_clip(obs, "a.wav") == b"second" * 100  # stale: refetched and stored again
+    assert cache.etag("a.wav") == obs.head("a.wav").etag
+    assert bytes(read_clip(obs, "a.wav")) == b"second" * 100
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_open_clip_after_eviction_refetches(obs):
+    cache = clip_cache.get_clip_cache()
+    read_clip(obs, "a.wav")
+    os.unlink(cache.path("a.wav"))  # evicted by another process after the etag lookup
+    clip = open_clip(obs, "a.wav")
+    assert not clip.cached and b"".join(clip.chunks) == b"first" * 100
+    assert bytes(read_clip(obs, "a.wav")) == b"first" * 100
@@ -0,0 +1,243 @@
+"""
+Memory-ceiling regression tests for the export paths.
+
+Each path exports synthetic datasets of growing size with OBS, S3 and the
+database replaced by in-memory fakes. Peak memory (tracemalloc) must stay
+under a fixed budget of a few parts and clips and must not grow with the
+number of samples. A regression back to O(N) buffering fails here instead of
+OOM-killing a worker.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import tracemalloc
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+import src.download.utils as download_utils
+import src.tasks.export_worker as export_worker
+from src.download.service import DownloadService
+from src.storage.base import ThreadedAsyncStorage
+from src.storage.s3 import S3Storage
+
+
+MiB = 1024 * 1024
+CLIP_SIZE = 128 * 1024
+SIZES = (64, 128, 512)  # all above one part, so the part buffer is in every baseline
+
+PART_SIZE = export_worker.MIN_PART_SIZE
+assert download_utils.CHUNK_SIZE == PART_SIZE
+
+# A part being assembled plus the one being sent, a few clips in flight,
+# and fixed overhead (zlib state, metadata spool, fakes)
+MEMORY_BUDGET = 2 * PART_SIZE + 4 * CLIP_SIZE + 4 * MiB
+# Allowed growth between the smallest and largest export (per-row bookkeeping)
+GROWTH_SLACK = 1 * MiB
+
+# Random audio compresses about as badly as real recordings.
+# Created once, outside any measured window.
+_NOISE = os.urandom(CLIP_SIZE)
+
+
+def make_sample(i: int):
+    return SimpleNamespace(
+        id=f"id_{i:06d}", sentence_id=f"sent_{i:06d}", sentence=f"Sentence {i}",
+        speaker_id=f"spk_{i % 20:02d}", gender="female" if i % 2 else "male",
+        age_group="18-25", edu_level="tertiary", duration="2.7", language="yoruba",
+        snr=40, domain="general", category="read", dataset_id="yoruba",
+    )
+
+
+class FakeBody:
+    def __init__(self):
+        self._pos = 0
+
+    def read(self, n: int = -1) -> bytes:
+        end = len(_NOISE) if n < 0 else self._pos + n
+        chunk = _NOISE[self._pos:end]
+        self._pos += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+
+class FakeS3:
+    """boto3 S3 client stand-in; keeps part bodies only if asked to."""
+
+    def __init__(self, keep_parts: bool = False):
+        self.keep_parts = keep_parts
+        self.parts = {}
+        self.uploaded = 0
+        self.completed = False
+        self.aborted = False
+
+    def get_object(self, Bucket, Key):
+        return {"Body": FakeBody(), "ContentLength": len(_NOISE)}
+
+    def create_multipart_upload(self, Bucket, Key):
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, PartNumber, Body, **kwargs):
+        self.uploaded += len(Body)
+        if self.keep_parts:
+            self.parts[PartNumber] = Body
+        return {"ETag": f'"etag-{PartNumber}"'}
+
+    def complete_multipart_upload(self, **kwargs):
+        self.completed = True
+
+    def abort_multipart_upload(self, **kwargs):
+        self.aborted = True
+
+    def generate_presigned_url(self, *args, **kwargs):
+        return "https://exports.example/export.zip"
+
+    def archive(self) -> zipfile.ZipFile:
+        data = b"".join(self.parts[n] for n in sorted(self.parts))
+        return zipfile.ZipFile(io.BytesIO(data))
+
+
+class FakeSampleStream:
+    """Mimics the AsyncScalarResult from filter_core_stream, building rows lazily."""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    async def partitions(self, size: int):
+        for start in range(0, self.count, size):
+            yield [make_sample(i) for i in range(start, min(start + size, self.count))]
+
+
+class FakeTask:
+    def update_state(self, state=None, meta=None):
+        pass
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    """Route both export paths to a FakeS3 and fake out the job table."""
+    s3 = FakeS3()
+
+    async def get_export_job(session, job_id):
+        return SimpleNamespace(id=job_id, created_at=None)
+
+    async def update_export_job_status(session, job_id, status, **kwargs):
+        return None
+
+    monkeypatch.setattr(export_worker, "get_storage", lambda name: S3Storage(s3, name))
+    monkeypatch.setattr(export_worker, "get_export_job", get_export_job)
+    monkeypatch.setattr(export_worker, "update_export_job_status", update_export_job_status)
+    monkeypatch.setattr(download_utils, "get_async_storage", lambda name: ThreadedAsyncStorage(S3Storage(s3, name)))
+    return s3
+
+
+def run_worker_export(count: int):
+    async def filter_core_stream(self, session, **kwargs):
+        return FakeSampleStream(count), count
+
+    async def export_size(self, session, **kwargs):
+        return {"sample_count": count, "total_bytes": count * CLIP_SIZE, "exact": True}
+
+    @contextlib.asynccontextmanager
+    async def session():
+        yield None
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(DownloadService, "filter_core_stream", filter_core_stream)
+        mp.setattr(DownloadService, "export_size", export_size)
+        return asyncio.run(export_worker.async_create_dataset_zip_s3_impl(
+            FakeTask(), f"job-{count}", "yoruba", 100,
+            fresh_session_maker=lambda: session,
+        ))
+
+
+def run_api_export(count: int):
+    samples = [make_sample(i) for i in range(count)]
+    return lambda: asyncio.run(download_utils.stream_zip_to_s3("yoruba", samples, as_excel=False))
+
+
+def peak_memory(fn) -> int:
+    """Peak traced memory (bytes) allocated while `fn` runs."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - base
+
+
+def assert_bounded(peaks: dict):
+    for count, peak in peaks.items():
+        assert peak < MEMORY_BUDGET, (
+            f"export of {count} samples peaked at {peak / MiB:.1f} MiB "
+            f"(budget {MEMORY_BUDGET / MiB:.1f} MiB): {peaks}"
+        )
+    growth = peaks[max(peaks)] - peaks[min(peaks)]
+    assert growth < GROWTH_SLACK, (
+        f"peak memory grew by {growth / MiB:.1f} MiB from {min(peaks)} to {max(peaks)} samples: {peaks}"
+    )
+
+
+def test_worker_export_memory_is_bounded(fake_s3):
+    run_worker_export(4)  # warm-up: lazy imports, metric children, tracer
+
+    peaks = {count: peak_memory(lambda: run_worker_export(count)) for count in SIZES}
+
+    assert fake_s3.uploaded > max(SIZES) * CLIP_SIZE
+    assert_bounded(peaks)
+
+
+def test_api_export_memory_is_bounded(fake_s3):
+    run_api_export(4)()
+
+    peaks = {}
+    for count in SIZES:
+        export = run_api_export(count)  # the sample rows are the caller's, not the export's
+        peaks[count] = peak_memory(export)
+
+    assert fake_s3.uploaded > max(SIZES) * CLIP_SIZE
+    assert_bounded(peaks)
+
+
+def test_buffered_zip_chunks_memory_is_bounded():
+    def consume(count):
+        chunks = (_NOISE for _ in range(count))
+        for part in export_worker.buffered_zip_chunks(chunks, min_size=MiB):
+            assert len(part) <= MiB
+
+    peaks = {count: peak_memory(lambda: consume(count)) for count in SIZES}
+
+    budget = 3 * MiB + 2 * CLIP_SIZE  # buffer (with over-allocation) plus the part copy
+    assert all(peak < budget for peak in peaks.values()), peaks
+
+
+@pytest.mark.parametrize("path", ["worker", "api"])
+def test_streamed_archive_is_complete(fake_s3, path):
+    fake_s3.keep_parts = True
+    count = 50  # > 5 MiB of audio, so the archive spans several parts
+
+    if path == "worker":
+        result = run_worker_export(count)
+        assert result["total_samples"] == count
+        prefix = ""
+    else:
+        run_api_export(count)()
+        prefix = next(iter(fake_s3.archive().namelist())).split("/audio/")[0] + "/"
+
+    assert fake_s3.completed and not fake_s3.aborted
+    assert len(fake_s3.parts) > 1
+    archive = fake_s3.archive()
+    assert archive.testzip() is None
+
+    names = archive.namelist()
+    assert sum(name.startswith(f"{prefix}audio/") for name in names) == count
+    assert archive.read(f"{prefix}audio/sent_000000.wav") == _NOISE
+    metadata = archive.read(f"{prefix}metadata.csv").decode().splitlines()
+    assert len(metadata) == count + 1
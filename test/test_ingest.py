@@ -0,0 +1,134 @@
+"""
+Excel bulk ingest (`AdminService.upload_bulk_with_excel`) with the storage
+and database replaced by fakes. The COPY fake encodes timestamps the way
+asyncpg's binary codec does, so a value the `timestamp without time zone`
+columns cannot take fails here as it would in production. Also the catalog
+loader's row normalisation, which dedupes on the upsert key.
+"""
+import asyncio
+import io
+from datetime import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from fastapi import UploadFile
+
+import src.admin.service as admin_service
+from src.admin.service import AdminService
+from src.ingest.loader import CONFLICT_KEY
+from src.ingest.manifest import normalize_catalog
+from src.storage.local import LocalStorage
+
+pgproto = pytest.importorskip("asyncpg.pgproto.pgproto")
+
+
+class CopyDriver:
+    """Stands in for an asyncpg connection: `copy_records_to_table` only."""
+
+    def __init__(self, fail_after: int | None = None):
+        self.rows = []
+        self.fail_after = fail_after
+
+    async def copy_records_to_table(self, name, records, columns, schema_name=None):
+        for record in records:
+            for value in record:
+                if isinstance(value, datetime):
+                    # asyncpg's timestamp_encode; an aware value cannot be subtracted
+                    value - pgproto.pg_epoch_datetime
+            self.rows.append(dict(zip(columns, record)))
+        if self.fail_after is not None and len(self.rows) >= self.fail_after:
+            raise RuntimeError("copy failed")
+
+
+class Session:
+    def __init__(self, driver: CopyDriver):
+        self.driver = driver
+        self.committed = self.rolled_back = False
+
+    async def get(self, model, id):
+        return SimpleNamespace(id=id)
+
+    async def connection(self):
+        raw = SimpleNamespace(driver_connection=self.driver)
+
+        async def get_raw_connection():
+            return raw
+
+        return SimpleNamespace(get_raw_connection=get_raw_connection)
+
+    async def commit(self):
+        self.committed = True
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+def manifest(count: int) -> io.BytesIO:
+    sheet = pd.DataFrame({
+        "transcript": [f"sentence {i}" for i in range(count)],
+        "transcript_id": [f"s{i}" for i in range(count)],
+        "sample_rate": 16000,
+        "snr": 40,
+        "audio_path": [f"clip_{i}.wav" for i in range(count)],
+        "language": "Yoruba",
+        "gender": "female",
+        "duration": 2.5,
+        "category": "read",
+    })
+    excel = io.BytesIO()
+    sheet.to_excel(excel, index=False, engine="openpyxl")
+    excel.seek(0)
+    return excel
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path), "bucket")
+    monkeypatch.setattr(admin_service, "get_storage", lambda name: storage)
+
+    async def add_dataset_samples(session, dataset_id, count):
+        pass
+
+    monkeypatch.setattr(admin_service, "add_dataset_samples", add_dataset_samples)
+    return storage
+
+
+def ingest(session: Session, count: int):
+    files = [UploadFile(io.BytesIO(b"RIFF" + bytes(i)), filename=f"clip_{i}.wav") for i in range(count)]
+    return asyncio.run(AdminService.upload_bulk_with_excel(
+        "ds-1", manifest(count), files, session, batch_size=2, concurrency=2,
+    ))
+
+
+def test_ingest_copies_naive_timestamps(storage):
+    session = Session(CopyDriver())
+    sample_ids = ingest(session, 5)
+    assert len(sample_ids) == 5 and session.committed
+    rows = session.driver.rows
+    assert [row["id"] for row in rows] == sample_ids
+    for row in rows:
+        assert row["created_at"].tzinfo is None and row["uploaded_at"].tzinfo is None
+        assert storage.head(row["storage_link"]).size == row["size_bytes"]
+
+
+def test_failed_ingest_deletes_its_uploads(storage):
+    session = Session(CopyDriver(fail_after=3))
+    with pytest.raises(RuntimeError):
+        ingest(session, 5)
+    assert session.rolled_back and not session.committed
+    assert list(storage.list("datasets/")) == []
+
+
+def test_catalog_dedupes_on_the_upsert_key():
+    df = pd.DataFrame({
+        "sentence_id": ["s1", "s1", "s1", "s2"],
+        "language": ["Yoruba", "hausa", "yoruba", "yoruba"],
+        "sentence": ["first", "hausa", "second", "other"],
+    })
+    out, counts = normalize_catalog(df, "ds-1")
+    assert counts == {}
+    # The same id in two languages is two clips; within a language the last row wins
+    assert sorted(map(tuple, out[list(CONFLICT_KEY) + ["sentence"]].values.tolist())) == [
+        ("hausa", "s1", "hausa"), ("yoruba", "s1", "second"), ("yoruba", "s2", "other"),
+    ]
@@ -0,0 +1,229 @@
+"""
+Export job status: ETag matching, the `?wait=` long-poll, Last-Event-ID
+replay, who may follow a job's events, and the per-loop Redis client.
+Redis is replaced by the status hub's in-memory state or, where a client
+is needed, by fakeredis.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import src.core.job_status as job_status
+import src.db.redis as redis_module
+import src.routes.celery as celery_routes
+from src.core.job_status import StatusHub, etag_matches, status_etag
+
+
+def make_payload(version: int, status: str = "processing", job_id: str = "job-1") -> dict:
+    return {"id": job_id, "user_id": "user-1", "status": status, "version": version, "progress_pct": version}
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (None, False),
+    ("", False),
+    ('"job-1.3"', True),
+    ('W/"job-1.3"', True),
+    ('"job-1.2", "job-1.3"', True),
+    ('"job-1.2","job-1.3"', True),
+    ("*", True),
+    ('"job-1.2"', False),
+    ('"job-1.30"', False),
+    ("job-1.3", False),  # unquoted is not the same tag
+])
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, status_etag(make_payload(3))) is expected
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    """A connected status hub standing in for the Redis stream reader."""
+    hub = StatusHub(max_jobs=10, max_pending=10)
+    hub.connected = True
+    monkeypatch.setattr(celery_routes, "status_hub", hub)
+
+    async def read_status(job_id):
+        payload = hub._latest.get(job_id)
+        return payload, "memory"
+
+    monkeypatch.setattr(celery_routes, "read_status", read_status)
+    return hub
+
+
+def poll(if_none_match=None, wait=None):
+    return celery_routes.get_export_status("job-1", wait=wait, if_none_match=if_none_match)
+
+
+def test_status_poll_without_wait(hub):
+    async def main():
+        hub.dispatch("1-0", make_payload(1))
+        first = await poll()
+        assert first.status_code == 200 and first.headers["ETag"] == '"job-1.1"'
+        unchanged = await poll(if_none_match='"job-1.1"')
+        assert unchanged.status_code == 304 and unchanged.headers["ETag"] == '"job-1.1"'
+
+    asyncio.run(main())
+
+
+def test_long_poll_returns_when_the_job_changes(hub):
+    async def main():
+        hub.dispatch("1-0", make_payload(1))
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, hub.dispatch, "2-0", make_payload(2))
+        started = loop.time()
+        response = await poll(if_none_match='"job-1.1"', wait=5)
+        assert loop.time() - started < 1
+        assert response.status_code == 200 and response.headers["ETag"] == '"job-1.2"'
+        assert not hub._waiters
+
+    asyncio.run(main())
+
+
+def test_long_poll_times_out_with_304(hub):
+    async def main():
+        hub.dispatch("1-0", make_payload(1))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await poll(if_none_match='"job-1.1"', wait=0.1)
+        assert 0.1 <= loop.time() - started < 1
+        assert response.status_code == 304
+        assert not hub._waiters
+
+    asyncio.run(main())
+
+
+def test_long_poll_does_not_wait_on_a_finished_job(hub):
+    async def main():
+        hub.dispatch("1-0", make_payload(4, status="ready"))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await poll(if_none_match='"job-1.4"', wait=5)
+        assert loop.time() - started < 0.5
+        assert response.status_code == 304
+
+    asyncio.run(main())
+
+
+def test_redis_client_is_per_loop_and_closed_with_it(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(redis_module, "init_redis_client", lambda *args: fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(redis_module, "_clients", type(redis_module._clients)())
+    clients = []
+
+    async def task():
+        client = redis_module.get_redis_client()
+        assert client is redis_module.get_redis_client()
+        clients.append(client)
+        await client.ping()
+        await redis_module.close_redis_client()
+        await redis_module.close_redis_client()  # idempotent
+
+    for _ in range(2):  # as Celery does: a fresh loop per task
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(task())
+        loop.close()
+    assert clients[0] is not clients[1]
+    assert len(redis_module._clients) == 0
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    """A fakeredis client behind get_redis_client, and a helper appending status events."""
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(job_status, "get_redis_client", lambda: client)
+
+    async def add(payload: dict) -> str:
+        return await client.xadd(job_status.STATUS_STREAM, {"status": json.dumps(payload)})
+
+    return client, add
+
+
+def test_replay_from_last_event_id(stream):
+    client, add = stream
+
+    async def main():
+        ids = [await add(make_payload(v, job_id=f"job-{v % 2}")) for v in range(1, 7)]
+        events = await job_status.replay_events(ids[1], job_id="job-1")
+        assert [(event_id, p["version"]) for event_id, p in events] == [(ids[2], 3), (ids[4], 5)]
+        events = await job_status.replay_events(ids[1], user_id="user-1")
+        assert [event_id for event_id, _ in events] == ids[2:]
+        assert await job_status.replay_events(ids[-1], user_id="user-1") == []
+
+    asyncio.run(main())
+
+
+def test_replay_reads_in_pages(stream, monkeypatch):
+    client, add = stream
+    monkeypatch.setattr(job_status, "REPLAY_PAGE_SIZE", 3)
+    counts = []
+    xrange = client.xrange
+
+    async def counting_xrange(name, min="-", max="+", count=None):
+        counts.append(count)
+        return await xrange(name, min, max, count)
+
+    monkeypatch.setattr(client, "xrange", counting_xrange)
+
+    async def main():
+        first = await add(make_payload(0))
+        for v in range(1, 11):
+            await add(make_payload(v))
+        counts.clear()
+        events = await job_status.replay_events(first, job_id="job-1", max_events=100)
+        assert [p["version"] for _, p in events] == list(range(1, 11))
+        assert None not in counts  # never an unbounded XRANGE
+        assert len(counts) == 1 + 4
+
+    asyncio.run(main())
+
+
+def test_replay_too_far_behind_or_trimmed_is_none(stream):
+    client, add = stream
+
+    async def main():
+        ids = [await add(make_payload(v)) for v in range(10)]
+        assert await job_status.replay_events(ids[0], job_id="job-1", max_events=9) is not None
+        assert await job_status.replay_events(ids[0], job_id="job-1", max_events=8) is None
+        await client.xtrim(job_status.STATUS_STREAM, maxlen=5, approximate=False)
+        assert await job_status.replay_events(ids[2], job_id="job-1") is None
+        assert len(await job_status.replay_events(ids[5], job_id="job-1")) == 4
+
+    asyncio.run(main())
+
+
+def test_sse_resets_a_client_whose_events_were_trimmed(stream, hub):
+    client, add = stream
+
+    async def main():
+        ids = [await add(make_payload(v, status="ready" if v == 4 else "processing")) for v in range(5)]
+        hub.dispatch(ids[-1], make_payload(4, status="ready"))
+        await client.xtrim(job_status.STATUS_STREAM, maxlen=2, approximate=False)
+        body = [frame async for frame in celery_routes._status_events("job-1", None, ids[0])]
+        assert body[1] == job_status.sse_reset_frame(ids[-1])
+        assert body[2].startswith(f"id: {ids[-1]}\nevent: status\n".encode())
+        assert len(body) == 3  # the job is finished: the snapshot ends the stream
+
+        body = [frame async for frame in celery_routes._status_events("job-1", None, ids[3])]
+        assert b"event: reset" not in b"".join(body)
+        assert body[1].startswith(f"id: {ids[4]}\nevent: status\n".encode())
+
+    asyncio.run(main())
+
+
+def test_job_event_stream_is_for_its_owner_only(hub):
+    owner = SimpleNamespace(id="user-1")
+    other = SimpleNamespace(id="user-2")
+
+    async def main():
+        hub.dispatch("1-0", make_payload(1))
+        response = await celery_routes.export_events_for_job("job-1", None, current_user=owner)
+        assert response.media_type == "text/event-stream"
+        for job_id, user in (("job-1", other), ("job-2", owner)):
+            with pytest.raises(HTTPException) as e:
+                await celery_routes.export_events_for_job(job_id, None, current_user=user)
+            assert e.value.status_code == 404  # someone else's job looks like a missing one
+
+    asyncio.run(main())
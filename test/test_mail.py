@@ -0,0 +1,73 @@
+"""
+The email outbox's batch sender against a mocked Resend API: a rejected
+batch is split so only the bad message is dropped, retries reuse the
+batch's Idempotency-Key, and no backoff follows the last attempt.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import src.auth.mail as mail
+from src.auth.mail import EmailOutbox
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """A mocked /emails/batch: `respond(batch)` gives the status; every request is recorded."""
+    requests = []
+    state = {"respond": lambda batch: 200}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        batch = json.loads(request.content)
+        requests.append((request.headers.get("Idempotency-Key"), [m["to"][0] for m in batch]))
+        return httpx.Response(state["respond"](batch), json={})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(mail, "get_http_client", lambda: client)
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(mail.asyncio, "sleep", sleep)
+    return requests, state, sleeps
+
+
+def message(to: str) -> dict:
+    return {"from": "noreply@example.com", "to": [to], "subject": "Verify", "html": "<p>hi</p>"}
+
+
+def test_a_bad_address_drops_only_its_message(api):
+    requests, state, _ = api
+    delivered = []
+
+    def respond(batch):
+        if any(m["to"][0] == "bad" for m in batch):
+            return 422
+        delivered.extend(m["to"][0] for m in batch)
+        return 200
+
+    state["respond"] = respond
+    batch = [message(to) for to in ("a", "b", "bad", "c", "d")]
+    asyncio.run(EmailOutbox(max_retries=3)._send_batch(batch))
+    assert sorted(delivered) == ["a", "b", "c", "d"]
+    assert len({key for key, _ in requests}) == len(requests)  # a key per batch sent
+
+
+def test_retries_reuse_the_key_without_a_final_sleep(api):
+    requests, state, sleeps = api
+    state["respond"] = lambda batch: 503
+    asyncio.run(EmailOutbox(max_retries=3)._send_batch([message("a"), message("b")]))
+    assert len(requests) == 3
+    assert len({key for key, _ in requests}) == 1 and requests[0][0]
+    assert sleeps == [2, 4]
+
+
+def test_rate_limit_is_retried(api):
+    requests, state, _ = api
+    statuses = iter([429, 200])
+    state["respond"] = lambda batch: next(statuses)
+    asyncio.run(EmailOutbox(max_retries=3)._send_batch([message("a")]))
+    assert [to for _, to in requests] == [["a"], ["a"]]
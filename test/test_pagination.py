@@ -0,0 +1,95 @@
+"""
+Keyset pagination cursors: they round-trip exactly, and anything a client
+made up or mangled is rejected as a 400 before a query runs.
+"""
+import asyncio
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import select
+
+from src.admin.routes import get_feedbacks
+from src.db.models import DownloadLog, Feedback
+from src.db.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2025, 11, 12, 16, 5, 33, 718240),
+    datetime(2025, 11, 12, 16, 5, 33, 718240, tzinfo=timezone.utc),
+    datetime(1970, 1, 1),  # backfilled rows that had no timestamp
+])
+def test_cursor_round_trip(created_at):
+    id = "3f2a9c1e-7b4d-4e8a-9f0c-1d2e3f4a5b6c"
+    cursor = encode_cursor(created_at, id)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert decode_cursor(cursor) == (created_at, id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor",
+    "%%%",
+    _b64(b"\xff\xfe\x00"),
+    _b64(b"{}"),
+    _b64(b"null"),
+    _b64(json.dumps(["2025-11-12T16:05:33"]).encode()),
+    _b64(json.dumps(["2025-11-12T16:05:33", "id", "extra"]).encode()),
+    _b64(json.dumps(["yesterday", "id"]).encode()),
+    _b64(json.dumps([None, "id"]).encode()),
+    _b64(json.dumps([1731427533, "id"]).encode()),
+    _b64(json.dumps(["2025-11-12T16:05:33", ["id"]]).encode()),
+    _b64(json.dumps(["2025-11-12T16:05:33", None]).encode()),
+])
+def test_garbage_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_tampered_cursor_is_rejected():
+    cursor = encode_cursor(datetime(2025, 11, 12), "abc")
+    for tampered in (cursor[:-3], cursor + "x", cursor.replace(cursor[4], "*")):
+        with pytest.raises(ValueError):
+            decode_cursor(tampered)
+
+
+def test_bad_cursor_is_a_400_before_any_query():
+    class NoSession:
+        async def execute(self, stmt):
+            raise AssertionError("queried with an invalid cursor")
+
+    with pytest.raises(ValueError):
+        asyncio.run(keyset_page(NoSession(), select(Feedback), Feedback.created_at, Feedback.id, "garbage"))
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(get_feedbacks(session=NoSession(), cursor=_b64(b"[1,2]"), limit=10))
+    assert e.value.status_code == 400
+
+    # feedback.created_at is a naive timestamp: a cursor with an offset is refused, not bound
+    aware = encode_cursor(datetime(2025, 11, 12, tzinfo=timezone.utc), "abc")
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(get_feedbacks(session=NoSession(), cursor=aware, limit=10))
+    assert e.value.status_code == 400
+
+    # and download_logs.created_at is timestamptz: a naive cursor is refused
+    naive = encode_cursor(datetime(2025, 11, 12), "abc")
+    with pytest.raises(ValueError):
+        asyncio.run(keyset_page(NoSession(), select(DownloadLog), DownloadLog.created_at, DownloadLog.id, naive))
+
+
+@pytest.mark.parametrize("created_at, aware", [
+    (datetime(2025, 11, 12), True),
+    (datetime(2025, 11, 12, tzinfo=timezone.utc), False),
+])
+def test_cursor_must_match_the_column_awareness(created_at, aware):
+    cursor = encode_cursor(created_at, "abc")
+    assert decode_cursor(cursor) == (created_at, "abc")
+    assert decode_cursor(cursor, aware=not aware) == (created_at, "abc")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor, aware=aware)
@@ -0,0 +1,65 @@
+"""
+HTTP byte ranges (`parse_range` / `resolve_range`), as the audio proxy and
+the storage backends apply them: suffix and open-ended ranges, clamping to
+the object, and 416 for a range that starts past the end.
+"""
+import pytest
+
+from src.storage.base import RangeNotSatisfiable, parse_range, resolve_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-499", (0, 499)),
+    ("bytes=500-999", (500, 999)),
+    ("bytes=500-", (500, None)),
+    ("bytes=-500", (None, 500)),
+    ("bytes= 10 - 20", (10, 20)),
+    ("bytes=0-0", (0, 0)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "bytes=",
+    "bytes=-",
+    "bytes=abc-def",
+    "bytes=5",
+    "bytes=10-5",       # last before first
+    "bytes=0-1,5-6",    # several ranges: served whole
+    "bytes=--5",
+    "bytes=-5--1",
+    "items=0-5",
+    "0-5",
+])
+def test_unusable_range_is_ignored(header):
+    assert parse_range(header) is None
+
+
+@pytest.mark.parametrize("requested, size, expected", [
+    ((0, 499), 1000, (0, 499)),
+    ((0, None), 1000, (0, 999)),       # open-ended
+    ((500, None), 1000, (500, 999)),
+    ((999, None), 1000, (999, 999)),
+    ((500, 5000), 1000, (500, 999)),   # clamped to the object
+    ((None, 200), 1000, (800, 999)),   # suffix: the last 200 bytes
+    ((None, 5000), 1000, (0, 999)),    # suffix longer than the object
+    ((None, 1), 1, (0, 0)),
+])
+def test_resolve_range(requested, size, expected):
+    assert resolve_range(requested, size) == expected
+
+
+@pytest.mark.parametrize("requested, size", [
+    ((1000, None), 1000),   # starts at the end
+    ((2000, 3000), 1000),
+    ((None, 0), 1000),      # empty suffix
+    ((0, None), 0),         # nothing to serve in an empty object
+    ((None, 10), 0),
+])
+def test_unsatisfiable_range(requested, size):
+    with pytest.raises(RangeNotSatisfiable) as e:
+        resolve_range(requested, size)
+    assert e.value.size == size
@@ -0,0 +1,113 @@
+"""
+`ZipSizePlan` against real archives: the planned size of an export must be
+the length zipstream-ng writes, for single and batch (per-folder) exports,
+below and past the zip64 offset limit. Only the deflated length of
+metadata.csv and README.txt is an estimate, so the tests swap the
+estimate for the real compressed length before comparing.
+"""
+import io
+import math
+import os
+import random
+import zipfile
+
+import pytest
+import zipstream.ng
+from zipstream import ZipStream, ZIP_DEFLATED, ZIP_STORED
+
+import src.download.zip_size as zip_size
+from src.download.zip_size import ZipSizePlan, audio_entry_bytes
+
+DEFLATE = {"compress_type": ZIP_DEFLATED, "compress_level": 9}
+
+
+def build_archive(clips, folders, metadata: bytes, readme: bytes) -> bytes:
+    """An export archive as the workers write it: stored, sized audio, then sized deflated text."""
+    zs = ZipStream(compress_type=ZIP_STORED)
+    for folder, name, body in clips:
+        zs.add(iter([body]), arcname=f"{folder}audio/{name}.wav", size=len(body))
+    for folder in folders:
+        zs.add(iter([metadata]), arcname=f"{folder}metadata.csv", size=len(metadata), **DEFLATE)
+        zs.add(iter([readme]), arcname=f"{folder}README.txt", size=len(readme), **DEFLATE)
+    return b"".join(zs)
+
+
+def plan_for(clips, folders, metadata_bytes: int) -> ZipSizePlan:
+    """The plan `DownloadService._plan_size` makes from the same rows."""
+    names = [len(f"{folder}audio/{name}.wav".encode()) for folder, name, _ in clips]
+    offset, far = 0, 0
+    for name_bytes, (_, _, body) in zip(names, clips):
+        far += offset > zip_size.ZIP64_LIMIT
+        offset += audio_entry_bytes(name_bytes, len(body))
+    return ZipSizePlan(
+        entries=len(clips), audio_bytes=sum(len(body) for *_, body in clips), name_bytes=sum(names),
+        far_entries=far, metadata_bytes=metadata_bytes, folders=tuple(folders),
+    )
+
+
+def estimated_text_bytes(plan: ZipSizePlan) -> int:
+    metadata = math.ceil(plan.metadata_bytes * zip_size.METADATA_DEFLATE_RATIO / len(plan.folders))
+    return (metadata + zip_size.README_BYTES) * len(plan.folders)
+
+
+def actual_text_bytes(archive: bytes) -> int:
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        return sum(
+            info.compress_size for info in zf.infolist()
+            if info.filename.endswith(("metadata.csv", "README.txt"))
+        )
+
+
+def make_clips(count: int, folders, seed: int = 0):
+    rng = random.Random(seed)
+    # Names of varying length, clips of varying size (some empty)
+    return [
+        (folders[i % len(folders)], f"sent_{rng.randrange(10 ** rng.randint(1, 12))}_{i}", os.urandom(rng.randint(0, 4096)))
+        for i in range(count)
+    ]
+
+
+def assert_planned_exactly(clips, folders):
+    metadata = b"".join(f"spk,{name},some transcript,{folder}audio/{name}.wav\n".encode() for folder, name, _ in clips)
+    readme = b"Dataset README\n" * 40
+    archive = build_archive(clips, folders, metadata, readme)
+    plan = plan_for(clips, folders, metadata_bytes=len(metadata))
+    assert plan.total_bytes() - estimated_text_bytes(plan) + actual_text_bytes(archive) == len(archive)
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.testzip() is None
+    return plan
+
+
+@pytest.mark.parametrize("count", [1, 7, 200])
+def test_single_export_size(count):
+    assert_planned_exactly(make_clips(count, [""]), [""])
+
+
+def test_batch_export_size():
+    folders = ["yoruba/", "hausa/", "igbo_2/"]
+    assert_planned_exactly(make_clips(90, folders), folders)
+
+
+def test_audio_entries_are_stored():
+    archive = build_archive(make_clips(3, [""]), [""], b"a,b\n", b"readme")
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        kinds = {info.filename: info.compress_type for info in zf.infolist()}
+    assert all(kind == zipfile.ZIP_STORED for name, kind in kinds.items() if name.endswith(".wav"))
+    assert kinds["metadata.csv"] == kinds["README.txt"] == zipfile.ZIP_DEFLATED
+
+
+def test_size_past_the_zip64_offset_limit(monkeypatch):
+    # A small limit stands in for 4 GiB: later entries start past it, and the
+    # central directory and end records switch to zip64 as they would
+    limit = 64 * 1024
+    monkeypatch.setattr(zipstream.ng, "ZIP64_LIMIT", limit)
+    monkeypatch.setattr(zip_size, "ZIP64_LIMIT", limit)
+    clips = make_clips(80, [""], seed=1)
+    plan = assert_planned_exactly(clips, [""])
+    assert 0 < plan.far_entries < plan.entries
+
+
+def test_size_past_the_entry_count_limit(monkeypatch):
+    monkeypatch.setattr(zipstream.ng, "ZIP_FILECOUNT_LIMIT", 50)
+    monkeypatch.setattr(zip_size, "ZIP_FILECOUNT_LIMIT", 50)
+    assert_planned_exactly(make_clips(60, [""], seed=2), [""])
@@ -1,18 +1,13 @@
-import os
-from src.download.s3_config import s3, BUCKET
-
-s3 = s3
+"""
+Upload ./samples to s3://<S3_BUCKET_NAME>/data, skipping files already there.
 
-bucket_name = BUCKET
-local_directory = os.path.join(os.getcwd(), 'samples')
-s3_prefix = 'data'
-
-for root, _, files in os.walk(local_directory):
-    for file in files:
-        local_path = os.path.join(root, file)
-        s3_key = os.path.join(s3_prefix, os.path.relpath(local_path, local_directory)).replace('\\', '/')
-        s3.upload_file(local_path, bucket_name, s3_key)
-        print(f"Uploaded {local_path} to s3://{bucket_name}/{s3_key}")
+Kept for the old entry point; see src/ingest/sync.py for the options
+(`python -m src.ingest.sync --help`).
+"""
+import os
 
+from src.ingest.sync import main
 
 
+if __name__ == "__main__":
+    main([os.path.join(os.getcwd(), "samples"), "--prefix", "data"])